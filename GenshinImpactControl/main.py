@@ -1,22 +1,117 @@
 import sys
 import os
 import time
+import bisect
+import itertools
+import operator
+import queue
+from collections import OrderedDict
 import mido
+import numpy as np
 import argparse
-import pygetwindow as gw
+try:
+    import pygetwindow as gw
+except ImportError:
+    # 无桌面环境（如使用RecordingBackend测试时）不检查窗口切换
+    gw = None
 import tkinter as tk
 from tkinter import filedialog, ttk
 import threading
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from utils.logger import logger
+from utils.logger import get_logger
 from utils.gui_utils import GUIController
+from utils.audio_utils import (
+    compile_schedule, iter_note_batches, merge_message_streams, resolve_key_collisions, TempoMap,
+    HybridClock, CompiledSongCache, MidiLibraryIndex, track_to_array, array_to_dicts, transpose_events,
+    average_pitch, pitch_class_histogram, MAJOR_SCALE_MASKS, MINOR_SCALE_MASKS, EVENT_NOTE_ON,
+)
+
+logger = get_logger(__name__)
+
+
+class _ReleaseIndex:
+    """
+    释放消息时间间隔的最大值线段树
+
+    用于在某个位置之前，查找最近的一个时间间隔大于阈值的释放消息，查询和更新均为O(log n)
+    """
+
+    def __init__(self, values):
+        self.size = 1
+        while self.size < len(values):
+            self.size *= 2
+        self.tree = [float("-inf")] * (2 * self.size)
+        self.tree[self.size:self.size + len(values)] = values
+        tree = self.tree
+        for node in range(self.size - 1, 0, -1):
+            left = tree[2 * node]
+            right = tree[2 * node + 1]
+            tree[node] = left if left > right else right
+
+    def update(self, slot, value):
+        tree = self.tree
+        node = slot + self.size
+        tree[node] = value
+        node //= 2
+        while node:
+            left = tree[2 * node]
+            right = tree[2 * node + 1]
+            largest = left if left > right else right
+            # 上层最大值不再变化时无需继续向上更新
+            if tree[node] == largest:
+                break
+            tree[node] = largest
+            node //= 2
+
+    def rightmost_above(self, upper, threshold):
+        """返回下标在[0, upper)中、值大于threshold的最大下标，不存在时返回-1"""
+        if upper <= 0:
+            return -1
+        tree = self.tree
+        # 从叶子upper-1开始，从右向左依次检查覆盖[0, upper)的极大子树
+        node = self.size + upper - 1
+        while tree[node] <= threshold:
+            # 左子节点的父节点与它左边界相同，继续上移；到达右子节点后转到其左侧的兄弟子树
+            while node & 1 == 0:
+                node >>= 1
+            if node == 1:
+                return -1
+            node -= 1
+        # 在找到的子树中优先向右下降
+        while node < self.size:
+            node = 2 * node + 1 if tree[2 * node + 1] > threshold else 2 * node
+        return node - self.size
 
 
 class GenshinImpactMusicPlayer:
-    def __init__(self):
-        self.controller = GUIController()
+    # 优化音符时间时直接向前检查的释放消息数，超过后改用线段树查找
+    RELEASE_SCAN_LIMIT = 8
+    # 流式模式下移调和释放间隔优化的前瞻消息数
+    STREAM_LOOKAHEAD = 256
+    # 流式模式下播放队列的最大批次数
+    STREAM_QUEUE_SIZE = 1024
+    # 内存中保留的已编译时间表数量，超出时淘汰最久未使用的
+    SCHEDULE_CACHE_SIZE = 4
+
+    def __init__(self, clock=None, song_cache=None, library_index=None, input_backend=None, max_polyphony=None):
+        """
+        :param clock: 播放时钟（PlaybackClock实例），默认使用高精度混合时钟
+        :param song_cache: 编译结果磁盘缓存（CompiledSongCache实例），默认使用应用目录下的cache/songs，传入False禁用
+        :param library_index: 曲库预分析索引（MidiLibraryIndex实例），默认读取应用目录下的cache/library_index.json，传入False禁用
+        :param input_backend: 按键控制器的输入后端（InputBackend实例），默认使用pynput
+        :param max_polyphony: 多音轨合并播放时最多同时按下的按键数，默认为映射中不同按键的数量，只能调低
+        """
+        # 按键控制器在第一次使用时创建，只做分析的进程无需初始化输入设备
+        self._controller = None
+        self.input_backend = input_backend
+        self.clock = clock or HybridClock()
+        self.song_cache = CompiledSongCache() if song_cache is None else song_cache
+        self.library_index = MidiLibraryIndex() if library_index is None else library_index
+        # 最近一次播放的事件延迟统计（p50/p99/max），用于调整min_release_time
+        self.timing_stats = None
         self.music_score_text = ""
         self.music_score = []
         self.duration = 0.1
@@ -45,14 +140,38 @@ class GenshinImpactMusicPlayer:
             83: "u",
         }
         self.bpm = 120
-        self.tempo = 60 / self.bpm
+        # 读取MIDI文件后建立的速度映射，用于把tick换算为播放时间
+        self.tempo_map = None
         self.ticks_per_beat = 0
         self.min_release_time = 0.03
+        # 显式指定的复音数上限，为None时使用映射能同时按下的全部按键
+        self._max_polyphony = max_polyphony
+        # 最近一次多音轨合并的冲突统计
+        self.merge_stats = {"collisions": 0, "dropped": 0, "preempted": 0}
+        # 已编译时间表的内存LRU缓存，重放时无需重新解析
+        self._schedule_cache = OrderedDict()
+
+    @property
+    def max_polyphony(self):
+        """
+        多音轨合并播放时最多同时按下的按键数，超出时按音轨顺序保留优先级高的音符
+
+        模拟按键不受手指数量限制，上限为映射中不同按键的数量，显式指定的值只能比它更低
+        """
+        key_count = len(set(self.map.values()))
+        if self._max_polyphony is None:
+            return key_count
+        return min(self._max_polyphony, key_count)
 
+    @property
+    def controller(self):
+        if self._controller is None:
+            self._controller = GUIController(self.input_backend)
+        return self._controller
 
     def read_midi(self, file_path):
         if not os.path.exists(file_path):
-            logger.error(f"file {file_path} not exists")
+            logger.error("file {} not exists", file_path)
             return None
         return mido.MidiFile(file_path)
 
@@ -64,10 +183,32 @@ class GenshinImpactMusicPlayer:
                 track_list[-1].append(msg.dict())
         return track_list
 
+    def to_arrays(self, mid):
+        """将MIDI文件的每条音轨转换为结构化数组（MIDI_EVENT_DTYPE）"""
+        return [track_to_array(track) for track in mid.tracks]
+
+    @staticmethod
+    def _track_numbers(track_num):
+        """将单个音轨编号或音轨编号列表统一为元组"""
+        if isinstance(track_num, int):
+            return (track_num,)
+        return tuple(track_num)
+
+    def _check_track_numbers(self, track_nums, track_count):
+        """检查所有音轨编号（从1开始）是否在有效范围内"""
+        for num in track_nums:
+            if num < 1 or num > track_count:
+                logger.error("音轨编号 {} 超出范围，总共有 {} 条音轨", num, track_count)
+                return False
+        return len(track_nums) > 0
+
     def mode_recognition(self, mid_list, track_num=1):
         """
         识别MIDI文件的调式，只识别大调小调，处理少量调外音
         返回值：-1表示小调，C大调为0，D大调为1，以此类推
+
+        mid_list中的音轨可以是结构化数组，也可以是消息字典列表；
+        track_num可以是音轨编号列表，此时合并统计所有选中音轨的音符
         """
         logger.info("开始识别调式")
         
@@ -75,81 +216,40 @@ class GenshinImpactMusicPlayer:
             logger.info("mid_list为空，返回None")
             return None
         
-        # 将从1开始的音轨编号转换为从0开始的索引
-        actual_track_num = track_num - 1
-        
-        # 检查actual_track_num是否在有效范围内
-        if actual_track_num < 0 or actual_track_num >= len(mid_list):
-            logger.error(f"音轨编号 {track_num} 超出范围，总共有 {len(mid_list)} 条音轨")
+        # 检查音轨编号是否在有效范围内
+        track_nums = self._track_numbers(track_num)
+        if not self._check_track_numbers(track_nums, len(mid_list)):
             return None
         
-        # 只使用指定音轨的音符进行统计
-        all_notes = []
-        if mid_list[actual_track_num]:
-            first_track = mid_list[actual_track_num]
-            logger.info(f"使用第{track_num}条轨道进行统计，事件数量: {len(first_track)}")
-            
-            for msg in first_track:
-                if "note" in msg and msg["type"] == "note_on":
-                    all_notes.append(msg["note"])
-        
-        logger.info(f"提取到的音符数量: {len(all_notes)}")
+        # 只使用指定音轨的音符进行统计（音轨编号从1开始）
+        events = np.concatenate([track_to_array(mid_list[num - 1]) for num in track_nums])
+        logger.info("使用第{}条轨道进行统计，事件数量: {}", '、'.join(map(str, track_nums)), len(events))
+
+        # 统计每个音级的出现频率
+        pitch_class_counts = pitch_class_histogram(events)
+        total_notes = int(pitch_class_counts.sum())
+        logger.info("提取到的音符数量: {}", total_notes)
         
-        if not all_notes:
+        if total_notes == 0:
             logger.info("没有提取到音符，返回None")
             return None
         
-        # 统计每个音级的出现频率
-        pitch_class_counts = {}
-        total_notes = 0
-        for note in all_notes:
-            pitch_class = note % 12  # 0=C, 1=C#, ..., 11=B
-            if pitch_class in pitch_class_counts:
-                pitch_class_counts[pitch_class] += 1
-            else:
-                pitch_class_counts[pitch_class] = 1
-            total_notes += 1
-        
-        # 大调的音级模式（全全半全全全半）
-        major_scale = [0, 2, 4, 5, 7, 9, 11]
-        # 小调的音级模式（全半全全半全全）
-        minor_scale = [0, 2, 3, 5, 7, 8, 10]
-        
-        # 计算每个可能的调式的匹配度
-        best_score = 0
-        best_key = None
-        is_minor = False
-        
-        # 测试所有可能的大调（12个）和小调（12个）
-        for root in range(12):
-            # 计算大调匹配度：只统计调内音的出现次数，忽略调外音
-            major_score = 0
-            for pitch_class, count in pitch_class_counts.items():
-                if (pitch_class - root) % 12 in major_scale:
-                    major_score += count
-            
-            # 计算小调匹配度：只统计调内音的出现次数，忽略调外音
-            minor_score = 0
-            for pitch_class, count in pitch_class_counts.items():
-                if (pitch_class - root) % 12 in minor_scale:
-                    minor_score += count
-            
-            # 增加大调的权重，因为大调通常更常见，且算法容易误判
-            major_score *= 1.1
-            
-            # 更新最佳匹配
-            if major_score > best_score:
-                best_score = major_score
-                best_key = root
-                is_minor = False
-            if minor_score > best_score:
-                best_score = minor_score
-                best_key = root
-                is_minor = True
+        # 计算每个可能的调式的匹配度：只统计调内音的出现次数，忽略调外音
+        # 增加大调的权重，因为大调通常更常见，且算法容易误判
+        major_scores = (MAJOR_SCALE_MASKS @ pitch_class_counts) * 1.1
+        minor_scores = MINOR_SCALE_MASKS @ pitch_class_counts
+        # 按根音交错排列（C大调、C小调、C#大调……），argmax取第一个最大值，
+        # 与依次比较时只在严格更大才更新的规则一致
+        scores = np.empty(24)
+        scores[0::2] = major_scores
+        scores[1::2] = minor_scores
+        best_index = int(np.argmax(scores))
+        best_key = best_index // 2
+        is_minor = best_index % 2 == 1
         
         # 返回结果：-1表示小调，大调返回对应的数值
         if is_minor:
-            logger.info(f"识别到调式: 小调 (根音: {best_key})")
+            logger.info("识别到调式: 小调 (根音: {})", best_key)
             return -1
         else:
             # 大调返回对应的数值，C大调为0，D大调为1，以此类推
@@ -157,10 +257,15 @@ class GenshinImpactMusicPlayer:
             # 计算根音对应的大调名称
             major_key_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
             key_name = major_key_names[best_key]
-            logger.info(f"识别到调式: {key_name}大调 (根音: {best_key})")
+            logger.info("识别到调式: {}大调 (根音: {})", key_name, best_key)
             # 返回根音值，用于后续转换
             return best_key 
 
+    @staticmethod
+    def _is_release(msg):
+        """判断消息是否为音符释放（note_off或velocity为0的note_on）"""
+        return (msg["type"] == "note_off" or (msg["type"] == "note_on" and msg["velocity"] == 0)) and "note" in msg
+
     def optimize_note_timing(self, mid_list, track_num=1):
         """
         优化音符时间，解决同一个键快速松开按下导致听不出松开效果的问题
@@ -170,47 +275,111 @@ class GenshinImpactMusicPlayer:
         
         # 检查actual_track_num是否在有效范围内
         if actual_track_num < 0 or actual_track_num >= len(mid_list):
-            logger.error(f"音轨编号 {track_num} 超出范围，总共有 {len(mid_list)} 条音轨")
+            logger.error("音轨编号 {} 超出范围，总共有 {} 条音轨", track_num, len(mid_list))
             return mid_list
         
-        min_release_ticks = self.min_release_time * self.ticks_per_beat / self.tempo
+        if self.tempo_map is None:
+            logger.warning("尚未读取MIDI文件的速度信息，跳过音符时间优化")
+            return mid_list
+
+        min_release_ns = round(self.min_release_time * 1e9)
         track = mid_list[actual_track_num]
-        
-        # 遍历音轨中的所有消息，记录每个音符的状态
-        i = 0
-        while i < len(track):
-            msg = track[i]
+        # 释放间隔按实际播放时间比较，速度变化后的段落同样保证min_release_time
+        timing = self._message_timing(track)
+
+        # 每个音符所有释放消息（note_off或velocity为0的note_on）的位置
+        release_positions = {}
+        for i, msg in enumerate(track):
+            msg_type = msg["type"]
+            if (msg_type == "note_off" or (msg_type == "note_on" and msg["velocity"] == 0)) and "note" in msg:
+                release_positions.setdefault(msg["note"], []).append(i)
+        # 每个音符已出现、可供调整的释放消息位置，按位置排序
+        # 需要满足 释放间隔 > diff_ns + min_release_ns，而diff_ns > 0，
+        # 因此间隔不超过min_release_ns的释放消息永远不会被选中，无需记录
+        candidates = {}
+        # 向前检查超过RELEASE_SCAN_LIMIT个候选仍找不到时，为该音符建立最大值线段树，之后改用线段树查找
+        release_indexes = {}
+
+        for i, msg in enumerate(track):
+            msg_type = msg["type"]
+            if msg_type != "note_on" or msg["velocity"] == 0:
+                if (msg_type == "note_off" or msg_type == "note_on") and "note" in msg and timing[i][2] > min_release_ns:
+                    candidates.setdefault(msg["note"], []).append(i)
+                continue
             # 只处理有时间间隔的note_on消息（velocity不为0）
-            if msg["type"] == "note_on" and msg["velocity"] != 0:
-                if msg["time"] < min_release_ticks:
-                    ticks_diff = min_release_ticks - msg["time"]
-                    # 查找前一个对应的note_off消息（或velocity为0的note_on）
-                    # 从i-1开始向前查找，直到找到对应的note_off或到达音轨开头
-                    for j in range(i - 1, -1, -1):
-                        prev_msg = track[j]
-                        # 检查是否是同一音符的note_off消息
-                        if (prev_msg["type"] == "note_off" or (prev_msg["type"] == "note_on" and prev_msg["velocity"] == 0)) and "note" in prev_msg and prev_msg["note"] == msg["note"]:
-                            # 检查前一个消息是否有时间间隔可以调整
-                            if prev_msg["time"] > ticks_diff + min_release_ticks:
-                                # 增加当前note_on的时间间隔
-                                track[j + 1]["time"] += ticks_diff
-                                # 减少前一个note_off的时间间隔，保持总时长不变
-                                track[j]["time"] -= ticks_diff
-                                break
-            i += 1
+            if timing[i][2] >= min_release_ns:
+                continue
+            note = msg["note"]
+            note_candidates = candidates.get(note)
+            if not note_candidates:
+                continue
+            diff_ns = min_release_ns - timing[i][2]
+            threshold = diff_ns + min_release_ns
+
+            # 查找当前位置之前最近的一个时间间隔足够大的同音符释放消息
+            j = -1
+            index = release_indexes.get(note)
+            if index is None:
+                # 大多数情况下最近的几个候选就满足条件
+                for probe in range(len(note_candidates) - 1, max(len(note_candidates) - self.RELEASE_SCAN_LIMIT, 0) - 1, -1):
+                    if timing[note_candidates[probe]][2] > threshold:
+                        j = note_candidates[probe]
+                        break
+                else:
+                    if len(note_candidates) > self.RELEASE_SCAN_LIMIT:
+                        index = _ReleaseIndex([timing[k][2] for k in release_positions[note]])
+                        release_indexes[note] = index
+            positions = release_positions[note]
+            if index is not None:
+                slot = index.rightmost_above(bisect.bisect_left(positions, i), threshold)
+                if slot >= 0:
+                    j = positions[slot]
+            if j < 0:
+                continue
+
+            # 释放消息提前diff_ns，之后一条消息相应推迟，保持总时长不变
+            self._advance_release(track, timing, j, diff_ns)
+            if index is not None:
+                index.update(bisect.bisect_left(positions, j), timing[j][2])
+            # 之后一条消息如果是释放消息，间隔变大后可能成为新的可调整位置
+            next_msg = track[j + 1]
+            if j + 1 < i and self._is_release(next_msg):
+                next_note = next_msg["note"]
+                if next_note in release_indexes:
+                    next_positions = release_positions[next_note]
+                    release_indexes[next_note].update(bisect.bisect_left(next_positions, j + 1), timing[j + 1][2])
+                if timing[j + 1][2] > min_release_ns:
+                    next_candidates = candidates.setdefault(next_note, [])
+                    slot = bisect.bisect_left(next_candidates, j + 1)
+                    if slot == len(next_candidates) or next_candidates[slot] != j + 1:
+                        next_candidates.insert(slot, j + 1)
 
         mid_list[actual_track_num] = track
         return mid_list
     
-    def adjust_midi(self, mid_list, track_num=1):
-        mode = self.mode_recognition(mid_list, track_num)
+    def semitone_shift(self, tracks, track_num=1):
+        """
+        识别调式并计算移调到C大调所需的半音数，同时按八度调整使平均音高接近map中心
+
+        :param tracks: 结构化数组形式的音轨列表
+        :return: 总半音调整量，无法识别或小调时为0
+        """
+        return self.shift_for_mode(tracks, self.mode_recognition(tracks, track_num))
+
+    @staticmethod
+    def mode_name(mode):
+        """调式识别结果的名称"""
         # 使用12个大调名称列表，支持所有大调
         major_key_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        logger.info(f"最终识别结果: {'小调' if mode == -1 else f'{major_key_names[mode]}大调' if mode is not None else '未知调式'}")
-        
+        return '小调' if mode == -1 else f'{major_key_names[mode]}大调' if mode is not None else '未知调式'
+
+    def shift_for_mode(self, tracks, mode):
+        """根据已识别的调式计算总半音调整量，参见semitone_shift"""
+        logger.info("最终识别结果: {}", self.mode_name(mode))
+
         # 如果没有识别到调式，直接返回
         if mode is None:
-            return mid_list
+            return 0
         
         # 计算从当前调式到C大调的半音差
         if mode != -1:  # 大调
@@ -218,20 +387,13 @@ class GenshinImpactMusicPlayer:
             semitone_diff = -current_root  # 转换到C大调需要调整的半音数
         else:  # 小调
             # 小调暂时不处理，直接返回
-            return mid_list
-        
-        logger.info(f"当前调式根音: {current_root}, 转换到C大调需要调整: {semitone_diff}个半音")
+            return 0
         
-        # 首先收集所有音符，计算整体调整策略
-        all_notes = []
-        for track in mid_list:
-            for msg in track:
-                if "note" in msg:
-                    all_notes.append(msg["note"])
+        logger.info("当前调式根音: {}, 转换到C大调需要调整: {}个半音", current_root, semitone_diff)
         
-        # 计算所有音符的平均音高
-        if all_notes:
-            avg_note = sum(all_notes) / len(all_notes)
+        # 计算所有音符的平均音高，确定整体调整策略
+        avg_note = average_pitch(tracks)
+        if avg_note is not None:
             # 调整半音后，计算平均音高
             avg_adjusted_note = avg_note + semitone_diff
             
@@ -245,26 +407,36 @@ class GenshinImpactMusicPlayer:
             # 应用八度调整，保持相对音高不变
             total_semitone_diff = semitone_diff + (octave_diff * 12)
             
-            logger.info(f"所有音符平均音高: {avg_note:.2f}, 调整半音后: {avg_adjusted_note:.2f}")
-            logger.info(f"Map中心音高: {map_center:.2f}, 八度调整: {octave_diff}个八度, 总半音调整: {total_semitone_diff}个半音")
+            logger.info("所有音符平均音高: {:.2f}, 调整半音后: {:.2f}", avg_note, avg_adjusted_note)
+            logger.info("Map中心音高: {:.2f}, 八度调整: {}个八度, 总半音调整: {}个半音",
+                        map_center, octave_diff, total_semitone_diff)
         else:
             total_semitone_diff = semitone_diff
             logger.info("没有找到音符，只进行调式半音调整")
         
+        return total_semitone_diff
+
+    def transpose_tracks(self, mid_list, track_num=1, shift=None):
+        """
+        将所有音轨移调到C大调
+
+        :param mid_list: 结构化数组或消息字典列表形式的音轨列表
+        :param shift: 已知的总半音调整量（例如曲库索引中的结果），为None时重新识别调式
+        :return: 移调后的结构化数组列表
+        """
+        tracks = [track_to_array(track) for track in mid_list]
+        total_semitone_diff = self.semitone_shift(tracks, track_num) if shift is None else shift
         # 调整所有音符，保持相对音高不变
-        adjusted_mid_list = []
-        for track in mid_list:
-            adjusted_track = []
-            for msg in track:
-                adjusted_msg = msg.copy()
-                if "note" in adjusted_msg:
-                    original_note = adjusted_msg["note"]
-                    # 应用统一的半音调整，保持相对音高不变
-                    adjusted_note = original_note + total_semitone_diff
-                    adjusted_msg["note"] = adjusted_note
-                    logger.debug(f"音符调整: {original_note} -> {adjusted_note}")
-                adjusted_track.append(adjusted_msg)
-            adjusted_mid_list.append(adjusted_track)
+        return [transpose_events(track, total_semitone_diff) for track in tracks]
+
+    def adjust_midi(self, mid_list, track_num=1):
+        """
+        移调并优化音符时间，输入输出均为消息字典列表
+
+        非音符消息在结果中只保留增量时间（type为"other"）
+        """
+        tracks = self.transpose_tracks(mid_list, track_num)
+        adjusted_mid_list = [array_to_dicts(track) for track in tracks]
         
         # 优化音符时间，解决同一个键快速松开按下导致听不出松开效果的问题
         optimized_mid_list = self.optimize_note_timing(adjusted_mid_list, track_num)
@@ -272,80 +444,377 @@ class GenshinImpactMusicPlayer:
         logger.info("MIDI调式调整和时间优化完成")
         return optimized_mid_list
         
-    def play_midi(self, file_path, bpm=120, track_num=1):
+    def analyze_midi(self, mid, track_num=1):
+        """
+        分析MIDI文件，不进行播放
+
+        :return: 包含调式、移调量、调外音数量和时长的字典，音轨编号无效时返回None
+        """
+        track_nums = self._track_numbers(track_num)
+        if not self._check_track_numbers(track_nums, len(mid.tracks)):
+            return None
+        tracks = self.to_arrays(mid)
+        mode = self.mode_recognition(tracks, track_nums)
+        shift = self.shift_for_mode(tracks, mode)
+
+        # 统计移调后不在按键映射中的音符数量（只统计按下）
+        events = np.concatenate([tracks[num - 1] for num in track_nums])
+        notes = events["note"][(events["type"] == EVENT_NOTE_ON) & (events["velocity"] > 0)] + shift
+        out_of_map = int(np.count_nonzero(~np.isin(notes, list(self.map))))
+
+        # 按文件原速计算时长
+        tempo_map = TempoMap.from_midi(mid)
+        end_tick = max((sum(msg.time for msg in track) for track in mid.tracks), default=0)
+        return {
+            "track": list(track_nums),
+            "mode": mode,
+            "key": self.mode_name(mode),
+            "semitone_shift": int(shift),
+            "note_count": len(notes),
+            "out_of_map": out_of_map,
+            "duration": tempo_map.tick_to_ns(end_tick) / 1e9,
+        }
+
+    def indexed_shift(self, file_path, track_num=1):
+        """
+        从曲库索引中读取移调量
+
+        :return: 索引中与当前音轨选择一致且文件未修改时返回总半音调整量，否则返回None
+        """
+        if not self.library_index:
+            return None
+        entry = self.library_index.get(file_path)
+        if entry is None or entry.get("track") != list(self._track_numbers(track_num)):
+            return None
+        logger.info("使用曲库索引中的调式: {}，移调 {} 个半音", entry['key'], entry['semitone_shift'])
+        return entry["semitone_shift"]
+
+    def compile_midi(self, file_path, bpm=120, track_num=1):
+        """
+        将MIDI文件编译为绝对时间的播放时间表
+
+        编译结果按文件、修改时间、BPM、音轨、按键映射、最小释放时间和最大复音数缓存在内存中，
+        只保留最近使用的SCHEDULE_CACHE_SIZE个，重复播放同一首曲子时直接复用；
+        同时写入磁盘缓存，下次启动后播放曲库中的歌曲也无需重新解析
+        """
         self.bpm = bpm
-        self.tempo = 60 / self.bpm
         # 检测文件是否存在
+        if not os.path.exists(file_path):
+            logger.error("file {} not exists", file_path)
+            return None
+
+        track_nums = self._track_numbers(track_num)
+        cache_key = (os.path.abspath(file_path), os.path.getmtime(file_path), bpm, track_nums,
+                     tuple(sorted(self.map.items())), self.min_release_time, self.max_polyphony)
+        schedule = self._schedule_cache.get(cache_key)
+        if schedule is not None:
+            self._schedule_cache.move_to_end(cache_key)
+            logger.info("使用已编译的时间表")
+            return schedule
+
+        disk_key = None
+        if self.song_cache:
+            disk_key = self.song_cache.make_key(file_path, bpm, track_nums, self.map, self.min_release_time,
+                                                self.max_polyphony)
+            schedule = self.song_cache.get(disk_key) if disk_key else None
+            if schedule is not None:
+                logger.info("使用磁盘缓存的时间表，跳过MIDI解析")
+                self._remember_schedule(cache_key, schedule)
+                return schedule
+
         mid = self.read_midi(file_path)
         if mid is None:
-            return
+            return None
+        self._load_tempo_map(mid)
+        if not self._check_track_numbers(track_nums, len(mid.tracks)):
+            return None
+        tracks = self.transpose_tracks(self.to_arrays(mid), track_nums, self.indexed_shift(file_path, track_nums))
+
+        # 只有待播放的音轨需要转换回字典，多条音轨合并为一条后再进行时间优化
+        track = list(self._merge_selected(array_to_dicts(tracks[num - 1]) for num in track_nums))
+        track = self.optimize_note_timing([track])[0]
+        logger.info("MIDI调式调整和时间优化完成")
+
+        schedule = compile_schedule(track, self.map, self.tempo_map)
+        self._remember_schedule(cache_key, schedule)
+        if disk_key:
+            self.song_cache.put(disk_key, schedule)
+        return schedule
+
+    def _remember_schedule(self, cache_key, schedule):
+        """把时间表放入内存缓存，超出SCHEDULE_CACHE_SIZE时淘汰最久未使用的"""
+        self._schedule_cache[cache_key] = schedule
+        self._schedule_cache.move_to_end(cache_key)
+        while len(self._schedule_cache) > self.SCHEDULE_CACHE_SIZE:
+            self._schedule_cache.popitem(last=False)
+
+    def _stream_transpose(self, messages, lookahead, shift=None):
+        """
+        流式移调：只用前lookahead条消息识别调式和八度，之后的消息边读边调整
+
+        :param shift: 已知的总半音调整量（例如曲库索引中根据整个文件得到的结果），为None时用开头的消息识别
+        """
+        buffer = list(itertools.islice(messages, lookahead))
+        if shift is None:
+            shift = self.semitone_shift([track_to_array(buffer)], 1) if buffer else 0
+        for msg in itertools.chain(buffer, messages):
+            if shift and "note" in msg:
+                msg["note"] += shift
+            yield msg
+
+    def _stream_release_fix(self, messages, lookahead):
+        """
+        流式版本的optimize_note_timing
+
+        只保留最近lookahead条消息，对应的释放消息仍在窗口内时与整轨处理结果相同，
+        已经输出的消息不再调整
+        """
+        min_release_ns = round(self.min_release_time * 1e9)
+        tick_to_ns = self.tempo_map.tick_to_ns
+        pending = {}  # 全局位置 -> 尚未输出的消息
+        timing = {}  # 全局位置 -> 尚未输出消息的[绝对tick, 播放时间, 间隔]，播放时间和间隔单位为纳秒
+        first = 0  # 最早的未输出消息位置
+        release_positions = {}
+        abs_tick = 0
+        last_ns = 0
+        for i, msg in enumerate(messages):
+            pending[i] = msg
+            abs_tick += msg["time"]
+            now_ns = tick_to_ns(abs_tick)
+            timing[i] = [abs_tick, now_ns, now_ns - last_ns]
+            last_ns = now_ns
+            if msg["type"] == "note_on" and msg["velocity"] != 0:
+                if timing[i][2] < min_release_ns and release_positions.get(msg["note"]):
+                    diff_ns = min_release_ns - timing[i][2]
+                    for j in reversed(release_positions[msg["note"]]):
+                        if timing[j][2] > diff_ns + min_release_ns:
+                            self._advance_release(pending, timing, j, diff_ns)
+                            next_msg = pending[j + 1]
+                            if (j + 1 < i and self._is_release(next_msg)
+                                    and timing[j + 1][2] > min_release_ns):
+                                next_positions = release_positions.setdefault(next_msg["note"], [])
+                                index = bisect.bisect_left(next_positions, j + 1)
+                                if index == len(next_positions) or next_positions[index] != j + 1:
+                                    next_positions.insert(index, j + 1)
+                            break
+            elif self._is_release(msg) and timing[i][2] > min_release_ns:
+                release_positions.setdefault(msg["note"], []).append(i)
+
+            if len(pending) > lookahead:
+                yield self._pop_pending(pending, timing, first, release_positions)
+                first += 1
+        while pending:
+            yield self._pop_pending(pending, timing, first, release_positions)
+            first += 1
+
+    @staticmethod
+    def _pop_pending(pending, timing, position, release_positions):
+        """输出窗口中最早的消息，并把它从释放位置索引中移除"""
+        msg = pending.pop(position)
+        del timing[position]
+        positions = release_positions.get(msg.get("note"))
+        if positions and positions[0] == position:
+            positions.pop(0)
+        return msg
+
+    def _message_timing(self, track):
+        """
+        按速度映射计算每条消息的[绝对tick, 播放时间, 与上一条消息的间隔]，播放时间和间隔单位为纳秒
+        """
+        tick_to_ns = self.tempo_map.tick_to_ns
+        timing = []
+        last_ns = 0
+        for abs_tick in itertools.accumulate(msg["time"] for msg in track):
+            now_ns = tick_to_ns(abs_tick)
+            timing.append([abs_tick, now_ns, now_ns - last_ns])
+            last_ns = now_ns
+        return timing
+
+    def _advance_release(self, messages, timing, j, diff_ns):
+        """
+        把位置j的释放消息提前diff_ns纳秒，之后一条消息的间隔相应增加，其余消息的播放时间不变
+
+        提前量按释放消息所在位置的速度换算为tick，跨越速度变化时同样准确
+        """
+        release = timing[j]
+        release[1] -= diff_ns
+        release_tick = self.tempo_map.ns_to_tick(release[1])
+        ticks_diff = release[0] - release_tick
+        release[0] = release_tick
+        release[2] -= diff_ns
+        timing[j + 1][2] += diff_ns
+        messages[j]["time"] -= ticks_diff
+        messages[j + 1]["time"] += ticks_diff
+
+    def _load_tempo_map(self, mid):
+        """
+        根据MIDI文件的set_tempo事件建立速度映射
+
+        用户BPM作为整体缩放系数，120为原速；释放间隔优化也按速度映射换算每条消息的播放时间
+        """
         self.ticks_per_beat = mid.ticks_per_beat
-        mid_list = self.to_list(mid)
-        mid_list = self.adjust_midi(mid_list, track_num)
-        
+        self.tempo_map = TempoMap.from_midi(mid, self.bpm)
+        if len(self.tempo_map) > 1:
+            logger.info("MIDI包含 {} 段速度", len(self.tempo_map))
+
+    def _merge_selected(self, tracks):
+        """
+        合并选中的音轨消息流
+
+        只有一条音轨时原样返回；多条音轨时按绝对时间做k路合并，
+        并处理不同音轨按到同一按键的冲突，限制同时按下的按键数不超过max_polyphony；
+        超出时先选中的音轨优先（如--track 2 1时音轨2优先）
+        """
+        tracks = list(tracks)
+        if len(tracks) == 1:
+            return iter(tracks[0])
+        return self._log_collisions(resolve_key_collisions(
+            merge_message_streams(tracks, track_field="track"), self.map, self.max_polyphony, self.merge_stats,
+            priority=operator.itemgetter("track")))
+
+    def _log_collisions(self, messages):
+        self.merge_stats.update(collisions=0, dropped=0, preempted=0)
+        yield from messages
+        logger.info("多音轨合并完成，合并的重复按键: {}, 超出复音数丢弃的音符: {}, 被优先音轨提前松开的音符: {}",
+                    self.merge_stats['collisions'], self.merge_stats['dropped'], self.merge_stats['preempted'])
+
+    def stream_midi(self, mid, track_num=1, lookahead=None, shift=None):
+        """
+        流式处理指定音轨，逐个生成按键批次
+
+        读取消息、合并多条音轨、移调、释放间隔优化和批次编译串联为生成器流水线，
+        只需要有限的前瞻窗口，内存占用与文件长度无关
+
+        :param shift: 已知的总半音调整量，为None时根据开头的消息识别调式
+        """
+        lookahead = lookahead or self.STREAM_LOOKAHEAD
+        messages = self._merge_selected(
+            (msg.dict() if msg.type in ("note_on", "note_off") else {"type": "other", "time": msg.time}
+             for msg in mid.tracks[num - 1])
+            for num in self._track_numbers(track_num))
+        messages = self._stream_transpose(messages, lookahead, shift)
+        messages = self._stream_release_fix(messages, lookahead)
+        return iter_note_batches(messages, self.map, self.tempo_map)
+
+    def _stream_to_queue(self, batches, playback_queue, stop_event):
+        """生产者线程：把流式生成的批次放入播放队列，结束时放入None"""
+        try:
+            for batch in batches:
+                if not self._put_until_stopped(playback_queue, batch, stop_event):
+                    return
+        except Exception as e:
+            logger.error("流式处理MIDI失败: {}", e)
+        self._put_until_stopped(playback_queue, None, stop_event)
+
+    @staticmethod
+    def _put_until_stopped(playback_queue, item, stop_event):
+        while not stop_event.is_set():
+            try:
+                playback_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def play_midi(self, file_path, bpm=120, track_num=1, stream=False):
+        """
+        播放MIDI文件
+
+        :param track_num: 音轨编号（从1开始），传入列表时合并播放多条音轨
+        :param stream: 是否使用流式模式，在切换窗口的等待期间边处理边缓冲，适合很长的MIDI文件
+        """
+        if stream:
+            self.play_midi_stream(file_path, bpm, track_num)
+            return
+
+        schedule = self.compile_midi(file_path, bpm, track_num)
+        if schedule is None:
+            return
+
         # 延时2秒，让用户有时间切换到目标窗口
         logger.info("程序将在2秒后开始播放，请切换到目标窗口...")
         time.sleep(2)
-        
+
+        logger.info("开始播放第 {} 条音轨", track_num)
+        self.play_schedule(schedule)
+
+    def play_midi_stream(self, file_path, bpm=120, track_num=1):
+        """流式播放MIDI文件，处理线程在等待切换窗口时就开始填充播放队列"""
+        self.bpm = bpm
+        mid = self.read_midi(file_path)
+        if mid is None:
+            return
+        self._load_tempo_map(mid)
+        if not self._check_track_numbers(self._track_numbers(track_num), len(mid.tracks)):
+            return
+
+        playback_queue = queue.Queue(maxsize=self.STREAM_QUEUE_SIZE)
+        stop_event = threading.Event()
+        threading.Thread(target=self._stream_to_queue,
+                         args=(self.stream_midi(mid, track_num, shift=self.indexed_shift(file_path, track_num)),
+                               playback_queue, stop_event),
+                         daemon=True).start()
+
+        # 延时2秒，让用户有时间切换到目标窗口
+        logger.info("程序将在2秒后开始播放，请切换到目标窗口...")
+        time.sleep(2)
+
+        logger.info("开始流式播放第 {} 条音轨", track_num)
+        try:
+            self.play_batches(iter(playback_queue.get, None))
+        finally:
+            stop_event.set()
+
+    def play_schedule(self, schedule):
+        """
+        按编译好的时间表播放
+
+        所有事件都相对于同一个单调时钟起点调度，计时误差不会随歌曲长度累积
+        """
+        self.play_batches(schedule.batches)
+
+    def play_batches(self, batches):
+        """
+        按顺序播放按键批次
+
+        :param batches: NoteBatch的可迭代对象，可以是时间表，也可以是流式生成的队列
+        """
         # 获取当前聚焦窗口
-        target_window = gw.getActiveWindow()
+        target_window = gw.getActiveWindow() if gw else None
         if target_window:
-            logger.info(f"当前聚焦窗口: {target_window.title}")
+            logger.info("当前聚焦窗口: {}", target_window.title)
         else:
             logger.warning("未检测到聚焦窗口，将在当前窗口播放")
-        
-        # 跟踪每个音符的状态
-        note_states = {}
-        start_time = time.time()
-        # 将从1开始的音轨编号转换为从0开始的索引
-        actual_track_num = track_num - 1
-        
-        # 播放指定音轨
-        if actual_track_num < len(mid_list):
-            logger.info(f"开始播放第 {track_num} 条音轨")
-            track = mid_list[actual_track_num]
-            for i in range(len(track)):
-                msg = track[i]
-                if "note" not in msg.keys():
-                    continue
-                
-                delete_time = msg["time"] / self.ticks_per_beat * self.tempo
-                # 确保睡眠时间为非负数
-                delete_time = max(delete_time, 0)
-                delete_time = delete_time - (time.time() - start_time)
-                time.sleep(max(delete_time, 0))
-                start_time = time.time()
-                
-                # 检查窗口是否切换（每10个消息检查一次，减少开销）
-                if i % 10 == 0:
-                    current_window = gw.getActiveWindow()
-                    if target_window and current_window != target_window:
-                        logger.info(f"窗口已切换，从 {target_window.title} 切换到 {current_window.title}，终止播放")
-                        # 释放所有按键
-                        for key in self.map.values():
-                            self.controller.key(key, False)
-                        return
-
-                if msg["note"] not in self.map.keys():
-                    logger.error(f"note {msg['note']} not in map")
-                    continue
-                
-                note = msg["note"]
-                key = self.map[note]
-                
-                # 处理音符消息
-                if msg["type"] == "note_on" and msg["velocity"] > 0:
-                    logger.debug(f"press {key}")
-                    self.controller.key(key, True)
-                    note_states[note] = {"type": "on", "time": time.time()}
-                elif msg["type"] == "note_off" or msg["velocity"] == 0:
-                    logger.debug(f"release {key}")
-                    self.controller.key(key, False)
-                    note_states[note] = {"type": "off", "time": time.time()}
-        else:
-            logger.error(f"音轨编号 {track_num} 超出范围，总共有 {len(mid_list)} 条音轨")
+
+        self.clock.start()
+        try:
+            self._play_events(batches, target_window)
+        finally:
+            self.timing_stats = self.clock.stats()
+            logger.info("播放延迟统计: 批次数 {}, p50 {:.3f}ms, p99 {:.3f}ms, 最大 {:.3f}ms", self.timing_stats['count'],
+                        self.timing_stats['p50_ms'], self.timing_stats['p99_ms'], self.timing_stats['max_ms'])
+
+    def _play_events(self, batches, target_window):
+        for i, batch in enumerate(batches):
+            self.clock.wait_until(batch.deadline_ns)
+
+            # 检查窗口是否切换（每10个批次检查一次，减少开销）
+            if target_window and i % 10 == 0:
+                current_window = gw.getActiveWindow()
+                if target_window and current_window != target_window:
+                    logger.info("窗口已切换，从 {} 切换到 {}，终止播放", target_window.title, current_window.title)
+                    # 释放所有按键
+                    for key in self.map.values():
+                        self.controller.key(key, False)
+                    return
+
+            # 同一时刻的按键一次性发送，和弦内的音符几乎同时落下
+            self.controller.key_batch(batch.actions)
 
     def __del__(self):
+        # 没有创建过控制器时无需释放按键
+        if getattr(self, "_controller", None) is None:
+            return
         try:
             for key in self.map.values():
                 self.controller.key(key, False)
@@ -353,6 +822,72 @@ class GenshinImpactMusicPlayer:
             # 忽略在__del__方法中可能出现的异常，因为此时某些资源可能已经被释放
             pass
             
+# 分析进程中复用的播放器实例，不创建按键控制器，也不读写缓存
+_analysis_player = None
+
+
+def _analyze_file(job):
+    """
+    分析进程的任务函数：分析单个MIDI文件
+
+    :param job: (文件路径, 音轨编号元组)
+    :return: (文件路径, 分析结果或None, 错误信息或None)
+    """
+    global _analysis_player
+    file_path, track_nums = job
+    if _analysis_player is None:
+        _analysis_player = GenshinImpactMusicPlayer(song_cache=False, library_index=False)
+    try:
+        return file_path, _analysis_player.analyze_midi(mido.MidiFile(file_path), track_nums), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def analyze_library(directory, track_num=1, index_path=None, workers=None):
+    """
+    使用进程池预分析目录（含子目录）中的所有MIDI文件，结果写入曲库索引
+
+    已分析且未修改的文件会被跳过，播放器和GUI之后直接复用索引中的调式和移调量
+
+    :param directory: MIDI文件目录
+    :param track_num: 用于识别调式的音轨编号（从1开始），可以是列表
+    :param index_path: 索引文件路径，默认为应用目录下的cache/library_index.json
+    :param workers: 进程数，默认为CPU核心数
+    :return: 曲库索引（MidiLibraryIndex实例）
+    """
+    index = MidiLibraryIndex(index_path) if index_path else MidiLibraryIndex()
+    track_nums = GenshinImpactMusicPlayer._track_numbers(track_num)
+    jobs = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.lower().endswith((".mid", ".midi")):
+                continue
+            file_path = os.path.join(root, name)
+            entry = index.get(file_path)
+            if entry is None or entry.get("track") != list(track_nums):
+                jobs.append((file_path, track_nums))
+    logger.info("需要分析 {} 个MIDI文件，已分析 {} 个", len(jobs), len(index))
+    if not jobs:
+        return index
+
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 每个任务很短，按块分发以减少进程间通信次数
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        for done, (file_path, entry, error) in enumerate(executor.map(_analyze_file, jobs, chunksize=chunksize), 1):
+            if entry is None:
+                failed += 1
+                logger.warning("分析 {} 失败: {}", file_path, error or '音轨编号无效')
+            else:
+                index.put(file_path, entry)
+            if done % 100 == 0:
+                logger.info("分析进度: {}/{}", done, len(jobs))
+    logger.info("分析完成，成功 {} 个，失败 {} 个，耗时 {:.2f}秒", len(jobs) - failed, failed, time.perf_counter() - start)
+    index.save()
+    return index
+
+
 class MusicPlayerGUI:
     def __init__(self, master):
         self.master = master
@@ -443,9 +978,14 @@ class MusicPlayerGUI:
             self.available_tracks = list(range(1, len(mid.tracks) + 1))
             self.track_combobox['values'] = self.available_tracks
             self.track_var.set(str(1))  # 默认选择第一条音轨
-            self.status_var.set(f"文件包含 {len(mid.tracks)} 条音轨")
+            status = f"文件包含 {len(mid.tracks)} 条音轨"
+            # 曲库索引中有预分析结果时一并显示，播放时也会直接复用
+            entry = self.music_player.library_index.get(file_path) if self.music_player.library_index else None
+            if entry is not None:
+                status += f"，{entry['key']}，时长 {entry['duration']:.0f}秒，调外音 {entry['out_of_map']} 个"
+            self.status_var.set(status)
         except Exception as e:
-            logger.error(f"读取MIDI文件失败: {e}")
+            logger.error("读取MIDI文件失败: {}", e)
             self.status_var.set(f"读取文件失败: {e}")
     
     def play_music(self):
@@ -482,7 +1022,7 @@ class MusicPlayerGUI:
             self.music_player.play_midi(file_path, bpm, track_num)
             self.status_var.set("播放完成")
         except Exception as e:
-            logger.error(f"播放失败: {e}")
+            logger.error("播放失败: {}", e)
             self.status_var.set(f"播放失败: {e}")
         finally:
             self.is_playing = False
@@ -494,17 +1034,32 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         # 创建命令行参数解析器
         parser = argparse.ArgumentParser(description="播放MIDI文件")
-        # 添加文件路径参数（必填）
-        parser.add_argument("file_path", help="MIDI文件路径")
+        # 添加文件路径参数（播放时必填）
+        parser.add_argument("file_path", nargs="?", help="MIDI文件路径")
         # 添加bpm参数（可选，默认120）
         parser.add_argument("--bpm", type=int, default=120, help="播放速度（默认120）")
         # 添加track参数（可选，默认0）
-        parser.add_argument("--track", type=int, default=1, help="用于调式识别的音轨编号（默认0）")
+        parser.add_argument("--track", type=int, nargs="+", default=[1], help="播放的音轨编号，可指定多个合并播放（默认1）")
+        # 添加stream参数（可选），边处理边播放，适合很长的MIDI文件
+        parser.add_argument("--stream", action="store_true", help="流式播放，无需等待整个文件处理完成")
+        parser.add_argument("--max-polyphony", type=int, default=None,
+                            help="多音轨合并时最多同时按下的按键数，只能调低（默认为映射中的按键数）")
+        # 添加analyze参数（可选），预分析整个曲库目录，不进行播放
+        parser.add_argument("--analyze", metavar="DIR", help="使用多进程预分析目录中的所有MIDI文件并写入曲库索引")
+        parser.add_argument("--workers", type=int, default=None, help="预分析使用的进程数（默认CPU核心数）")
+        parser.add_argument("--index", default=None, help="曲库索引文件路径（默认为应用目录下的cache/library_index.json）")
         # 解析命令行参数
         args = parser.parse_args()
+        if args.analyze:
+            analyze_library(args.analyze, args.track, args.index, args.workers)
+            sys.exit(0)
+        if not args.file_path:
+            parser.error("需要指定MIDI文件路径")
         # 播放MIDI文件
-        music_player = GenshinImpactMusicPlayer()
-        music_player.play_midi(args.file_path, args.bpm, args.track)
+        music_player = GenshinImpactMusicPlayer(library_index=MidiLibraryIndex(args.index) if args.index else None,
+                                                max_polyphony=args.max_polyphony)
+        track_num = args.track[0] if len(args.track) == 1 else args.track
+        music_player.play_midi(args.file_path, args.bpm, track_num, stream=args.stream)
     else:
         # 没有参数则启动GUI模式
         root = tk.Tk()
@@ -1,15 +1,24 @@
 import time
 import sys
 import os
+import argparse
 import traceback
+import queue
+import threading
 import numpy as np
 from collections import deque
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from utils.hgr_utils import HGRUtils, HandLandmark
-from utils.gui_utils import GUIController
-from utils.logger import logger
+from utils.hgr_utils import (HGRUtils, HandLandmark, FrameSource, VideoFileSource, ImageSequenceSource,
+                             LandmarkSource)
+from utils.gui_utils import GUIController, RecordingBackend
+from utils.frame_ring import FrameRing
+from utils.histogram import DurationHistogram
+from utils.logger import get_logger, log_rates
+
+logger = get_logger(__name__)
+
 
 class GestureControl:
     """
@@ -24,18 +33,42 @@ class GestureControl:
     DEFAULT_DATA_DIR = "./data"
     DEFAULT_CONTROL_METHOD = "hardware"
     MAX_ERROR_COUNT = 5  # 最大错误次数
+    MOUSE_MOVE_RATE = 60  # 每秒最多实际移动鼠标的次数，与摄像头帧率无关
+    MOUSE_MIN_DELTA = 1  # 小于该像素差的鼠标移动直接丢弃
+    PIPELINE_QUEUE_SIZE = 2  # 流水线模式下识别结果队列的长度，满时丢弃最旧的结果
+    PIPELINE_STAGES = ("capture", "inference", "queue", "control")
+    ROI_TRACKING = True  # 只识别上一帧手部周围的区域，并按识别耗时调整识别分辨率
+    ADAPTIVE_SKIP = True  # 手稳定或识别来不及时跳过部分帧的识别，中间帧按速度外推关键点
     
-    def __init__(self, data_dir=None, control_method=None):
+    def __init__(self, data_dir=None, control_method=None, input_backend=None, pipelined=False,
+                 source: FrameSource = None, roi_tracking=None, adaptive_skip=None, inference_workers=0,
+                 max_num_hands=None):
         """
         初始化手势控制系统
         
         Args:
             data_dir (str, optional): 数据目录路径，默认为"./data"
             control_method (str, optional): 控制方法，默认为"hardware"
+            input_backend (InputBackend, optional): 鼠标控制的输入后端，默认使用pynput；
+                传入RecordingBackend时只记录鼠标操作，不需要显示器
+            pipelined (bool, optional): 是否使用流水线模式，采集、手势识别和功能模块分别在各自的线程中运行
+            source (FrameSource, optional): 画面来源，默认使用摄像头；传入视频文件、图片目录或录制的关键点来源时
+                可以离线回放，来源不按实时节奏产生画面时不再控制帧率，尽快处理
+            roi_tracking (bool, optional): 是否使用ROI跟踪和自适应识别分辨率，默认为ROI_TRACKING
+            adaptive_skip (bool, optional): 是否自适应跳帧，默认为ADAPTIVE_SKIP；跳帧时功能模块每帧仍然收到外推的关键点
+            inference_workers (int, optional): 大于0时在独立进程中运行MediaPipe，画面通过共享内存传递
+            max_num_hands (int, optional): 每帧最多识别的手数，默认为HGRUtils.MAX_NUM_HANDS
         """
         # 使用默认值或传入的参数
         self.data_dir = data_dir or self.DEFAULT_DATA_DIR
         self.control_method = control_method or self.DEFAULT_CONTROL_METHOD
+        self.input_backend = input_backend
+        self.pipelined = pipelined
+        self.source = source
+        self.roi_tracking = self.ROI_TRACKING if roi_tracking is None else roi_tracking
+        self.adaptive_skip = self.ADAPTIVE_SKIP if adaptive_skip is None else adaptive_skip
+        self.inference_workers = inference_workers
+        self.max_num_hands = max_num_hands
 
         self.is_paused = False
         
@@ -47,6 +80,17 @@ class GestureControl:
         self.frame_count = 0
         self.start_time = time.time()
         self.frame_times = deque(maxlen=60)
+        # 最近60帧从摄像头采集完成到鼠标操作提交的延迟（毫秒）
+        self.frame_latencies = deque(maxlen=60)
+        # 流水线模式下各阶段的耗时统计：等待新帧、手势识别、结果在队列中等待、功能模块更新
+        self.stage_stats = {stage: DurationHistogram() for stage in self.PIPELINE_STAGES}
+        # 流水线模式下因控制阶段来不及处理而丢弃的识别结果数
+        self.dropped_results = 0
+        self._inference_thread = None
+        # 流水线模式下识别结果的槽位：队列中最多PIPELINE_QUEUE_SIZE个、控制阶段正在使用1个、识别阶段正在写入1个；
+        # 队列中只传递槽位编号，控制阶段处理完或结果被丢弃时槽位放回空闲队列
+        self.result_ring = None
+        self._free_result_slots = queue.Queue()
         
         # 初始化组件
         self._initialize_components()
@@ -59,15 +103,24 @@ class GestureControl:
             GestureMouse(self.gui_controller)
         ]
         
-        logger.info(f"手势控制系统初始化完成 - 数据目录: {self.data_dir}, 控制方法: {self.control_method}")
+        logger.info("手势控制系统初始化完成 - 数据目录: {}, 控制方法: {}", self.data_dir, self.control_method)
     
     def _initialize_components(self):
         """初始化核心组件"""
         try:
-            self.hgr_utils = HGRUtils(self.data_dir)
-            self.gui_controller = GUIController()
+            # 使用摄像头时使用后台采集线程，识别时总是取最新一帧
+            # ROI跟踪模式下只识别手部周围的区域，识别耗时超出目标帧率的预算时降低识别分辨率
+            self.hgr_utils = HGRUtils(self.data_dir, threaded_capture=True, source=self.source,
+                                      roi_tracking=self.roi_tracking, target_fps=self.TARGET_FPS,
+                                      adaptive_skip=self.adaptive_skip, max_num_hands=self.max_num_hands,
+                                      inference_workers=self.inference_workers)
+            # 使用异步派发线程，点击的按下和释放不会阻塞帧循环；
+            # 鼠标移动合并为最新目标，并限制实际移动频率（离线尽快回放时按墙钟限频没有意义，且会让结果不可重复）
+            self.gui_controller = GUIController(self.input_backend, async_dispatch=True, coalesce_moves=True,
+                                                min_move_delta=self.MOUSE_MIN_DELTA,
+                                                max_move_rate=self.MOUSE_MOVE_RATE if self._is_paced() else None)
         except Exception as e:
-            logger.error(f"组件初始化失败: {e}")
+            logger.error("组件初始化失败: {}", e)
             raise
 
     def test(self):
@@ -77,24 +130,30 @@ class GestureControl:
             if hand_landmarks is None or len(hand_landmarks) == 0:
                 logger.info("未检测到手部")
                 return
-            logger.debug(f"手部关键点: {hand_landmarks}")
-            logger.debug(f"食指指尖坐标: {hand_landmarks[0].landmark[
+            # 延迟格式化，DEBUG未开启时不会把整组关键点转换为字符串
+            logger.debug("手部关键点: {}", hand_landmarks)
+            logger.debug("食指指尖坐标: {}", hand_landmarks[0].landmark[
                 self.hgr_utils.mp_hands.HandLandmark.INDEX_FINGER_TIP
-            ]}")
+            ])
         except Exception as e:
-            logger.error(f"测试过程中发生错误: {e}")
+            logger.error("测试过程中发生错误: {}", e)
 
     def start(self):
         """启动手势控制主循环"""
         logger.info("手势控制已启动，按Ctrl+C退出...")
         self.is_running = True
+        self.frame_count = 0
+        self.start_time = time.time()
         
         try:
-            self._run_main_loop()
+            if self.pipelined:
+                self._run_pipeline()
+            else:
+                self._run_main_loop()
         except KeyboardInterrupt:
             logger.info("手势控制已停止")
         except Exception as e:
-            logger.error(f"发生错误: {e}")
+            logger.error("发生错误: {}", e)
             logger.error(traceback.format_exc())
         finally:
             self._cleanup()
@@ -111,6 +170,7 @@ class GestureControl:
                 result = self._process_gesture_data()
                 if result is None:
                     break
+                self.frame_count += 1
                 if not result:
                     # 即使没有手势数据，也要控制帧率
                     self._control_frame_rate(frame_start_time)
@@ -127,7 +187,7 @@ class GestureControl:
                 
                 # 如果错误次数过多，停止运行
                 if self.error_count >= self.MAX_ERROR_COUNT:
-                    logger.error(f"错误次数过多({self.error_count}次)，停止运行")
+                    logger.error("错误次数过多({}次)，停止运行", self.error_count)
                     self.is_running = False
                     break
     
@@ -135,42 +195,190 @@ class GestureControl:
         """处理手势数据并更新功能模块"""
         try:
             # 获取手势数据（添加超时保护）
-            hand_landmarks_list, image = self.hgr_utils.get_all_hand_landmarks()
+            image = self.hgr_utils.get_camera_frame()
             if image is None:
                 return None
+            frame_timestamp_ns = self.hgr_utils.frame_timestamp_ns
+            self.hgr_utils.frame_age_ms = (time.perf_counter_ns() - frame_timestamp_ns) / 1e6
+            # 直接使用识别结果缓冲区的视图，功能模块在下一帧识别之前处理完，不需要复制
+            hand_landmarks, _, _ = self.hgr_utils.get_result_views(image)
             # self.hgr_utils.display_results(image)
-            if len(hand_landmarks_list) == 0:
-                if not self.is_paused:
-                    for function in self.function_list:
-                        function.pause()
-                        self.is_paused = True
-                return False
-            else:
-                self.is_paused = False
-
-            # 更新所有功能模块
-            for function in self.function_list:
-                function.update(hand_landmarks_list)
-            
-            return True
+            return self._update_functions(hand_landmarks, frame_timestamp_ns)
                 
         except Exception as e:
-            logger.error(f"处理手势数据时发生错误: {e}")
+            logger.error("处理手势数据时发生错误: {}", e)
             # 错误计数增加
             self.error_count += 1
             # 如果错误次数过多，停止运行
             if self.error_count >= self.MAX_ERROR_COUNT:
-                logger.error(f"错误次数过多({self.error_count}次)，停止运行")
+                logger.error("错误次数过多({}次)，停止运行", self.error_count)
                 self.is_running = False
             return False
     
+    def _update_functions(self, hand_landmarks_list, frame_timestamp_ns):
+        """
+        用识别结果更新所有功能模块，没有检测到手时暂停
+
+        Args:
+            hand_landmarks_list: 每只手(21, 3)关键点的列表或(手数, 21, 3)数组
+            frame_timestamp_ns (int): 画面的采集时间戳
+
+        Returns:
+            bool: 是否检测到手
+        """
+        if len(hand_landmarks_list) == 0:
+            if not self.is_paused:
+                for function in self.function_list:
+                    function.pause()
+                    self.is_paused = True
+            return False
+        else:
+            self.is_paused = False
+
+        # 更新所有功能模块
+        for function in self.function_list:
+            function.update(hand_landmarks_list)
+        self.frame_latencies.append((time.perf_counter_ns() - frame_timestamp_ns) / 1e6)
+        return True
+
+    def _run_pipeline(self):
+        """
+        流水线模式：采集线程 → 识别线程 → 功能模块（当前线程）
+
+        阶段之间使用有界队列，识别结果队列满时丢弃最旧的结果，控制阶段总是处理较新的帧；
+        每帧的延迟仍然从采集完成开始计算
+        """
+        results_queue = queue.Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+        self.result_ring = FrameRing(self.PIPELINE_QUEUE_SIZE + 2, max_num_hands=self.hgr_utils.max_num_hands)
+        self._free_result_slots = queue.Queue()
+        for slot in range(len(self.result_ring)):
+            self._free_result_slots.put(slot)
+        self._inference_thread = threading.Thread(target=self._inference_stage, args=(results_queue,),
+                                                  name="GestureInference", daemon=True)
+        self._inference_thread.start()
+
+        while self.is_running:
+            try:
+                item = results_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            slot, frame_timestamp_ns, queued_ns = item
+            self.frame_count += 1
+            start_ns = time.perf_counter_ns()
+            self.stage_stats["queue"].record(start_ns - queued_ns)
+            try:
+                hand_landmarks, _, _ = self.result_ring.hands(slot)
+                self._update_functions(hand_landmarks, frame_timestamp_ns)
+                self.error_count = 0
+            except Exception as e:
+                self._handle_error(e)
+                if self.error_count >= self.MAX_ERROR_COUNT:
+                    logger.error("错误次数过多({}次)，停止运行", self.error_count)
+                    break
+            finally:
+                self._free_result_slots.put(slot)
+            self.stage_stats["control"].record(time.perf_counter_ns() - start_ns)
+        self.is_running = False
+
+    def _inference_stage(self, results_queue):
+        """
+        识别线程：取最新一帧进行手势识别，结果写入空闲的结果槽位，槽位编号放入队列
+
+        离线尽快回放时改为等待队列有空位，不丢弃结果，保证每一帧都经过功能模块，回放结果可重复
+        """
+        put = self._put_latest if self._is_paced() else self._put_blocking
+        try:
+            while self.is_running:
+                wait_start_ns = time.perf_counter_ns()
+                image = self.hgr_utils.get_camera_frame()
+                if image is None:
+                    break
+                start_ns = time.perf_counter_ns()
+                self.stage_stats["capture"].record(start_ns - wait_start_ns)
+                frame_timestamp_ns = self.hgr_utils.frame_timestamp_ns
+                self.hgr_utils.frame_age_ms = (start_ns - frame_timestamp_ns) / 1e6
+                # 槽位总数比队列长度多2个，正常情况下总有空闲槽位；没有时等待控制阶段放回
+                slot = self._acquire_result_slot()
+                if slot is None:
+                    break
+                try:
+                    self.hgr_utils.get_result_into(image, self.result_ring, slot)
+                except Exception as e:
+                    self._free_result_slots.put(slot)
+                    logger.error("手势识别时发生错误: {}", e)
+                    continue
+                done_ns = time.perf_counter_ns()
+                self.stage_stats["inference"].record(done_ns - start_ns)
+                put(results_queue, (slot, frame_timestamp_ns, done_ns))
+        except Exception as e:
+            logger.error("识别线程异常退出: {}", e)
+        finally:
+            # 通知控制阶段结束
+            put(results_queue, None)
+
+    def _acquire_result_slot(self):
+        """等待空闲的结果槽位，控制阶段停止后返回None"""
+        while self.is_running:
+            try:
+                return self._free_result_slots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _is_paced(self):
+        """画面来源是否按实时节奏产生画面（摄像头或实时回放）"""
+        return self.source is None or self.source.paced
+
+    def _put_blocking(self, results_queue, item):
+        """等待队列有空位再放入，控制阶段停止后放弃"""
+        while self.is_running:
+            try:
+                results_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _put_latest(self, results_queue, item):
+        """放入队列，队列满时丢弃最旧的结果"""
+        while True:
+            try:
+                results_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = results_queue.get_nowait()
+                    self.dropped_results += 1
+                    if dropped is not None:
+                        self._free_result_slots.put(dropped[0])
+                except queue.Empty:
+                    pass
+
+    def throughput(self):
+        """启动以来处理的帧数、耗时（秒）和平均帧率"""
+        elapsed = time.time() - self.start_time
+        return {
+            "frames": self.frame_count,
+            "elapsed_s": round(elapsed, 3),
+            "fps": round(self.frame_count / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def pipeline_stats(self):
+        """流水线各阶段的耗时统计（毫秒）和丢弃的识别结果数"""
+        stats = {stage: histogram.summary() for stage, histogram in self.stage_stats.items()}
+        stats["dropped_results"] = self.dropped_results
+        return stats
+
     def _control_frame_rate(self, start_time):
         """
-        控制帧率，确保稳定的运行频率
+        控制帧率，确保稳定的运行频率；画面来源不按实时节奏产生画面（离线尽快回放）时不等待
         
         Args:
             start_time (float): 当前循环开始的时间戳
         """
+        if not self._is_paced():
+            return
         try:
             elapsed_time = time.time() - start_time
             sleep_time = self.frame_time - elapsed_time
@@ -179,7 +387,7 @@ class GestureControl:
                 time.sleep(sleep_time)
 
         except Exception as e:
-            logger.error(f"帧率控制时发生错误: {e}")
+            logger.error("帧率控制时发生错误: {}", e)
 
     def _handle_error(self, error):
         """
@@ -189,7 +397,7 @@ class GestureControl:
             error (Exception): 发生的错误对象
         """
         self.error_count += 1
-        logger.error(f"发生错误 (第{self.error_count}次): {error}")
+        logger.error("发生错误 (第{}次): {}", self.error_count, error)
         
         # 短暂延迟，避免错误循环过快
         time.sleep(0.1)
@@ -200,13 +408,28 @@ class GestureControl:
         self.is_running = False
         
         try:
+            logger.info("处理吞吐量: {}", self.throughput())
+            if self._inference_thread is not None:
+                self._inference_thread.join(1.0)
+                logger.info("流水线各阶段统计: {}", self.pipeline_stats())
             if hasattr(self, 'hgr_utils'):
+                logger.info("手势识别统计: {}", self.hgr_utils.inference_stats())
                 if hasattr(self.hgr_utils, 'cleanup'):
                     self.hgr_utils.cleanup()
+            if self.frame_latencies:
+                logger.info("摄像头到鼠标的延迟: 平均 {:.1f}ms, 最大 {:.1f}ms（最近{}帧）",
+                            np.mean(self.frame_latencies), np.max(self.frame_latencies), len(self.frame_latencies))
+            if hasattr(self, 'gui_controller'):
+                # 停止派发线程前会执行剩余命令，避免鼠标按钮保持按下
+                self.gui_controller.close()
+                if self.gui_controller.dispatcher is not None:
+                    logger.info("输入派发延迟统计: {}", self.gui_controller.dispatcher.stats())
+                logger.info("鼠标移动统计: {}", self.gui_controller.move_stats)
+            logger.info("各模块日志输出频率（条/秒）: {}", log_rates())
             
             logger.info("资源清理完成")
         except Exception as e:
-            logger.error(f"清理资源时发生错误: {e}")
+            logger.error("清理资源时发生错误: {}", e)
 
 
 class GestureMouse:
@@ -223,12 +446,22 @@ class GestureMouse:
     # 优化后的常量定义
     CLICK_DISTANCE_THRESHOLD = 8  # 降低点击阈值，提高灵敏度
     SMOOTHING_WINDOW_SIZE = 5  # 增加平滑窗口大小，减少抖动
+    SMOOTHING_DECAY = 0.7  # 平滑权重的衰减因子，越小衰减越快
     MIN_MOVEMENT_THRESHOLD = 1  # 降低移动阈值，提高灵敏度
     SENSITIVITY = 1500.0
     SCALE = 1.3
+    # 参与平滑的指尖，顺序与平滑结果的行对应
+    TRACKED_FINGERS = (HandLandmark.THUMB_TIP, HandLandmark.INDEX_FINGER_TIP, HandLandmark.MIDDLE_FINGER_TIP)
     
-    def __init__(self, gui_controller: GUIController):
-        """初始化手势鼠标控制（优化版本）"""
+    def __init__(self, gui_controller: GUIController, window_size: int = None, decay: float = None):
+        """
+        初始化手势鼠标控制（优化版本）
+
+        Args:
+            gui_controller: GUI控制器
+            window_size: 位置平滑窗口大小（帧数），默认SMOOTHING_WINDOW_SIZE
+            decay: 平滑权重的衰减因子，默认SMOOTHING_DECAY
+        """
         self.gui_controller = gui_controller
         self.is_click = False
         self.is_dragging = False
@@ -237,21 +470,25 @@ class GestureMouse:
         
         # 位置平滑 - 使用相对坐标初始化（0-1范围）
         initial_pos = [0.5, 0.5, 1.0]  # 屏幕中心对应的相对坐标
+        self.window_size = window_size or self.SMOOTHING_WINDOW_SIZE
+        self.decay = self.SMOOTHING_DECAY if decay is None else decay
       
-        self.thumb_location_list = np.tile([initial_pos], (self.SMOOTHING_WINDOW_SIZE, 1))
-        self.index_location_list = np.tile([initial_pos], (self.SMOOTHING_WINDOW_SIZE, 1))
-        self.middle_location_list = np.tile([initial_pos], (self.SMOOTHING_WINDOW_SIZE, 1))
-        
+        # 所有指尖共用一个(指尖数, 窗口大小, 3)的环形缓冲区，按写入位置覆盖最旧的数据，不再每帧np.roll
+        self._location_ring = np.tile([initial_pos], (len(self.TRACKED_FINGERS), self.window_size, 1))
+        self._ring_index = self.window_size - 1  # 最近一次写入的位置
+        self._smoothed = np.empty((len(self.TRACKED_FINGERS), 3))
+        self._finite = np.empty((len(self.TRACKED_FINGERS), 3), dtype=bool)
 
         self.thumb_middle_finger_distance = 0.0
         self.thumb_index_finger_distance = 0.0
         
         # 性能优化 - 使用指数衰减权重，让最近的数据权重更大
         # 权重分布：最近的数据权重最大，逐渐衰减
-        decay_factor = 0.7  # 衰减因子，越小衰减越快
-        self._weights = np.array([decay_factor ** (self.SMOOTHING_WINDOW_SIZE - i - 1) 
-                                 for i in range(self.SMOOTHING_WINDOW_SIZE)], dtype=np.float32)
-        self._total_weight = np.sum(self._weights)
+        weights = np.array([self.decay ** (self.window_size - i - 1)
+                            for i in range(self.window_size)], dtype=np.float32)
+        weights = weights / np.float64(np.sum(weights))
+        # 第k行是最近的数据写在位置k时各位置的权重，即归一化权重循环移位，每帧只需按写入位置取一行
+        self._ring_weights = np.stack([np.roll(weights, k + 1) for k in range(self.window_size)])
         
         # 缓存
         self._last_mouse_pos = None
@@ -276,9 +513,7 @@ class GestureMouse:
             
             # 计算拇指和食指位置
             self._update_location_list(current_hand_landmarks)
-            thumb_tip = self._calculate_weighted_average(self.thumb_location_list)
-            index_finger_tip = self._calculate_weighted_average(self.index_location_list)
-            middle_finger_tip = self._calculate_weighted_average(self.middle_location_list)
+            thumb_tip, index_finger_tip, middle_finger_tip = self._calculate_weighted_average()
             
             # 计算鼠标位置（食指位置）
             # mouse_x, mouse_y = self._calculate_mouse_position(index_finger_tip)
@@ -299,7 +534,7 @@ class GestureMouse:
             self._display_status()
                 
         except Exception as e:
-            logger.error(f"鼠标控制更新时发生错误: {e}")
+            logger.error("鼠标控制更新时发生错误: {}", e)
 
     def pause(self):
         """暂停手势鼠标控制"""
@@ -311,19 +546,20 @@ class GestureMouse:
         """
         计算鼠标屏幕位置（优化版本）
         """
-        x = (1 - tip[0]) * self.gui_controller.screen_size[0]
-        y = tip[1] * self.gui_controller.screen_size[1]
+        screen_width, screen_height = self.gui_controller.screen_size
+        x = (1 - tip[0]) * screen_width
+        y = tip[1] * screen_height
         
         # 应用缩放
-        center_x = self.gui_controller.screen_size[0] / 2
-        center_y = self.gui_controller.screen_size[1] / 2
+        center_x = screen_width / 2
+        center_y = screen_height / 2
         
         x = center_x + (x - center_x) * self.SCALE
         y = center_y + (y - center_y) * self.SCALE
         
         # 限制在屏幕范围内
-        x = max(0, min(x, self.gui_controller.screen_size[0] - 1))
-        y = max(0, min(y, self.gui_controller.screen_size[1] - 1))
+        x = max(0, min(x, screen_width - 1))
+        y = max(0, min(y, screen_height - 1))
         
         return x, y
     
@@ -362,15 +598,14 @@ class GestureMouse:
                 mouse_x = self.start_move_pos[0] + delta_x
                 mouse_y = self.start_move_pos[1] + delta_y
 
-                # 添加移动频率控制，每2帧移动一次
-                if self._frame_counter % 2 == 0:
-                    self.gui_controller.mouse_move(int(mouse_x), int(mouse_y))
+                # 移动频率和微小移动由GUIController的合并模式控制
+                self.gui_controller.mouse_move(int(mouse_x), int(mouse_y))
 
             else:
                 self.start_move_tip = None
         
         except Exception as e:
-            logger.error(f"更新鼠标位置（相对移动）时发生错误: {e}")
+            logger.error("更新鼠标位置（相对移动）时发生错误: {}", e)
 
     def _should_move_mouse(self, x, y):
         """
@@ -382,50 +617,33 @@ class GestureMouse:
     
     def _update_location_list(self, current_hand_landmarks):
         """
-        更新位置列表（优化版本）
+        把当前各指尖位置写入环形缓冲区中最旧的位置
         """
-        thumb_tip = current_hand_landmarks[HandLandmark.THUMB_TIP]
-        index_finger_tip = current_hand_landmarks[HandLandmark.INDEX_FINGER_TIP]
-        middle_finger_tip = current_hand_landmarks[HandLandmark.MIDDLE_FINGER_TIP]
-        
-        self.thumb_location_list = np.roll(self.thumb_location_list, -1, axis=0)
-        self.thumb_location_list[-1] = [thumb_tip[0], thumb_tip[1], thumb_tip[2]]
-        
-        self.index_location_list = np.roll(self.index_location_list, -1, axis=0)
-        self.index_location_list[-1] = [index_finger_tip[0], index_finger_tip[1], index_finger_tip[2]]
+        index = (self._ring_index + 1) % self.window_size
+        for row, finger in enumerate(self.TRACKED_FINGERS):
+            self._location_ring[row, index] = current_hand_landmarks[finger][:3]
+        self._ring_index = index
         
-        self.middle_location_list = np.roll(self.middle_location_list, -1, axis=0)
-        self.middle_location_list[-1] = [middle_finger_tip[0], middle_finger_tip[1], middle_finger_tip[2]]
-        
-    def _calculate_weighted_average(self, location_list):
+    def _calculate_weighted_average(self):
         """
-        计算加权平均位置（优化版本）
+        一次计算所有指尖的加权平均位置
+
+        Returns:
+            每个指尖一个[x, y, z]列表，顺序与TRACKED_FINGERS相同；窗口中有NaN或无穷大的指尖返回最近的位置
         """
-        try:
-            # 检查数据有效性
-            if np.any(np.isnan(location_list)) or np.any(np.isinf(location_list)):
-                # 如果数据无效，返回最近的有效位置
-                return location_list[-1][0], location_list[-1][1], location_list[-1][2]
-            
-            # 计算加权平均
-            weighted_x = np.sum(location_list[:, 0] * self._weights)
-            weighted_y = np.sum(location_list[:, 1] * self._weights)
-            weighted_z = np.sum(location_list[:, 2] * self._weights)
-            
-            avg_x = weighted_x / self._total_weight
-            avg_y = weighted_y / self._total_weight
-            avg_z = weighted_z / self._total_weight
-            
-            # 确保结果在有效范围内（0-1）
-            avg_x = max(0.0, min(1.0, avg_x))
-            avg_y = max(0.0, min(1.0, avg_y))
-            
-            return avg_x, avg_y, avg_z
-            
-        except Exception as e:
-            logger.error(f"加权平均计算错误: {e}")
-            # 出错时返回最近的有效位置
-            return location_list[-1][0], location_list[-1][1]
+        smoothed = self._smoothed
+        np.einsum("w,fwc->fc", self._ring_weights[self._ring_index], self._location_ring, out=smoothed)
+        # 权重都不为负，窗口中有NaN或无穷大时加权和也不是有限值，只需检查结果；要在限制范围之前检查
+        all_finite = np.isfinite(smoothed, out=self._finite).all()
+        # 确保结果在有效范围内（0-1）
+        np.clip(smoothed[:, :2], 0.0, 1.0, out=smoothed[:, :2])
+        if not all_finite:
+            for row in range(len(smoothed)):
+                if not self._finite[row].all():
+                    # 如果数据无效，返回最近的位置
+                    smoothed[row] = self._location_ring[row, self._ring_index]
+        # 返回副本，start_move_tip等会保存结果
+        return smoothed.tolist()
     
     def _handle_click_event(self):
         """
@@ -459,7 +677,7 @@ class GestureMouse:
                 self.is_click = False
 
         except Exception as e:
-            logger.error(f"处理点击事件时发生错误: {e}")
+            logger.error("处理点击事件时发生错误: {}", e)
     
     def _display_status(self):
         """显示状态信息"""
@@ -471,13 +689,52 @@ class GestureMouse:
         print(f"食指距离: {self.thumb_index_finger_distance:.3f} | 中指距离: {self.thumb_middle_finger_distance:.3f} | 状态: {status_text}", end='\r')
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="手势鼠标控制")
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument("--video", help="使用视频文件代替摄像头")
+    source_group.add_argument("--images", help="使用图片序列目录代替摄像头（按文件名排序）")
+    source_group.add_argument("--landmarks", help="回放录制的手部关键点.npy文件，跳过MediaPipe识别")
+    parser.add_argument("--fps", type=float, default=GestureControl.TARGET_FPS,
+                        help="图片序列和关键点回放的帧率，只在--realtime时生效")
+    parser.add_argument("--realtime", action="store_true", help="离线来源按实时节奏回放，默认尽快回放")
+    parser.add_argument("--loop", action="store_true", help="离线来源读到结尾后从头开始")
+    parser.add_argument("--dry-run", action="store_true", help="只记录鼠标操作，不发送真实输入，不需要显示器")
+    parser.add_argument("--sequential", action="store_true", help="不使用流水线模式，识别和控制在同一线程中运行")
+    parser.add_argument("--no-roi", action="store_true", help="每帧都识别整个画面，不使用ROI跟踪和自适应识别分辨率")
+    parser.add_argument("--no-skip", action="store_true", help="每帧都进行识别，不使用自适应跳帧和关键点外推")
+    parser.add_argument("--inference-workers", type=int, default=0,
+                        help="在这么多个独立进程中运行MediaPipe，画面通过共享内存传递，默认0即在当前进程中识别")
+    parser.add_argument("--max-hands", type=int, default=None, help="每帧最多识别的手数，默认1")
+    parser.add_argument("--data-dir", default=None, help="数据目录")
+    return parser.parse_args()
+
+
+def create_source(args):
+    """根据命令行参数创建画面来源，未指定时返回None（使用摄像头）"""
+    if args.video:
+        return VideoFileSource(args.video, realtime=args.realtime, loop=args.loop)
+    if args.images:
+        return ImageSequenceSource(args.images, fps=args.fps, realtime=args.realtime, loop=args.loop)
+    if args.landmarks:
+        return LandmarkSource(args.landmarks, fps=args.fps, realtime=args.realtime, loop=args.loop)
+    return None
+
+
 if __name__ == "__main__":
     """
     主程序入口
     """
     try:
-        gesture_control = GestureControl()
+        args = parse_args()
+        input_backend = RecordingBackend() if args.dry_run else None
+        gesture_control = GestureControl(args.data_dir, input_backend=input_backend,
+                                         pipelined=not args.sequential, source=create_source(args),
+                                         roi_tracking=not args.no_roi, adaptive_skip=not args.no_skip,
+                                         inference_workers=args.inference_workers, max_num_hands=args.max_hands)
         gesture_control.start()
+        if input_backend is not None:
+            logger.info("记录的鼠标操作: {}", input_backend.stats())
     except Exception as e:
-        logger.error(f"程序启动失败: {e}")
+        logger.error("程序启动失败: {}", e)
         logger.error(traceback.format_exc())
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+optimize_note_timing基准：逐条向前扫描的旧实现与按音符索引释放消息的新实现对比
+
+用法（在仓库根目录运行）:
+    python benchmarks/bench_note_timing.py
+    python benchmarks/bench_note_timing.py --events 100000 --baseline-limit 20000
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from GenshinImpactControl.main import GenshinImpactMusicPlayer
+from tests import baselines
+from tests.helpers import random_note_track, trill_track
+from utils.audio_utils import TempoMap
+
+
+def _measure(fn, track):
+    track = copy.deepcopy(track)
+    start = time.perf_counter()
+    result = fn(track)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="optimize_note_timing基准")
+    parser.add_argument("--events", type=int, default=100_000, help="每条合成音轨的消息数")
+    parser.add_argument("--baseline-limit", type=int, default=20_000,
+                        help="旧实现在最坏情况下为O(n²)，同音符快速反复音轨超过这么多条消息时不运行旧实现")
+    args = parser.parse_args()
+
+    player = GenshinImpactMusicPlayer(song_cache=False, library_index=False)
+    # 每个tick恰好1毫秒，新旧实现的结果可以逐条精确比较
+    player.ticks_per_beat = 500
+    player.tempo_map = TempoMap(player.ticks_per_beat, [(0, 500000)])
+    min_release_ticks = round(player.min_release_time * 1e9) / 1_000_000
+
+    workloads = {
+        "random": random_note_track(args.events, 1, notes=20),
+        "trill": trill_track(args.events),
+    }
+    for name, track in workloads.items():
+        new_s, new_track = _measure(lambda t: player.optimize_note_timing([t], 1)[0], track)
+        if name == "trill" and args.events > args.baseline_limit:
+            print(f"{name:>6} {args.events}条消息: 新实现 {new_s:.3f}s, 旧实现跳过（超过--baseline-limit）")
+            continue
+        old_s, old_track = _measure(lambda t: baselines.optimize_note_timing(t, min_release_ticks), track)
+        if old_track != new_track:
+            raise AssertionError(f"{name}: 新旧实现的结果不一致")
+        print(f"{name:>6} {args.events}条消息: 旧实现 {old_s:.3f}s, 新实现 {new_s:.3f}s, 加速 {old_s / new_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
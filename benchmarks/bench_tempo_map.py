@@ -0,0 +1,57 @@
+"""
+TempoMap.tick_to_ns基准：二分查找速度段的新实现与从开头逐段累加的旧实现对比
+
+用法（在仓库根目录运行）:
+    python benchmarks/bench_tempo_map.py
+    python benchmarks/bench_tempo_map.py --segments 10 1000 100000 --lookups 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tests import baselines
+from tests.helpers import random_tempo_changes
+from utils.audio_utils import TempoMap
+
+TICKS_PER_BEAT = 480
+
+
+def _per_lookup_us(fn, ticks):
+    start = time.perf_counter()
+    for tick in ticks:
+        fn(tick)
+    return (time.perf_counter() - start) / len(ticks) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TempoMap.tick_to_ns基准")
+    parser.add_argument("--segments", type=int, nargs="+", default=[10, 1_000, 10_000, 100_000],
+                        help="速度变化数（同一tick的多个变化合并为一段）")
+    parser.add_argument("--lookups", type=int, default=2000, help="每种速度变化数下随机换算的次数")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for count in args.segments:
+        changes = random_tempo_changes(count, seed=count)
+        tempo_map = TempoMap(TICKS_PER_BEAT, changes)
+        end_tick = changes[-1][0] + TICKS_PER_BEAT
+        ticks = [rng.randint(0, end_tick) for _ in range(args.lookups)]
+
+        for tick in ticks[:100]:
+            expected_ns = baselines.tick_to_seconds(tick, TICKS_PER_BEAT, changes) * 1e9
+            if abs(tempo_map.tick_to_ns(tick) - expected_ns) > max(1.0, expected_ns * 1e-12):
+                raise AssertionError(f"{count}段速度: tick {tick}的换算结果不一致")
+
+        old_us = _per_lookup_us(lambda tick: baselines.tick_to_seconds(tick, TICKS_PER_BEAT, changes), ticks)
+        new_us = _per_lookup_us(tempo_map.tick_to_ns, ticks)
+        print(f"{len(tempo_map):>7}段速度: 逐段累加 {old_us:10.1f}us/次, 二分查找 {new_us:6.2f}us/次, "
+              f"加速 {old_us / new_us:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 
 # 定义构建选项
 build_exe_options = {
-    "packages": ["mido", "pygetwindow", "tkinter", "keyboard", "loguru", "pynput"],
+    "packages": ["mido", "numpy", "pygetwindow", "tkinter", "keyboard", "loguru", "pynput"],
     "includes": ["pynput.keyboard._win32", "pynput.mouse._win32", "pynput._util.win32"],
     "excludes": [],
     "include_files": [
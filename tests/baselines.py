@@ -0,0 +1,57 @@
+"""
+优化前的参考实现
+
+测试用它们验证新实现的输出不变，benchmarks下的基准脚本用它们作为对比基线
+"""
+
+
+def optimize_note_timing(track, min_release_ticks):
+    """
+    GenshinImpactMusicPlayer.optimize_note_timing优化前的实现：对每个间隔过短的note_on，
+    从当前位置向前逐条扫描整条音轨，查找同一音符的释放消息，最坏情况为O(n²)
+
+    :param track: 字典形式的音轨，原地修改
+    :param min_release_ticks: 最小释放间隔（tick）
+    :return: track
+    """
+    i = 0
+    while i < len(track):
+        msg = track[i]
+        # 只处理有时间间隔的note_on消息（velocity不为0）
+        if msg["type"] == "note_on" and msg["velocity"] != 0:
+            if msg["time"] < min_release_ticks:
+                ticks_diff = min_release_ticks - msg["time"]
+                # 从i-1开始向前查找，直到找到对应的note_off或到达音轨开头
+                for j in range(i - 1, -1, -1):
+                    prev_msg = track[j]
+                    if ((prev_msg["type"] == "note_off" or (prev_msg["type"] == "note_on" and prev_msg["velocity"] == 0))
+                            and "note" in prev_msg and prev_msg["note"] == msg["note"]):
+                        if prev_msg["time"] > ticks_diff + min_release_ticks:
+                            track[j + 1]["time"] += ticks_diff
+                            track[j]["time"] -= ticks_diff
+                            break
+        i += 1
+    return track
+
+
+def tick_to_seconds(tick, ticks_per_beat, changes, default_tempo=500000):
+    """
+    逐段累加的tick到秒换算：从开头依次走过每个速度变化，每次换算为O(n)
+
+    :param tick: 绝对tick
+    :param ticks_per_beat: 每拍的tick数
+    :param changes: 按tick排序的(绝对tick, 微秒/拍)速度变化列表
+    :param default_tempo: 第一个速度变化之前的速度（微秒/拍）
+    """
+    import mido
+
+    seconds = 0.0
+    last_tick = 0
+    tempo = default_tempo
+    for change_tick, change_tempo in changes:
+        if change_tick > tick:
+            break
+        seconds += mido.tick2second(change_tick - last_tick, ticks_per_beat, tempo)
+        last_tick = change_tick
+        tempo = change_tempo
+    return seconds + mido.tick2second(tick - last_tick, ticks_per_beat, tempo)
@@ -0,0 +1,70 @@
+import random
+
+
+def random_note_track(length, seed, notes=6, times=(0, 1, 5, 10, 20, 28, 29, 30, 40, 60, 100, 200)):
+    """
+    生成随机的字典形式音轨：note_on/note_off交错，包含velocity为0的note_on和非音符消息，
+    时间间隔集中在最小释放间隔附近
+
+    :param length: 消息数（不含结尾的end_of_track）
+    :param seed: 随机种子
+    :param notes: 音高范围为60~60+notes
+    :param times: 可选的时间间隔（tick）
+    """
+    rng = random.Random(seed)
+    track = []
+    for _ in range(length):
+        if rng.random() < 0.05:
+            track.append({"type": "control_change", "time": rng.randint(0, 40), "channel": 0, "control": 7, "value": 1})
+            continue
+        msg_type = rng.choice(["note_on", "note_off", "note_on"])
+        velocity = 0 if msg_type == "note_on" and rng.random() < 0.3 else rng.randint(1, 100)
+        track.append({"type": msg_type, "note": 60 + rng.randint(0, notes), "velocity": velocity,
+                      "time": rng.choice(times), "channel": 0})
+    track.append({"type": "end_of_track", "time": 0})
+    return track
+
+
+def trill_track(length, note=60, gap=5):
+    """同一个音符快速反复按下和松开的音轨，共length条消息"""
+    track = []
+    for i in range(length):
+        track.append({"type": "note_on" if i % 2 == 0 else "note_off", "note": note, "velocity": 80,
+                      "time": gap, "channel": 0})
+    return track
+
+
+def random_tempo_changes(count, seed, max_gap=960):
+    """生成按tick排序的随机(绝对tick, 微秒/拍)速度变化，包含同一tick的多个变化"""
+    rng = random.Random(seed)
+    tick = 0
+    changes = []
+    for _ in range(count):
+        tick += rng.choice([0, rng.randint(1, max_gap)])
+        changes.append((tick, rng.randint(200_000, 1_500_000)))
+    return changes
+
+
+def tempo_change_midi(path, changes, ticks_per_beat=480, notes=200, seed=0):
+    """
+    写入一个两音轨的MIDI文件：音轨0只有速度变化，音轨1是随机音符
+
+    :return: mido.MidiFile
+    """
+    import mido
+
+    rng = random.Random(seed)
+    mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    tempo_track = mido.MidiTrack()
+    last_tick = 0
+    for tick, tempo in changes:
+        tempo_track.append(mido.MetaMessage("set_tempo", tempo=tempo, time=tick - last_tick))
+        last_tick = tick
+    note_track = mido.MidiTrack()
+    for _ in range(notes):
+        note = rng.randint(48, 84)
+        note_track.append(mido.Message("note_on", note=note, velocity=80, time=rng.randint(0, 240)))
+        note_track.append(mido.Message("note_off", note=note, velocity=0, time=rng.randint(1, 240)))
+    mid.tracks.extend([tempo_track, note_track])
+    mid.save(path)
+    return mido.MidiFile(path)
@@ -0,0 +1,115 @@
+import tracemalloc
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.frame_ring import FrameRing
+from utils.hgr_utils import HGRUtils, LandmarkSource, VideoFileSource
+
+WARMUP_FRAMES = 30
+FRAMES = 200
+FRAME_SHAPE = (480, 640, 3)
+# 稳定运行时整个循环允许的净内存增长（字节），远小于一帧画面
+MAX_GROWTH = 1024
+# 单帧允许的临时内存峰值（字节），复制或新建一帧画面都会超过
+MAX_FRAME_PEAK = 64 * 1024
+
+
+def _measure(step):
+    """预热后运行FRAMES帧，返回(净内存增长, 单帧临时内存峰值的最大值)"""
+    for i in range(WARMUP_FRAMES):
+        step(i)
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        max_peak = 0
+        for i in range(WARMUP_FRAMES, WARMUP_FRAMES + FRAMES):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            step(i)
+            _, peak = tracemalloc.get_traced_memory()
+            max_peak = max(max_peak, peak - before)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return end - start, max_peak
+
+
+class _StaticHands:
+    """每帧返回同一个预先构造的结果，测量的只是管线本身的内存分配"""
+
+    def __init__(self):
+        point = SimpleNamespace(x=0.5, y=0.5, z=-0.05)
+        self.result = SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=[point] * 21)],
+            multi_hand_world_landmarks=[SimpleNamespace(landmark=[point] * 21)],
+            multi_handedness=[SimpleNamespace(classification=[SimpleNamespace(label="Right", score=0.9)])],
+        )
+
+    def process(self, image):
+        return self.result
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "frames.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, FRAME_SHAPE[1::-1])
+    for i in range(WARMUP_FRAMES + FRAMES):
+        writer.write(np.full(FRAME_SHAPE, i % 255, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_ring_writes_do_not_allocate():
+    ring = FrameRing(4, FRAME_SHAPE, max_num_hands=2)
+    image = np.full(FRAME_SHAPE, 7, dtype=np.uint8)
+    landmarks = np.random.default_rng(0).random((2, 21, 3), dtype=np.float32)
+    handedness = np.ones((2, 2), dtype=np.float32)
+
+    def step(i):
+        slot = i % len(ring)
+        ring.write_frame(slot, image, i, i)
+        ring.write_hands(slot, landmarks, landmarks, handedness)
+        ring.read_frame(slot)
+        ring.hands(slot)
+
+    growth, peak = _measure(step)
+    assert growth < MAX_GROWTH
+    assert peak < MAX_FRAME_PEAK
+
+
+def test_video_pipeline_into_ring_does_not_allocate(tmp_path, video_path):
+    hgr = HGRUtils(str(tmp_path), source=VideoFileSource(video_path))
+    hgr.hands = _StaticHands()
+    ring = FrameRing(4, max_num_hands=hgr.max_num_hands)
+
+    def step(i):
+        image = hgr.get_camera_frame()
+        assert image is not None
+        assert hgr.get_result_into(image, ring, i % len(ring)) == 1
+
+    try:
+        growth, peak = _measure(step)
+    finally:
+        hgr.cleanup()
+    assert growth < MAX_GROWTH
+    assert peak < MAX_FRAME_PEAK
+
+
+def test_landmark_replay_into_ring_does_not_allocate(tmp_path):
+    path = tmp_path / "landmarks.npy"
+    np.save(path, np.random.default_rng(0).random((WARMUP_FRAMES + FRAMES, 21, 3), dtype=np.float32))
+    hgr = HGRUtils(str(tmp_path), source=LandmarkSource(str(path)))
+    ring = FrameRing(4, max_num_hands=hgr.max_num_hands)
+
+    def step(i):
+        assert hgr.get_result_into(hgr.get_camera_frame(), ring, i % len(ring)) == 1
+
+    try:
+        growth, peak = _measure(step)
+    finally:
+        hgr.cleanup()
+    assert growth < MAX_GROWTH
+    assert peak < MAX_FRAME_PEAK
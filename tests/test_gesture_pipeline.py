@@ -0,0 +1,64 @@
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+from GestureMouseControl.main import GestureControl
+from utils.frame_ring import FrameRing
+from utils.gui_utils import RecordingBackend
+from utils.hgr_utils import LandmarkSource
+from utils.histogram import DurationHistogram
+
+FRAMES = 60
+
+
+@pytest.fixture
+def landmark_path(tmp_path):
+    landmarks = np.zeros((FRAMES, 21, 3), dtype=np.float32)
+    landmarks[..., 0] = np.linspace(0.3, 0.7, FRAMES)[:, None]
+    landmarks[..., 1] = 0.5
+    landmarks[..., 2] = -0.05
+    path = tmp_path / "landmarks.npy"
+    np.save(path, landmarks)
+    return str(path)
+
+
+def _control(tmp_path, landmark_path):
+    return GestureControl(str(tmp_path), input_backend=RecordingBackend(), pipelined=True,
+                          source=LandmarkSource(landmark_path))
+
+
+def test_pipeline_processes_every_replayed_frame(tmp_path, landmark_path):
+    control = _control(tmp_path, landmark_path)
+    control.start()
+    assert control.frame_count == FRAMES
+    stats = control.pipeline_stats()
+    assert all(isinstance(histogram, DurationHistogram) for histogram in control.stage_stats.values())
+    assert stats["inference"]["count"] == FRAMES
+    assert stats["control"]["count"] == FRAMES
+
+
+def test_inference_stage_waits_for_free_result_slot(tmp_path, landmark_path):
+    control = _control(tmp_path, landmark_path)
+    control.result_ring = FrameRing(2, max_num_hands=control.hgr_utils.max_num_hands)
+    control._free_result_slots = queue.Queue()
+    control.is_running = True
+    results_queue = queue.Queue(maxsize=1)
+    thread = threading.Thread(target=control._inference_stage, args=(results_queue,), daemon=True)
+    thread.start()
+    try:
+        # 没有空闲槽位时识别线程等待，而不是抛出异常退出
+        with pytest.raises(queue.Empty):
+            results_queue.get(timeout=0.3)
+        assert thread.is_alive()
+
+        control._free_result_slots.put(1)
+        slot, _, _ = results_queue.get(timeout=2.0)
+        assert slot == 1
+        assert control.result_ring.hands(slot)[0].shape == (1, 21, 3)
+    finally:
+        control.is_running = False
+        thread.join(2.0)
+        control.hgr_utils.cleanup()
+    assert not thread.is_alive()
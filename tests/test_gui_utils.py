@@ -0,0 +1,11 @@
+import subprocess
+import sys
+
+from tests.conftest import ROOT_DIR
+
+
+def test_input_layer_does_not_import_audio_modules():
+    # 只做手势控制时不应加载MIDI相关模块
+    code = "import sys, utils.gui_utils; print('utils.audio_utils' in sys.modules, 'mido' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False"]
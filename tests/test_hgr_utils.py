@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from utils.hgr_utils import HGRUtils, LandmarkSource
+
+FRAMES = 5
+
+
+@pytest.fixture
+def landmark_replay(tmp_path):
+    path = tmp_path / "landmarks.npy"
+    landmarks = np.random.default_rng(0).uniform(0.2, 0.8, (FRAMES, 21, 3)).astype(np.float32)
+    np.save(path, landmarks)
+    hgr = HGRUtils(str(tmp_path), source=LandmarkSource(str(path)))
+    yield hgr
+    hgr.cleanup()
+
+
+def test_get_result_objects_require_in_process_model(landmark_replay):
+    frame = landmark_replay.get_camera_frame()
+    assert len(landmark_replay.get_result(frame)) == 1
+    with pytest.raises(ValueError):
+        landmark_replay.get_result(frame, array=False)
+
+
+def test_display_results_rejects_landmark_source(landmark_replay):
+    with pytest.raises(ValueError):
+        landmark_replay.display_results(landmark_replay.get_camera_frame())
+
+
+def test_show_hand_landmarks_draws_array_form(landmark_replay):
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    hand = landmark_replay.get_result(landmark_replay.get_camera_frame())[0]
+    landmark_replay.show_hand_landmarks(image, hand)
+    assert image.any()
+
+    # 未检测到手时关键点为NaN，不绘制任何内容
+    blank = np.zeros_like(image)
+    landmark_replay.show_hand_landmarks(blank, np.full((21, 3), np.nan, dtype=np.float32))
+    assert not blank.any()
@@ -0,0 +1,121 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utils.hgr_utils import FrameSource, HGRUtils
+from utils.hgr_worker import InferenceWorkerPool
+
+NUM_LANDMARKS = 21
+
+
+class _SlowHands:
+    """在工作进程中使用的假识别模型：每帧耗时delay秒，画面非空时检测到一只手"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def process(self, image):
+        time.sleep(self.delay)
+        point = SimpleNamespace(x=0.5, y=0.5, z=0.0)
+        return SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=[point] * NUM_LANDMARKS)],
+            multi_hand_world_landmarks=[SimpleNamespace(landmark=[point] * NUM_LANDMARKS)],
+            multi_handedness=[SimpleNamespace(classification=[SimpleNamespace(label="Right", score=0.9)])],
+        )
+
+
+def slow_hands_factory(max_num_hands):
+    return _SlowHands(0.3)
+
+
+def _infer_with_deadline(pool, image, deadline=10.0):
+    landmarks = np.zeros((1, NUM_LANDMARKS, 3), dtype=np.float32)
+    world_landmarks = np.zeros_like(landmarks)
+    handedness = np.zeros((1, 2), dtype=np.float32)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(
+        pool.infer(image, landmarks, world_landmarks, handedness)), daemon=True)
+    thread.start()
+    thread.join(deadline)
+    assert not thread.is_alive(), "infer在超时后没有返回，槽位没有被放回"
+    return result[0]
+
+
+def test_timed_out_slots_are_reused():
+    image = np.zeros((48, 64, 3), dtype=np.uint8)
+    with InferenceWorkerPool(1, max_frame_shape=(48, 64), max_num_hands=1, slots=1,
+                             hands_factory=slow_hands_factory) as pool:
+        pool.RESULT_TIMEOUT = 0.05
+        # 只有一个槽位，超时的槽位不放回时第二次调用就会一直等待
+        for _ in range(3):
+            assert _infer_with_deadline(pool, image) == 0
+        pool.RESULT_TIMEOUT = 5.0
+        assert _infer_with_deadline(pool, image) == 1
+        stats = pool.stats()
+    assert stats["timeouts"] == 3
+    assert stats["frames"] == 1
+
+
+class _BlueHands(_SlowHands):
+    """只有画面是RGB顺序的纯蓝色时才检测到手，用于确认画面在写入槽位时已经转换为RGB"""
+
+    def __init__(self):
+        super().__init__(0.0)
+
+    def process(self, image):
+        results = super().process(image)
+        if not ((image[..., 2] == 255).all() and (image[..., :2] == 0).all()):
+            results.multi_hand_landmarks = None
+        return results
+
+
+def blue_hands_factory(max_num_hands):
+    return _BlueHands()
+
+
+def failing_hands_factory(max_num_hands):
+    raise RuntimeError("模型文件不存在")
+
+
+class _BlueSource(FrameSource):
+    paced = False
+
+    def read(self):
+        image = np.zeros((48, 64, 3), dtype=np.uint8)
+        image[..., 0] = 255  # BGR中的蓝色
+        return image, time.perf_counter_ns()
+
+
+def test_factory_failure_is_reported_immediately():
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="加载识别模型失败"):
+        InferenceWorkerPool(1, max_frame_shape=(48, 64), hands_factory=failing_hands_factory)
+    assert time.monotonic() - start < InferenceWorkerPool.READY_TIMEOUT / 2
+
+
+def test_worker_mode_converts_directly_into_the_slot(tmp_path):
+    with InferenceWorkerPool(1, max_frame_shape=(48, 64), max_num_hands=1,
+                             hands_factory=blue_hands_factory) as pool:
+        hgr = HGRUtils(str(tmp_path), source=_BlueSource(), max_num_hands=1, worker_pool=pool)
+        try:
+            for _ in range(3):
+                assert len(hgr.get_result(hgr.get_camera_frame())) == 1
+            # 画面直接转换到共享内存的槽位，没有经过当前进程的RGB缓冲区
+            assert hgr._rgb_buffer is None
+        finally:
+            hgr.cleanup()
+        assert pool.stats()["frames"] == 3
+        assert len(pool._free_slots) == pool.slot_count
+
+
+def test_acquired_frame_is_released_when_too_large():
+    with InferenceWorkerPool(1, max_frame_shape=(48, 64), max_num_hands=1, slots=1,
+                             hands_factory=blue_hands_factory) as pool:
+        with pytest.raises(ValueError):
+            pool.acquire_frame(96, 64)
+        slot, view = pool.acquire_frame(48, 64)
+        pool.release_frame(slot)
+        assert pool._free_slots == [slot]
@@ -0,0 +1,88 @@
+import copy
+import random
+
+import pytest
+
+from GenshinImpactControl.main import GenshinImpactMusicPlayer
+from tests import baselines
+from utils.audio_utils import TempoMap
+from tests.helpers import random_note_track
+
+# 每个tick恰好1毫秒，新实现的纳秒换算和旧实现的tick运算都没有取整误差，结果应完全相同
+TICKS_PER_BEAT = 500
+TEMPO = 500000
+NS_PER_TICK = TEMPO * 1000 // TICKS_PER_BEAT
+
+
+@pytest.fixture
+def player():
+    player = GenshinImpactMusicPlayer(song_cache=False, library_index=False)
+    player.ticks_per_beat = TICKS_PER_BEAT
+    player.tempo_map = TempoMap(TICKS_PER_BEAT, [(0, TEMPO)])
+    return player
+
+
+def _min_release_ticks(player):
+    return round(player.min_release_time * 1e9) / NS_PER_TICK
+
+
+def _assert_same_as_baseline(player, track):
+    expected = baselines.optimize_note_timing(copy.deepcopy(track), _min_release_ticks(player))
+    actual = player.optimize_note_timing([copy.deepcopy(track)], 1)[0]
+    assert actual == expected
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_baseline_on_random_tracks(player, seed):
+    rng = random.Random(seed)
+    _assert_same_as_baseline(player, random_note_track(rng.randint(1, 200), seed, notes=rng.randint(0, 8)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_baseline_with_release_index(player, seed):
+    # 音符少、释放消息多时，向前检查超过RELEASE_SCAN_LIMIT个候选后会改用线段树查找
+    player.RELEASE_SCAN_LIMIT = 2
+    _assert_same_as_baseline(player, random_note_track(2000, seed, notes=1, times=(0, 5, 10, 30, 35, 40, 45, 60)))
+
+
+def test_selected_track_only(player):
+    tracks = [random_note_track(100, seed) for seed in range(3)]
+    result = player.optimize_note_timing(copy.deepcopy(tracks), 2)
+    assert result[0] == tracks[0]
+    assert result[2] == tracks[2]
+    assert result[1] == baselines.optimize_note_timing(copy.deepcopy(tracks[1]), _min_release_ticks(player))
+
+
+def test_out_of_range_track_is_unchanged(player):
+    tracks = [random_note_track(50, 0)]
+    assert player.optimize_note_timing(copy.deepcopy(tracks), 2) == tracks
+
+
+def _tempo_change_track():
+    # 第1000 tick起速度加倍，每个tick只有0.5毫秒；释放后40 tick（20毫秒）再次按下
+    return [
+        {"type": "note_on", "note": 60, "velocity": 80, "time": 0},
+        {"type": "note_off", "note": 60, "velocity": 0, "time": 1200},
+        {"type": "note_on", "note": 60, "velocity": 80, "time": 40},
+        {"type": "note_off", "note": 60, "velocity": 0, "time": 100},
+    ]
+
+
+def _release_gap_ns(tempo_map, track):
+    release_tick = track[0]["time"] + track[1]["time"]
+    return tempo_map.tick_to_ns(release_tick + track[2]["time"]) - tempo_map.tick_to_ns(release_tick)
+
+
+def test_release_gap_uses_tempo_at_the_event(player):
+    player.tempo_map = TempoMap(TICKS_PER_BEAT, [(0, TEMPO), (1000, TEMPO // 2)])
+    min_release_ns = round(player.min_release_time * 1e9)
+    assert _release_gap_ns(player.tempo_map, _tempo_change_track()) < min_release_ns
+
+    track = player.optimize_note_timing([_tempo_change_track()], 1)[0]
+    assert _release_gap_ns(player.tempo_map, track) == min_release_ns
+    assert track[1]["time"] == pytest.approx(1180)
+    assert track[2]["time"] == pytest.approx(60)
+    assert sum(msg["time"] for msg in track) == pytest.approx(1340)
+
+    streamed = list(player._stream_release_fix(iter(_tempo_change_track()), 16))
+    assert streamed == track
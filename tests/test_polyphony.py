@@ -0,0 +1,94 @@
+import operator
+
+from GenshinImpactControl.main import GenshinImpactMusicPlayer
+from utils.audio_utils import merge_message_streams, resolve_key_collisions
+
+KEY_MAP = {60: "a", 62: "s", 64: "d", 65: "f", 67: "g", 69: "h"}
+
+
+def _on(note, time=0):
+    return {"type": "note_on", "note": note, "velocity": 80, "time": time}
+
+
+def _off(note, time=0):
+    return {"type": "note_off", "note": note, "velocity": 0, "time": time}
+
+
+def _pressed_timeline(messages):
+    """按绝对tick重放消息，返回每次按下/松开后的(tick, 已按下的音符集合)"""
+    tick = 0
+    pressed = set()
+    timeline = []
+    for msg in messages:
+        tick += msg["time"]
+        if msg["type"] == "note_on" and msg["velocity"] > 0:
+            pressed.add(msg["note"])
+        elif msg["type"] in ("note_on", "note_off"):
+            pressed.discard(msg["note"])
+        else:
+            continue
+        timeline.append((tick, frozenset(pressed)))
+    return timeline
+
+
+def _merge(tracks, max_polyphony, stats):
+    return list(resolve_key_collisions(merge_message_streams(tracks, track_field="track"), KEY_MAP,
+                                       max_polyphony, stats, priority=operator.itemgetter("track")))
+
+
+def test_default_polyphony_is_the_key_count():
+    player = GenshinImpactMusicPlayer(song_cache=False, library_index=False)
+    assert player.max_polyphony == len(set(player.map.values())) == 21
+    assert GenshinImpactMusicPlayer(song_cache=False, library_index=False, max_polyphony=3).max_polyphony == 3
+    assert GenshinImpactMusicPlayer(song_cache=False, library_index=False, max_polyphony=50).max_polyphony == 21
+
+
+def test_lower_priority_track_is_dropped_when_cap_reached():
+    # 音轨0（优先）先按下两个音，音轨1随后再按两个音，复音数为3
+    melody = [_on(60), _on(62), _off(60, 100), _off(62)]
+    accompaniment = [_on(64, 10), _on(65, 10), _off(64, 80), _off(65)]
+    stats = {}
+    merged = _merge([melody, accompaniment], 3, stats)
+    assert stats["dropped"] == 1
+    assert stats["preempted"] == 0
+    assert max(len(pressed) for _, pressed in _pressed_timeline(merged)) == 3
+    # 被丢弃的是音轨1的第二个音，它的释放也被丢弃
+    assert 65 not in {msg.get("note") for msg in merged}
+    # 总时长不变
+    assert sum(msg["time"] for msg in merged) == 100
+
+
+def test_higher_priority_track_preempts_held_accompaniment():
+    # 伴奏（音轨1）先占满复音数，旋律（音轨0）的音符到来时提前松开最早按下的伴奏音
+    melody = [_on(67, 20), _off(67, 20)]
+    accompaniment = [_on(60), _on(62), _on(64), _off(60, 100), _off(62), _off(64)]
+    stats = {}
+    merged = _merge([melody, accompaniment], 3, stats)
+    assert stats["preempted"] == 1
+    assert stats["dropped"] == 0
+    timeline = _pressed_timeline(merged)
+    assert max(len(pressed) for _, pressed in timeline) == 3
+    assert (20, frozenset({62, 64, 67})) in timeline
+    # 被提前松开的音符之后的释放被丢弃，结尾所有按键都已松开
+    assert timeline[-1][1] == frozenset()
+    assert sum(1 for msg in merged if msg.get("note") == 60 and msg["type"] == "note_off") == 1
+    assert sum(msg["time"] for msg in merged) == 100
+
+
+def test_without_priority_new_notes_are_dropped():
+    melody = [_on(67, 20), _off(67, 20)]
+    accompaniment = [_on(60), _on(62), _on(64), _off(60, 100), _off(62), _off(64)]
+    stats = {}
+    merged = list(resolve_key_collisions(merge_message_streams([melody, accompaniment]), KEY_MAP, 3, stats))
+    assert stats["dropped"] == 1
+    assert 67 not in {msg.get("note") for msg in merged}
+
+
+def test_player_merge_keeps_track_order_priority():
+    player = GenshinImpactMusicPlayer(song_cache=False, library_index=False, max_polyphony=2)
+    melody = [_on(60, 10), _off(60, 10)]
+    accompaniment = [_on(62), _on(64), _off(62, 50), _off(64)]
+    merged = list(player._merge_selected([melody, accompaniment]))
+    assert player.merge_stats["preempted"] == 1
+    assert max(len(pressed) for _, pressed in _pressed_timeline(merged)) == 2
+    assert (10, frozenset({60, 64})) in _pressed_timeline(merged)
@@ -0,0 +1,111 @@
+import os
+
+from GenshinImpactControl.main import GenshinImpactMusicPlayer
+from tests.helpers import tempo_change_midi
+from utils.audio_utils import (_SCHEDULE_HEADER, APP_DIR, CompiledSongCache, MidiLibraryIndex, NoteBatch, NoteSchedule,
+                               decode_schedule, encode_schedule)
+
+KEY_MAP = {60: "a", 62: "s"}
+
+
+def _schedule():
+    return NoteSchedule((NoteBatch(0, (("a", True),)), NoteBatch(1_000_000, (("a", False),))), 1_000_000)
+
+
+def test_default_paths_do_not_depend_on_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    player = GenshinImpactMusicPlayer()
+    assert player.song_cache.cache_dir == os.path.join(APP_DIR, "cache", "songs")
+    assert player.library_index.index_path == os.path.join(APP_DIR, "cache", "library_index.json")
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_directory_is_created_on_first_write(tmp_path):
+    cache = CompiledSongCache(str(tmp_path / "songs"))
+    assert not os.path.exists(cache.cache_dir)
+    midi_path = tmp_path / "song.mid"
+    midi_path.write_bytes(b"MThd")
+    key = cache.make_key(str(midi_path), 120, (1,), KEY_MAP, 0.03)
+    assert cache.get(key) is None
+    assert not os.path.exists(cache.cache_dir)
+
+    assert cache.put(key, _schedule())
+    assert cache.get(key) == _schedule()
+
+
+def test_library_index_directory_is_created_on_save(tmp_path):
+    index = MidiLibraryIndex(str(tmp_path / "index" / "library.json"))
+    assert not os.path.exists(tmp_path / "index")
+    midi_path = tmp_path / "song.mid"
+    midi_path.write_bytes(b"MThd")
+    index.put(str(midi_path), {"shift": 2})
+    assert index.save()
+    assert MidiLibraryIndex(index.index_path).get(str(midi_path))["shift"] == 2
+
+
+def test_cache_key_depends_on_max_polyphony(tmp_path):
+    midi_path = tmp_path / "song.mid"
+    midi_path.write_bytes(b"MThd")
+    keys = {CompiledSongCache.make_key(str(midi_path), 120, (1, 2), KEY_MAP, 0.03, max_polyphony)
+            for max_polyphony in (None, 6, 10)}
+    assert len(keys) == 3
+
+
+def _encoded_schedule():
+    schedule = NoteSchedule((NoteBatch(0, (("a", True), ("s", True))),
+                             NoteBatch(1_000_000, (("a", False), ("s", False)))), 1_000_000)
+    return schedule, encode_schedule(schedule)
+
+
+def test_decode_rejects_truncated_data():
+    schedule, data = _encoded_schedule()
+    assert decode_schedule(data) == schedule
+    for length in range(len(data)):
+        assert decode_schedule(data[:length]) is None
+
+
+def test_decode_rejects_corrupted_data():
+    _, data = _encoded_schedule()
+    key_offset = _SCHEDULE_HEADER.size
+    # 按键名不是合法的UTF-8
+    bad_utf8 = bytearray(data)
+    bad_utf8[key_offset + 1] = 0xFF
+    assert decode_schedule(bytes(bad_utf8)) is None
+    # 按键长度超出文件末尾
+    bad_length = bytearray(data)
+    bad_length[key_offset] = 0xFF
+    assert decode_schedule(bytes(bad_length)) is None
+    # 动作的按键索引超出按键表
+    bad_action = bytearray(data)
+    bad_action[-1] = 0x80 | 0x05
+    assert decode_schedule(bytes(bad_action)) is None
+
+
+def test_corrupted_cache_file_is_a_miss(tmp_path):
+    cache = CompiledSongCache(str(tmp_path / "songs"))
+    midi_path = tmp_path / "song.mid"
+    midi_path.write_bytes(b"MThd")
+    key = cache.make_key(str(midi_path), 120, (1,), KEY_MAP, 0.03)
+    schedule, data = _encoded_schedule()
+    assert cache.put(key, schedule)
+    with open(cache._path(key), "wb") as f:
+        f.write(data[:25])
+    assert cache.get(key) is None
+
+
+def test_in_memory_schedules_are_bounded_and_keyed_on_settings(tmp_path):
+    midi_path = str(tmp_path / "song.mid")
+    tempo_change_midi(midi_path, [(0, 500000)], notes=20)
+    player = GenshinImpactMusicPlayer(song_cache=False, library_index=False)
+    first = player.compile_midi(midi_path, 120, 2)
+    assert player.compile_midi(midi_path, 120, 2) is first
+
+    player.min_release_time = 0.05
+    assert player.compile_midi(midi_path, 120, 2) is not first
+    player.map = {**player.map, 48: "x"}
+    player.compile_midi(midi_path, 120, 2)
+    assert len(player._schedule_cache) == 3
+
+    for bpm in range(60, 60 + player.SCHEDULE_CACHE_SIZE * 10, 10):
+        player.compile_midi(midi_path, bpm, 2)
+    assert len(player._schedule_cache) == player.SCHEDULE_CACHE_SIZE
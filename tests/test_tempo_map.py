@@ -0,0 +1,45 @@
+import random
+
+import mido
+import pytest
+
+from tests import baselines
+from tests.helpers import random_tempo_changes, tempo_change_midi
+from utils.audio_utils import DEFAULT_BPM, TempoMap
+
+
+@pytest.mark.parametrize("count", [0, 1, 5, 50, 500])
+def test_tick_to_ns_matches_linear_walk(count):
+    changes = random_tempo_changes(count, seed=count)
+    tempo_map = TempoMap(480, changes)
+    end_tick = (changes[-1][0] if changes else 0) + 2000
+    rng = random.Random(count)
+    for tick in [0, end_tick] + [tick for tick, _ in changes] + [rng.randint(0, end_tick) for _ in range(500)]:
+        expected = baselines.tick_to_seconds(tick, 480, changes)
+        assert tempo_map.tick_to_ns(tick) == pytest.approx(expected * 1e9, rel=1e-12, abs=1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_midi_file_times_match_mido(tmp_path, seed):
+    changes = random_tempo_changes(30, seed)
+    mid = tempo_change_midi(tmp_path / "tempo.mid", changes, seed=seed)
+    tempo_map = TempoMap.from_midi(mid)
+    assert len(tempo_map) > 1
+
+    # mido迭代MidiFile时按所有音轨的速度变化逐条把tick换算为秒
+    tick = 0
+    seconds = 0.0
+    for msg, timed_msg in zip(mido.merge_tracks(mid.tracks), mid):
+        tick += msg.time
+        seconds += timed_msg.time
+        assert tempo_map.tick_to_ns(tick) == pytest.approx(seconds * 1e9, rel=1e-9, abs=1)
+    assert tempo_map.tick_to_ns(tick) / 1e9 == pytest.approx(mid.length, rel=1e-9)
+
+
+def test_bpm_scales_playback_time():
+    changes = random_tempo_changes(20, seed=1)
+    normal = TempoMap(480, changes)
+    double = TempoMap(480, changes, bpm=DEFAULT_BPM * 2)
+    for tick in range(0, 20000, 997):
+        assert double.tick_to_ns(tick) == pytest.approx(normal.tick_to_ns(tick) / 2, abs=1)
+        assert double.seconds_per_beat(tick) == pytest.approx(normal.seconds_per_beat(tick) / 2)
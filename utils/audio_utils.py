@@ -0,0 +1,736 @@
+"""
+音频/MIDI工具模块
+提供将MIDI音轨编译为绝对时间按键时间表的工具
+"""
+
+import os
+import sys
+import time
+import json
+import struct
+import heapq
+import bisect
+import hashlib
+from array import array
+from typing import NamedTuple, Tuple, Dict, List, Any, Optional, Sequence, Iterable, Iterator, Callable
+import numpy as np
+from .logger import get_logger
+from .histogram import LatenessHistogram
+
+logger = get_logger(__name__)
+
+
+# 结构化数组中的事件类型编码
+EVENT_OTHER = 0
+EVENT_NOTE_ON = 1
+EVENT_NOTE_OFF = 2
+
+_EVENT_TYPE_CODES = {"note_on": EVENT_NOTE_ON, "note_off": EVENT_NOTE_OFF}
+_EVENT_TYPE_NAMES = {EVENT_NOTE_ON: "note_on", EVENT_NOTE_OFF: "note_off"}
+
+# 音轨的结构化数组表示，note为-1表示消息不带音符
+MIDI_EVENT_DTYPE = np.dtype([
+    ("type", np.uint8),
+    ("channel", np.uint8),
+    ("note", np.int16),
+    ("velocity", np.uint8),
+    ("time", np.int64),  # 增量tick
+    ("tick", np.int64),  # 绝对tick
+])
+
+# 大调和小调的音级模式
+MAJOR_SCALE = (0, 2, 4, 5, 7, 9, 11)
+MINOR_SCALE = (0, 2, 3, 5, 7, 8, 10)
+# 每个根音(行)对应的调内音级(列)掩码，用于向量化计算调式匹配度
+MAJOR_SCALE_MASKS = np.array([[(pc - root) % 12 in MAJOR_SCALE for pc in range(12)] for root in range(12)], dtype=np.int64)
+MINOR_SCALE_MASKS = np.array([[(pc - root) % 12 in MINOR_SCALE for pc in range(12)] for root in range(12)], dtype=np.int64)
+
+
+def track_to_array(track: Sequence[Any]) -> np.ndarray:
+    """
+    将mido音轨或消息字典列表转换为结构化数组
+
+    :param track: mido.MidiTrack或msg.dict()格式的消息列表
+    :return: MIDI_EVENT_DTYPE结构化数组
+    """
+    if isinstance(track, np.ndarray):
+        return track
+    rows = []
+    for msg in track:
+        if not isinstance(msg, dict):
+            msg = msg.dict()
+        rows.append((
+            _EVENT_TYPE_CODES.get(msg["type"], EVENT_OTHER),
+            msg.get("channel", 0),
+            msg.get("note", -1),
+            msg.get("velocity", 0),
+            msg["time"],
+            0,
+        ))
+    events = np.array(rows, dtype=MIDI_EVENT_DTYPE)
+    np.cumsum(events["time"], out=events["tick"])
+    return events
+
+
+def array_to_dicts(events: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    将结构化数组转换回msg.dict()格式的消息列表，供基于字典的代码使用
+
+    音符消息保留type/channel/note/velocity/time，其他消息只保留增量时间，type为"other"
+    """
+    track = []
+    for event_type, channel, note, velocity, delta, _ in events.tolist():
+        if event_type == EVENT_OTHER:
+            track.append({"type": "other", "time": delta})
+        else:
+            track.append({"type": _EVENT_TYPE_NAMES[event_type], "time": delta, "note": note,
+                          "velocity": velocity, "channel": channel})
+    return track
+
+
+def transpose_events(events: np.ndarray, semitones: int) -> np.ndarray:
+    """返回所有带音符的消息移调后的新数组"""
+    transposed = events.copy()
+    if semitones:
+        has_note = transposed["note"] >= 0
+        transposed["note"][has_note] += semitones
+    return transposed
+
+
+def average_pitch(tracks: Sequence[np.ndarray]) -> Optional[float]:
+    """计算所有音轨中带音符消息的平均音高，没有音符时返回None"""
+    total = 0
+    count = 0
+    for events in tracks:
+        notes = events["note"][events["note"] >= 0]
+        total += int(notes.sum(dtype=np.int64))
+        count += len(notes)
+    return total / count if count else None
+
+
+def pitch_class_histogram(events: np.ndarray) -> np.ndarray:
+    """统计note_on消息的音级分布（长度为12，0=C, 1=C#, ..., 11=B）"""
+    notes = events["note"][events["type"] == EVENT_NOTE_ON]
+    return np.bincount(notes % 12, minlength=12)
+
+
+class NoteBatch(NamedTuple):
+    """
+    时间表中同一时刻的一组按键事件（例如和弦）
+
+    actions中按MIDI原始顺序保存(按键, 是否按下)，整组通过一次批量调用发送
+    """
+    deadline_ns: int  # 相对于播放开始的绝对时间（纳秒）
+    actions: Tuple[Tuple[str, bool], ...]
+
+
+class NoteSchedule(NamedTuple):
+    """
+    编译后的不可变播放时间表
+
+    所有事件的时间都是相对于同一个起点的绝对时间，
+    播放时只需要一个单调时钟起点，误差不会随歌曲长度累积。
+    时间表可以在多次重放之间复用，无需重新解析MIDI文件。
+    """
+    batches: Tuple[NoteBatch, ...]
+    duration_ns: int
+
+
+# MIDI文件未指定速度时的默认值（微秒/拍，即120 BPM）
+DEFAULT_MIDI_TEMPO = 500000
+# 用户BPM为该值时按MIDI文件原速播放
+DEFAULT_BPM = 120
+
+
+class TempoMap:
+    """
+    速度映射：由set_tempo事件分段，把绝对tick换算为播放时间
+
+    每一段记录起始tick、起始时间（微秒）和该段的速度（微秒/拍），换算时二分查找所在段；
+    用户BPM作为整体缩放系数，DEFAULT_BPM对应原速。
+    """
+
+    def __init__(self, ticks_per_beat: int, changes: Sequence[Tuple[int, int]] = (), bpm: float = DEFAULT_BPM):
+        """
+        :param ticks_per_beat: 每拍的tick数
+        :param changes: (绝对tick, 微秒/拍)形式的速度变化列表
+        :param bpm: 用户BPM，DEFAULT_BPM表示按文件原速播放
+        """
+        self.ticks_per_beat = ticks_per_beat
+        self.scale = DEFAULT_BPM / bpm
+        self.segment_ticks = [0]
+        self.segment_us = [0.0]
+        self.segment_tempos = [DEFAULT_MIDI_TEMPO]
+        for tick, tempo in sorted(changes, key=lambda change: change[0]):
+            last_tick = self.segment_ticks[-1]
+            if tick == last_tick:
+                # 同一tick的多个速度事件以最后一个为准
+                self.segment_tempos[-1] = tempo
+                continue
+            self.segment_us.append(self.segment_us[-1] + (tick - last_tick) * self.segment_tempos[-1] / ticks_per_beat)
+            self.segment_ticks.append(tick)
+            self.segment_tempos.append(tempo)
+
+    @classmethod
+    def from_midi(cls, mid, bpm: float = DEFAULT_BPM) -> "TempoMap":
+        """从mido.MidiFile的所有音轨中收集set_tempo事件"""
+        changes = []
+        for track in mid.tracks:
+            tick = 0
+            for msg in track:
+                tick += msg.time
+                if msg.type == "set_tempo":
+                    changes.append((tick, msg.tempo))
+        return cls(mid.ticks_per_beat, changes, bpm)
+
+    def __len__(self):
+        return len(self.segment_ticks)
+
+    def tick_to_ns(self, tick: int) -> int:
+        """把绝对tick换算为相对于开头的播放时间（纳秒），每次换算为O(log n)"""
+        segment = bisect.bisect_right(self.segment_ticks, tick) - 1
+        us = (self.segment_us[segment]
+              + (tick - self.segment_ticks[segment]) * self.segment_tempos[segment] / self.ticks_per_beat)
+        return round(us * 1000 * self.scale)
+
+    def ns_to_tick(self, ns: float) -> float:
+        """tick_to_ns的逆运算：把播放时间（纳秒）换算为绝对tick，结果可能不是整数"""
+        us = ns / 1000 / self.scale
+        segment = bisect.bisect_right(self.segment_us, us) - 1
+        return (self.segment_ticks[segment]
+                + (us - self.segment_us[segment]) * self.ticks_per_beat / self.segment_tempos[segment])
+
+    def seconds_per_beat(self, tick: int = 0) -> float:
+        """指定tick处每拍的实际播放秒数（已包含BPM缩放）"""
+        segment = bisect.bisect_right(self.segment_ticks, tick) - 1
+        return self.segment_tempos[segment] / 1e6 * self.scale
+
+
+def merge_message_streams(tracks: Sequence[Iterable[Dict[str, Any]]],
+                          track_field: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按绝对tick对多条音轨做k路堆合并，生成单一时间顺序的消息流
+
+    同一tick的消息按音轨顺序、再按音轨内顺序排列；输出消息的time改写为合并后的增量tick。
+    输入可以是列表也可以是生成器，合并过程是惰性的。
+
+    :param tracks: 每条音轨的消息字典（time为增量tick）可迭代对象
+    :param track_field: 不为None时，把消息所在音轨在tracks中的序号写入消息的该字段（如供resolve_key_collisions按音轨决定优先级）
+    """
+    def with_ticks(track_index, messages):
+        tick = 0
+        for position, msg in enumerate(messages):
+            tick += msg["time"]
+            yield tick, track_index, position, msg
+
+    last_tick = 0
+    for tick, track_index, _, msg in heapq.merge(*(with_ticks(index, track) for index, track in enumerate(tracks))):
+        msg["time"] = tick - last_tick
+        last_tick = tick
+        if track_field is not None:
+            msg[track_field] = track_index
+        yield msg
+
+
+def resolve_key_collisions(messages: Iterable[Dict[str, Any]], key_map: Dict[int, Any],
+                           max_polyphony: Optional[int] = None,
+                           stats: Optional[Dict[str, int]] = None,
+                           priority: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    处理多音轨合并后的按键冲突并限制同时按下的按键数
+
+    同一个按键按引用计数处理：已按下时的重复按下不再发送，最后一个释放时才真正松开；
+    按下的按键数达到max_polyphony时，按优先级决定丢弃哪个音符：新的按下比所有已按下按键的优先级都高时，
+    提前松开优先级最低、其中最早按下的按键（其后续释放被丢弃）并按下新的按键，否则丢弃新的按下和对应的释放。
+    被过滤的消息替换为只保留增量时间的"other"消息，不影响后续时间。
+
+    :param messages: 消息字典的可迭代对象
+    :param key_map: 音符到按键的映射
+    :param max_polyphony: 最大同时按下的按键数，None表示不限制
+    :param stats: 可选的统计字典，累计collisions（合并的重复按键）、dropped（超出复音数丢弃的音符）
+                  和preempted（被优先级更高的音符提前松开的按键）
+    :param priority: 按下消息的优先级，返回值越小越优先（如音轨序号）；None表示所有音符优先级相同，总是丢弃新的按下
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("collisions", 0)
+    stats.setdefault("dropped", 0)
+    stats.setdefault("preempted", 0)
+    held = {}  # 按键 -> 按下计数
+    held_by = {}  # 按键 -> (优先级, 音符)，即实际按下该按键的消息
+    dropped = {}  # 按键 -> 被丢弃且尚未释放的按下数
+    for msg in messages:
+        key = key_map.get(msg.get("note"))
+        if key is None:
+            yield msg
+            continue
+        if msg["type"] == "note_on" and msg["velocity"] > 0:
+            count = held.get(key, 0)
+            if count:
+                held[key] = count + 1
+                stats["collisions"] += 1
+            elif max_polyphony is not None and len(held) >= max_polyphony:
+                rank = priority(msg) if priority is not None else None
+                victim = None
+                if rank is not None:
+                    victim = max(held_by, key=lambda held_key: held_by[held_key][0])
+                    if not held_by[victim][0] > rank:
+                        victim = None
+                if victim is None:
+                    dropped[key] = dropped.get(key, 0) + 1
+                    stats["dropped"] += 1
+                else:
+                    # 提前松开优先级最低的按键，它之后的释放消息都被丢弃
+                    dropped[victim] = dropped.get(victim, 0) + held.pop(victim)
+                    stats["preempted"] += 1
+                    yield {"type": "note_off", "note": held_by.pop(victim)[1], "velocity": 0, "time": msg["time"]}
+                    msg["time"] = 0
+                    held[key] = 1
+                    held_by[key] = (rank, msg["note"])
+                    yield msg
+                    continue
+            else:
+                held[key] = 1
+                held_by[key] = (priority(msg) if priority is not None else None, msg["note"])
+                yield msg
+                continue
+        else:
+            count = held.get(key, 0)
+            if count == 1:
+                del held[key]
+                del held_by[key]
+                yield msg
+                continue
+            if count > 1:
+                held[key] = count - 1
+            elif dropped.get(key):
+                dropped[key] -= 1
+            else:
+                # 没有对应按下的释放消息，保持原样发送
+                yield msg
+                continue
+        yield {"type": "other", "time": msg["time"]}
+
+
+def iter_note_batches(messages: Iterable[Dict[str, Any]], key_map: Dict[int, str],
+                      tempo_map: TempoMap) -> Iterator[NoteBatch]:
+    """
+    逐条读取音轨消息，按绝对时间生成按键批次
+
+    可以直接消费生成器形式的消息流，生成一个批次只需读到下一个不同时刻的事件
+
+    :param messages: 音轨消息字典（mido的msg.dict()格式，time为增量tick）的可迭代对象
+    :param key_map: 音符到按键的映射
+    :param tempo_map: 速度映射，用于把绝对tick换算为播放时间
+    """
+    tick_to_ns = tempo_map.tick_to_ns
+    actions = []
+    batch_deadline_ns = 0
+    missing_notes = {}
+    abs_ticks = 0
+    for msg in messages:
+        # 所有消息（包括非音符消息）的增量时间都需要累加
+        abs_ticks += msg["time"]
+        if "note" not in msg:
+            continue
+
+        note = msg["note"]
+        if note not in key_map:
+            missing_notes[note] = missing_notes.get(note, 0) + 1
+            continue
+
+        if msg["type"] == "note_on" and msg["velocity"] > 0:
+            down = True
+        elif msg["type"] == "note_off" or msg["velocity"] == 0:
+            down = False
+        else:
+            continue
+        # 从绝对tick直接换算，避免浮点增量累积误差
+        deadline_ns = tick_to_ns(abs_ticks)
+        # 时间相同的事件合并为一个批次
+        if actions and deadline_ns != batch_deadline_ns:
+            yield NoteBatch(batch_deadline_ns, tuple(actions))
+            actions = []
+        batch_deadline_ns = deadline_ns
+        actions.append((key_map[note], down))
+    if actions:
+        yield NoteBatch(batch_deadline_ns, tuple(actions))
+
+    for note, count in missing_notes.items():
+        logger.error("note {} not in map（共 {} 次）", note, count)
+
+
+def compile_schedule(track: List[Dict[str, Any]], key_map: Dict[int, str], tempo_map: TempoMap) -> NoteSchedule:
+    """
+    将音轨消息列表编译为绝对时间的按键时间表
+
+    :param track: 音轨消息字典列表（mido的msg.dict()格式，time为增量tick）
+    :param key_map: 音符到按键的映射
+    :param tempo_map: 速度映射，用于把绝对tick换算为播放时间
+    :return: 不可变的播放时间表
+    """
+    batches = tuple(iter_note_batches(track, key_map, tempo_map))
+    duration_ns = tempo_map.tick_to_ns(sum(msg["time"] for msg in track))
+    event_count = sum(len(batch.actions) for batch in batches)
+    logger.info("时间表编译完成，事件数量: {}, 批次数量: {}, 时长: {:.2f}秒", event_count, len(batches), duration_ns / 1e9)
+    return NoteSchedule(batches, duration_ns)
+
+
+# 缓存文件格式：魔数、格式版本、时长、按键数量、批次数量
+_SCHEDULE_MAGIC = b"GNSC"
+_SCHEDULE_HEADER = struct.Struct("<4sHqII")
+# 编译结果的版本号，编译逻辑变化时需要递增，使旧缓存失效
+SCHEDULE_FORMAT_VERSION = 2
+
+# 应用目录：打包后为可执行文件所在目录，否则为仓库根目录；默认的缓存都放在其下的cache目录，与启动时的工作目录无关
+APP_DIR = (os.path.dirname(sys.executable) if getattr(sys, "frozen", False)
+           else os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(APP_DIR, "cache")
+
+
+def encode_schedule(schedule: NoteSchedule) -> Optional[bytes]:
+    """
+    将时间表编码为紧凑的二进制格式
+
+    格式：文件头 + 按键表 + 批次时间(int64数组) + 批次大小(uint16数组) + 动作(每个1字节，
+    低7位为按键表索引，最高位表示按下)
+
+    :return: 编码后的字节串，按键不是字符串或超过127个时返回None
+    """
+    key_index = {}
+    deadlines = array("q")
+    sizes = array("H")
+    actions = bytearray()
+    for batch in schedule.batches:
+        deadlines.append(batch.deadline_ns)
+        sizes.append(len(batch.actions))
+        for key, down in batch.actions:
+            if not isinstance(key, str):
+                return None
+            index = key_index.setdefault(key, len(key_index))
+            if index > 0x7F:
+                return None
+            actions.append(index | (0x80 if down else 0))
+
+    parts = [_SCHEDULE_HEADER.pack(_SCHEDULE_MAGIC, SCHEDULE_FORMAT_VERSION, schedule.duration_ns,
+                                   len(key_index), len(deadlines))]
+    for key in key_index:
+        encoded = key.encode("utf-8")
+        parts.append(bytes([len(encoded)]) + encoded)
+    parts.append(deadlines.tobytes())
+    parts.append(sizes.tobytes())
+    parts.append(bytes(actions))
+    return b"".join(parts)
+
+
+def decode_schedule(data: bytes) -> Optional[NoteSchedule]:
+    """
+    从二进制格式解码时间表
+
+    :return: 时间表，格式或版本不匹配、文件被截断或内容损坏时返回None
+    """
+    if len(data) < _SCHEDULE_HEADER.size:
+        return None
+    magic, version, duration_ns, key_count, batch_count = _SCHEDULE_HEADER.unpack_from(data)
+    if magic != _SCHEDULE_MAGIC or version != SCHEDULE_FORMAT_VERSION or key_count > 0x80:
+        return None
+
+    offset = _SCHEDULE_HEADER.size
+    keys = []
+    for _ in range(key_count):
+        if offset >= len(data):
+            return None
+        length = data[offset]
+        offset += 1
+        if offset + length > len(data):
+            return None
+        try:
+            keys.append(data[offset:offset + length].decode("utf-8"))
+        except UnicodeDecodeError:
+            return None
+        offset += length
+    # 预先生成所有(按键, 是否按下)组合，解码时直接按字节查表
+    action_table = [(keys[code & 0x7F], bool(code & 0x80)) if (code & 0x7F) < key_count else None
+                    for code in range(256)]
+
+    deadlines = array("q")
+    sizes = array("H")
+    table_size = batch_count * (deadlines.itemsize + sizes.itemsize)
+    if offset + table_size > len(data):
+        return None
+    deadlines.frombytes(data[offset:offset + batch_count * deadlines.itemsize])
+    offset += batch_count * deadlines.itemsize
+    sizes.frombytes(data[offset:offset + batch_count * sizes.itemsize])
+    offset += batch_count * sizes.itemsize
+    actions = data[offset:]
+    if sum(sizes) != len(actions):
+        return None
+    # 按键索引超出按键表的动作说明文件已损坏
+    if any(action_table[code] is None for code in set(actions)):
+        return None
+
+    batches = []
+    position = 0
+    for deadline_ns, size in zip(deadlines, sizes):
+        batches.append(NoteBatch(deadline_ns, tuple(action_table[code] for code in actions[position:position + size])))
+        position += size
+    return NoteSchedule(tuple(batches), duration_ns)
+
+
+class CompiledSongCache:
+    """
+    编译后时间表的磁盘缓存
+
+    以MIDI文件内容哈希、BPM、音轨、按键映射和最小释放时间作为键，
+    按总大小进行LRU淘汰（使用文件修改时间记录最近访问）。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        """
+        :param cache_dir: 缓存目录，默认为CACHE_DIR下的songs目录，第一次写入时创建
+        :param max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, "songs")
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(file_path: str, bpm: int, track_num: Any, key_map: Dict[int, str],
+                 min_release_time: float, max_polyphony: Optional[int] = None) -> Optional[str]:
+        """
+        计算缓存键
+
+        :param track_num: 音轨编号或音轨编号元组
+        :param max_polyphony: 多音轨合并时的最大复音数，影响编译结果
+        :return: 十六进制缓存键，文件无法读取时返回None
+        """
+        try:
+            with open(file_path, "rb") as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError as e:
+            logger.error("读取MIDI文件失败: {}", e)
+            return None
+        key_source = repr((SCHEDULE_FORMAT_VERSION, content_hash, bpm, track_num,
+                           sorted(key_map.items()), min_release_time, max_polyphony))
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[NoteSchedule]:
+        """读取缓存，命中时刷新访问时间"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        schedule = decode_schedule(data)
+        if schedule is None:
+            logger.warning("缓存文件 {} 无效，已忽略", path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return schedule
+
+    def put(self, key: str, schedule: NoteSchedule) -> bool:
+        """写入缓存并按总大小淘汰最久未使用的条目"""
+        data = encode_schedule(schedule)
+        if data is None:
+            logger.warning("时间表包含无法编码的按键，跳过缓存")
+            return False
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error("写入缓存失败: {}", e)
+            return False
+        logger.debug("时间表已缓存到 {}，大小: {} 字节", path, len(data))
+        self._evict()
+        return True
+
+    def _evict(self):
+        """按访问时间从旧到新删除缓存，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".bin"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.debug("淘汰缓存 {}", path)
+            except OSError as e:
+                logger.warning("删除缓存失败: {}", e)
+
+
+# 曲库索引的版本号，分析逻辑变化时需要递增，使旧的分析结果失效
+LIBRARY_INDEX_VERSION = 1
+
+
+class MidiLibraryIndex:
+    """
+    曲库预分析结果的索引文件
+
+    以MIDI文件绝对路径为键，记录文件修改时间和大小，文件变化后对应条目自动失效。
+    条目内容（调式、移调量、调外音数量、时长等）由分析方决定，索引只负责存取。
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        """
+        :param index_path: 索引文件路径，默认为CACHE_DIR下的library_index.json；不存在时为空索引，保存时创建
+        """
+        index_path = index_path or os.path.join(CACHE_DIR, "library_index.json")
+        self.index_path = index_path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("曲库索引 {} 无效，已忽略: {}", index_path, e)
+            return
+        if data.get("version") == LIBRARY_INDEX_VERSION:
+            self.entries = data.get("files", {})
+        else:
+            logger.info("曲库索引版本已变化，需要重新分析")
+
+    @staticmethod
+    def file_signature(file_path: str) -> Optional[Tuple[float, int]]:
+        """返回文件的(修改时间, 大小)，文件不存在时返回None"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """读取文件的分析结果，文件未分析或已修改时返回None"""
+        entry = self.entries.get(os.path.abspath(file_path))
+        if entry is None:
+            return None
+        signature = self.file_signature(file_path)
+        if signature is None or [entry.get("mtime"), entry.get("size")] != list(signature):
+            return None
+        return entry
+
+    def put(self, file_path: str, entry: Dict[str, Any]):
+        """记录文件的分析结果，同时记录当前的文件签名"""
+        signature = self.file_signature(file_path)
+        if signature is None:
+            return
+        entry = dict(entry, mtime=signature[0], size=signature[1])
+        self.entries[os.path.abspath(file_path)] = entry
+
+    def save(self) -> bool:
+        """原子写入索引文件"""
+        directory = os.path.dirname(self.index_path)
+        temp_path = f"{self.index_path}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": LIBRARY_INDEX_VERSION, "files": self.entries}, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.error("写入曲库索引失败: {}", e)
+            return False
+        logger.info("曲库索引已保存到 {}，共 {} 个文件", self.index_path, len(self.entries))
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class PlaybackClock:
+    """
+    播放时钟基类，只使用time.sleep等待
+
+    所有截止时间都是相对于start()时刻的纳秒数，
+    每次等待结束后记录实际延迟到直方图中（每个批次记录一次）。
+    """
+
+    def __init__(self):
+        self.start_ns = 0
+        self.histogram = LatenessHistogram()
+
+    def start(self):
+        """以当前时刻作为播放起点，并清空延迟统计"""
+        self.histogram = LatenessHistogram()
+        self.start_ns = time.perf_counter_ns()
+
+    def elapsed_ns(self) -> int:
+        """距离播放起点经过的时间（纳秒）"""
+        return time.perf_counter_ns() - self.start_ns
+
+    def _wait(self, target_ns: int):
+        remaining_ns = target_ns - time.perf_counter_ns()
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+
+    def wait_until(self, deadline_ns: int) -> int:
+        """
+        等待到截止时间并记录延迟
+
+        :param deadline_ns: 相对于播放起点的截止时间（纳秒）
+        :return: 实际延迟（纳秒）
+        """
+        target_ns = self.start_ns + deadline_ns
+        self._wait(target_ns)
+        lateness_ns = time.perf_counter_ns() - target_ns
+        self.histogram.record(lateness_ns)
+        return lateness_ns
+
+    def stats(self) -> Dict[str, float]:
+        """获取本次播放的延迟统计"""
+        return self.histogram.summary()
+
+
+class HybridClock(PlaybackClock):
+    """
+    高精度混合时钟
+
+    先用time.sleep粗略睡眠到截止时间前spin_ns，
+    剩余时间在time.perf_counter_ns上自旋，消除系统睡眠的毫秒级抖动。
+    """
+
+    def __init__(self, spin_ns: int = 2_000_000):
+        """
+        :param spin_ns: 截止时间前开始自旋的提前量（纳秒），默认2毫秒
+        """
+        super().__init__()
+        self.spin_ns = spin_ns
+
+    def _wait(self, target_ns: int):
+        remaining_ns = target_ns - time.perf_counter_ns() - self.spin_ns
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+        while time.perf_counter_ns() < target_ns:
+            pass
+
+
+__all__ = [
+    'EVENT_OTHER', 'EVENT_NOTE_ON', 'EVENT_NOTE_OFF', 'MIDI_EVENT_DTYPE',
+    'MAJOR_SCALE', 'MINOR_SCALE', 'MAJOR_SCALE_MASKS', 'MINOR_SCALE_MASKS',
+    'track_to_array', 'array_to_dicts', 'transpose_events', 'average_pitch', 'pitch_class_histogram',
+    'DEFAULT_MIDI_TEMPO', 'DEFAULT_BPM', 'TempoMap', 'merge_message_streams', 'resolve_key_collisions',
+    'NoteBatch', 'NoteSchedule', 'iter_note_batches', 'compile_schedule',
+    'encode_schedule', 'decode_schedule', 'CompiledSongCache', 'SCHEDULE_FORMAT_VERSION',
+    'MidiLibraryIndex', 'LIBRARY_INDEX_VERSION', 'APP_DIR', 'CACHE_DIR',
+    'LatenessHistogram', 'PlaybackClock', 'HybridClock',
+]
@@ -0,0 +1,184 @@
+"""
+画面与关键点环形缓冲区
+预分配固定数量的画面槽位和关键点槽位，采集、识别和控制各环节通过槽位编号传递数据，稳定运行后每帧不再分配内存；
+可以放在共享内存中，供识别进程直接读写
+"""
+
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# 手部关键点数量
+NUM_LANDMARKS = 21
+
+# 各区域在内存块中按该字节数对齐
+_ALIGNMENT = 64
+
+# 每个槽位的元数据：帧序号、采集时间戳、槽位中画面的实际尺寸（可以小于槽位尺寸，如ROI裁剪区域）
+SLOT_META_DTYPE = np.dtype([
+    ("frame_id", np.int64),
+    ("timestamp_ns", np.int64),
+    ("height", np.int32),
+    ("width", np.int32),
+])
+
+
+def landmark_dtype(max_num_hands: int) -> np.dtype:
+    """
+    关键点槽位的结构化类型
+
+    num_hands为检测到的手数，其余字段与HGRUtils.get_result_views返回的数组布局相同：
+    关键点和世界坐标关键点为(手数, 21, 3)，左右手为(手数, 2)即[左右手编码, 置信度]
+    """
+    return np.dtype([
+        ("num_hands", np.int32),
+        ("landmarks", np.float32, (max_num_hands, NUM_LANDMARKS, 3)),
+        ("world_landmarks", np.float32, (max_num_hands, NUM_LANDMARKS, 3)),
+        ("handedness", np.float32, (max_num_hands, 2)),
+    ])
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class FrameRingSpec(NamedTuple):
+    """在其他进程中重新打开共享内存环形缓冲区所需的信息，可以被pickle"""
+    name: str
+    slot_count: int
+    frame_shape: Optional[Tuple[int, ...]]
+    max_num_hands: int
+
+
+class FrameRing:
+    """
+    画面与关键点环形缓冲区
+
+    一块连续内存依次划分为画面区(槽位数, *画面形状)、关键点区(槽位数,)和元数据区(槽位数,)，
+    frame_shape为None时只有关键点和元数据。槽位的分配和读写顺序由使用方负责（如三缓冲交换、按序号轮转或空闲列表），
+    环形缓冲区本身不加锁。
+    """
+
+    def __init__(self, slot_count: int, frame_shape: Optional[Tuple[int, ...]] = None, max_num_hands: int = 1,
+                 shared: bool = False, _attach_name: Optional[str] = None):
+        """
+        :param slot_count: 槽位数
+        :param frame_shape: 每个画面槽位的形状，如(480, 640, 3)，uint8；None表示不存放画面
+        :param max_num_hands: 每个关键点槽位最多存放的手数
+        :param shared: 是否放在共享内存中，其他进程可以通过spec和attach打开
+        """
+        self.slot_count = slot_count
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+        self.max_num_hands = max_num_hands
+        self.frame_bytes = int(np.prod(self.frame_shape)) if self.frame_shape is not None else 0
+        landmarks_dtype = landmark_dtype(max_num_hands)
+        frames_size = _aligned(slot_count * self.frame_bytes)
+        landmarks_size = _aligned(slot_count * landmarks_dtype.itemsize)
+        total_size = frames_size + landmarks_size + slot_count * SLOT_META_DTYPE.itemsize
+
+        self._memory = None
+        self._owner = _attach_name is None
+        if _attach_name is not None:
+            self._memory = shared_memory.SharedMemory(name=_attach_name)
+            buffer = self._memory.buf
+        elif shared:
+            self._memory = shared_memory.SharedMemory(create=True, size=total_size)
+            buffer = self._memory.buf
+        else:
+            buffer = np.zeros(total_size, dtype=np.uint8)
+        memory = np.ndarray(total_size, dtype=np.uint8, buffer=buffer)
+
+        self.frames = memory[:slot_count * self.frame_bytes].reshape((slot_count,) + (self.frame_shape or (0,)))
+        self.landmarks = memory[frames_size:frames_size + slot_count * landmarks_dtype.itemsize] \
+            .view(landmarks_dtype)
+        self.meta = memory[frames_size + landmarks_size:].view(SLOT_META_DTYPE)
+        self._frames_flat = memory[:slot_count * self.frame_bytes].reshape(slot_count, self.frame_bytes)
+
+    @classmethod
+    def for_frame(cls, frame: np.ndarray, slot_count: int, **kwargs) -> "FrameRing":
+        """按一帧画面的形状创建环形缓冲区"""
+        return cls(slot_count, frame.shape, **kwargs)
+
+    @classmethod
+    def attach(cls, spec: FrameRingSpec) -> "FrameRing":
+        """在其他进程中打开共享内存中的环形缓冲区，关闭时不会释放共享内存"""
+        return cls(spec.slot_count, spec.frame_shape, spec.max_num_hands, _attach_name=spec.name)
+
+    @property
+    def spec(self) -> FrameRingSpec:
+        if self._memory is None:
+            raise ValueError("环形缓冲区不在共享内存中")
+        return FrameRingSpec(self._memory.name, self.slot_count, self.frame_shape, self.max_num_hands)
+
+    def __len__(self) -> int:
+        return self.slot_count
+
+    def frame_view(self, slot: int, height: int, width: int) -> np.ndarray:
+        """
+        槽位开头的一幅(height, width, 通道)连续画面，尺寸不能超过槽位
+
+        用于存放比槽位小的画面（如裁剪、缩放后的画面），返回的视图是连续的，可以直接交给OpenCV和MediaPipe
+        """
+        channels = self.frame_shape[2] if len(self.frame_shape) > 2 else 1
+        size = height * width * channels
+        if size > self.frame_bytes:
+            raise ValueError(f"画面尺寸({height}, {width})超过槽位尺寸{self.frame_shape}")
+        return self._frames_flat[slot, :size].reshape((height, width) + self.frame_shape[2:])
+
+    def write_frame(self, slot: int, image: np.ndarray, frame_id: int = 0, timestamp_ns: int = 0) -> np.ndarray:
+        """把画面复制到槽位开头并记录元数据，返回槽位中的画面视图"""
+        height, width = image.shape[:2]
+        view = self.frame_view(slot, height, width)
+        view[...] = image
+        self.set_meta(slot, frame_id, timestamp_ns, height, width)
+        return view
+
+    def read_frame(self, slot: int) -> np.ndarray:
+        """按元数据中记录的尺寸取槽位中的画面视图"""
+        meta = self.meta[slot]
+        return self.frame_view(slot, int(meta["height"]), int(meta["width"]))
+
+    def set_meta(self, slot: int, frame_id: int, timestamp_ns: int, height: int = 0, width: int = 0):
+        meta = self.meta[slot]
+        meta["frame_id"] = frame_id
+        meta["timestamp_ns"] = timestamp_ns
+        meta["height"] = height
+        meta["width"] = width
+
+    def write_hands(self, slot: int, landmarks: np.ndarray, world_landmarks: Optional[np.ndarray] = None,
+                    handedness: Optional[np.ndarray] = None) -> int:
+        """
+        把(手数, 21, 3)的关键点（以及可选的世界坐标关键点和左右手）复制到关键点槽位
+
+        :return: 写入的手数，超过槽位容量的手被忽略
+        """
+        record = self.landmarks[slot]
+        num_hands = min(len(landmarks), self.max_num_hands)
+        record["landmarks"][:num_hands] = landmarks[:num_hands]
+        if world_landmarks is not None:
+            record["world_landmarks"][:num_hands] = world_landmarks[:num_hands]
+        if handedness is not None:
+            record["handedness"][:num_hands] = handedness[:num_hands]
+        record["num_hands"] = num_hands
+        return num_hands
+
+    def hands(self, slot: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """槽位中(关键点, 世界坐标关键点, 左右手)的视图，只包含实际检测到的手"""
+        record = self.landmarks[slot]
+        num_hands = int(record["num_hands"])
+        return record["landmarks"][:num_hands], record["world_landmarks"][:num_hands], record["handedness"][:num_hands]
+
+    def close(self):
+        """释放内存；共享内存由创建方在关闭时释放"""
+        self.frames = self.landmarks = self.meta = self._frames_flat = None
+        if self._memory is not None:
+            self._memory.close()
+            if self._owner:
+                self._memory.unlink()
+            self._memory = None
+
+
+__all__ = ['FrameRing', 'FrameRingSpec', 'SLOT_META_DTYPE', 'landmark_dtype', 'NUM_LANDMARKS']
@@ -1,28 +1,464 @@
+import sys
 import time
-from pynput.mouse import Button, Controller as MouseController
-from pynput.keyboard import Key, Controller as KeyboardController
-import pyautogui
-from typing import Tuple, Optional, Union, List, Dict, Literal
-from .logger import logger
-import time
+import heapq
+import threading
+import numpy as np
+from typing import Tuple, Optional, Union, List, Dict, Literal, Any
+from .logger import get_logger
+from .histogram import LatenessHistogram
 
+logger = get_logger(__name__)
+
+
+class InputBackend:
+    """
+    输入后端接口
+
+    GUIController通过后端发送键盘和鼠标事件，可以替换为不依赖显示器的实现（如RecordingBackend），
+    用于在无桌面环境下测试和测量延迟
+    """
+
+    def screen_size(self) -> Tuple[int, int]:
+        """返回屏幕尺寸(宽, 高)"""
+        raise NotImplementedError
+
+    def virtual_bounds(self) -> Tuple[int, int, int, int]:
+        """返回多显示器虚拟桌面的范围(左, 上, 宽, 高)，默认与主屏幕相同"""
+        width, height = self.screen_size()
+        return 0, 0, width, height
+
+    def cursor_position(self) -> Tuple[int, int]:
+        """返回当前鼠标位置"""
+        raise NotImplementedError
+
+    def mouse_move(self, x: int, y: int):
+        raise NotImplementedError
+
+    def mouse_button(self, button: str, down: bool):
+        raise NotImplementedError
+
+    def mouse_scroll(self, scroll_amount: int):
+        raise NotImplementedError
+
+    def key(self, key: Any, down: bool):
+        raise NotImplementedError
+
+
+class PynputBackend(InputBackend):
+    """使用pynput发送真实输入事件的后端，pyautogui只用于获取屏幕尺寸"""
 
-class GUIController:
     def __init__(self):
-        logger.debug("初始化GUIController")
-        self.screen_size = pyautogui.size()
-        logger.info(f"屏幕尺寸: {self.screen_size}")
+        # 延迟导入，使用其他后端时不需要安装pynput和pyautogui，也不需要显示器
+        import pyautogui
+        from pynput.mouse import Button, Controller as MouseController
+        from pynput.keyboard import Controller as KeyboardController
+        self._pyautogui = pyautogui
+        self._buttons = Button
         self.mouse = MouseController()
         self.keyboard = KeyboardController()
 
+    def screen_size(self) -> Tuple[int, int]:
+        return self._pyautogui.size()
+
+    def virtual_bounds(self) -> Tuple[int, int, int, int]:
+        if sys.platform == "win32":
+            import ctypes
+            metrics = ctypes.windll.user32.GetSystemMetrics
+            # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN
+            left, top, width, height = (metrics(index) for index in (76, 77, 78, 79))
+            if width > 0 and height > 0:
+                return left, top, width, height
+        return super().virtual_bounds()
+
+    def cursor_position(self) -> Tuple[int, int]:
+        return self.mouse.position
+
+    def mouse_move(self, x: int, y: int):
+        self.mouse.position = (x, y)
+
+    def mouse_button(self, button: str, down: bool):
+        if down:
+            self.mouse.press(self._buttons[button])
+        else:
+            self.mouse.release(self._buttons[button])
+
+    def mouse_scroll(self, scroll_amount: int):
+        self.mouse.scroll(0, scroll_amount)
+
+    def key(self, key: Any, down: bool):
+        if down:
+            self.keyboard.press(key)
+        else:
+            self.keyboard.release(key)
+
+
+# RecordingBackend记录的事件类型
+OP_KEY = 1
+OP_MOUSE_MOVE = 2
+OP_MOUSE_BUTTON = 3
+OP_MOUSE_SCROLL = 4
+
+_MOUSE_BUTTON_CODES = {"left": 0, "right": 1, "middle": 2}
+
+# 记录的事件：时间戳（perf_counter_ns）、类型、是否按下，
+# a/b对于按键为按键码（单个字符取ord，无法编码时为-1），对于鼠标移动为坐标，对于鼠标按钮为按钮编号，对于滚动为滚动量
+INPUT_EVENT_DTYPE = np.dtype([
+    ("time_ns", np.int64),
+    ("op", np.uint8),
+    ("down", np.bool_),
+    ("a", np.int32),
+    ("b", np.int32),
+])
+
+
+class RecordingBackend(InputBackend):
+    """
+    不发送任何输入、只记录调用的后端
+
+    每次调用都用perf_counter_ns打时间戳，写入预分配的结构化数组，记录过程不分配新的缓冲区；
+    缓冲区写满后不再记录，只统计丢弃数量
+    """
+
+    def __init__(self, capacity: int = 1 << 20, screen_size: Tuple[int, int] = (1920, 1080),
+                 virtual_bounds: Optional[Tuple[int, int, int, int]] = None):
+        """
+        :param capacity: 最多记录的事件数
+        :param screen_size: 模拟的屏幕尺寸
+        :param virtual_bounds: 模拟的虚拟桌面范围(左, 上, 宽, 高)，默认与屏幕相同
+        """
+        self.buffer = np.zeros(capacity, dtype=INPUT_EVENT_DTYPE)
+        self.count = 0
+        self.dropped = 0
+        self._screen_size = screen_size
+        self._virtual_bounds = virtual_bounds or (0, 0, screen_size[0], screen_size[1])
+        self._position = (screen_size[0] // 2, screen_size[1] // 2)
+        # 查询鼠标位置的次数，用于确认缓存是否生效
+        self.position_queries = 0
+
+    def _record(self, op: int, down: bool, a: int, b: int):
+        timestamp = time.perf_counter_ns()
+        index = self.count
+        if index >= len(self.buffer):
+            self.dropped += 1
+            return
+        self.buffer[index] = (timestamp, op, down, a, b)
+        self.count = index + 1
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self._screen_size
+
+    def virtual_bounds(self) -> Tuple[int, int, int, int]:
+        return self._virtual_bounds
+
+    def set_geometry(self, screen_size: Tuple[int, int], virtual_bounds: Optional[Tuple[int, int, int, int]] = None):
+        """模拟显示器配置变化"""
+        self._screen_size = screen_size
+        self._virtual_bounds = virtual_bounds or (0, 0, screen_size[0], screen_size[1])
+
+    def cursor_position(self) -> Tuple[int, int]:
+        self.position_queries += 1
+        return self._position
+
+    def mouse_move(self, x: int, y: int):
+        left, top, width, height = self._virtual_bounds
+        # 与系统一样把鼠标限制在虚拟桌面内
+        self._position = (min(max(x, left), left + width - 1), min(max(y, top), top + height - 1))
+        self._record(OP_MOUSE_MOVE, False, x, y)
+
+    def mouse_button(self, button: str, down: bool):
+        self._record(OP_MOUSE_BUTTON, down, _MOUSE_BUTTON_CODES.get(button, -1), 0)
+
+    def mouse_scroll(self, scroll_amount: int):
+        self._record(OP_MOUSE_SCROLL, False, scroll_amount, 0)
+
+    def key(self, key: Any, down: bool):
+        if isinstance(key, str) and len(key) == 1:
+            code = ord(key)
+        elif isinstance(key, int):
+            code = key
+        else:
+            code = -1
+        self._record(OP_KEY, down, code, 0)
+
+    def events(self) -> np.ndarray:
+        """已记录事件的视图（不复制）"""
+        return self.buffer[:self.count]
+
+    def reset(self):
+        """清空记录，缓冲区复用"""
+        self.count = 0
+        self.dropped = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        统计记录的事件
+
+        :return: 事件数、丢弃数、首尾事件的时间跨度（毫秒）、吞吐量（事件/秒）和相邻事件的最大间隔（毫秒）
+        """
+        times = self.events()["time_ns"]
+        span_ns = int(times[-1] - times[0]) if len(times) > 1 else 0
+        return {
+            "count": self.count,
+            "dropped": self.dropped,
+            "span_ms": span_ns / 1e6,
+            "events_per_sec": (len(times) - 1) * 1e9 / span_ns if span_ns else 0.0,
+            "max_gap_ms": float(np.diff(times).max()) / 1e6 if len(times) > 1 else 0.0,
+        }
+
+
+class _CommandRing:
+    """
+    单生产者单消费者的有界环形队列
+
+    槽位预先分配，写入位置只由生产者修改，读取位置只由消费者修改，
+    在GIL下无需加锁；队列满时push返回False
+    """
+
+    def __init__(self, capacity: int):
+        size = 1
+        while size < capacity:
+            size *= 2
+        self._slots: List[Any] = [None] * size
+        self._mask = size - 1
+        self._head = 0  # 已写入的数量
+        self._tail = 0  # 已读取的数量
+
+    def push(self, item) -> bool:
+        head = self._head
+        if head - self._tail > self._mask:
+            return False
+        self._slots[head & self._mask] = item
+        self._head = head + 1
+        return True
+
+    def pop(self):
+        tail = self._tail
+        if tail == self._head:
+            return None
+        slot = tail & self._mask
+        item = self._slots[slot]
+        self._slots[slot] = None
+        self._tail = tail + 1
+        return item
+
+    def __len__(self):
+        return self._head - self._tail
+
+
+class InputDispatcher:
+    """
+    异步输入派发线程
+
+    调用方把(目标时间, 后端方法, 参数)放入环形队列后立即返回，专用线程按目标时间顺序执行，
+    先睡眠到目标时间前spin_ns，剩余时间自旋等待；执行延迟记录到直方图中。
+    队列为单生产者设计，同一个控制器只应由一个线程提交命令
+    """
+
+    def __init__(self, capacity: int = 1024, spin_ns: int = 1_000_000):
+        """
+        :param capacity: 环形队列容量（向上取整为2的幂）
+        :param spin_ns: 目标时间前开始自旋的提前量（纳秒），默认1毫秒
+        """
+        self.spin_ns = spin_ns
+        self.histogram = LatenessHistogram()
+        # 队列满时生产者等待的次数
+        self.full_waits = 0
+        self._ring = _CommandRing(capacity)
+        # 已取出但未到执行时间的命令，按(目标时间, 序号)排序
+        self._pending: List[Tuple[int, int, Any, tuple]] = []
+        self._sequence = 0
+        self._wakeup = threading.Event()
+        self._idle = False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="InputDispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, target_ns: int, function, *args):
+        """
+        提交一条输入命令
+
+        :param target_ns: 目标执行时间（perf_counter_ns时间戳）
+        :param function: 要执行的函数，通常是输入后端的方法
+        """
+        command = (target_ns, function, args)
+        while not self._ring.push(command):
+            # 队列满时让出CPU等待派发线程消费，不丢弃命令，避免按键无法释放
+            self.full_waits += 1
+            self._wakeup.set()
+            time.sleep(0.0005)
+        if self._idle:
+            self._wakeup.set()
+
+    def _drain(self):
+        """把环形队列中的命令移入按时间排序的待执行堆"""
+        while True:
+            command = self._ring.pop()
+            if command is None:
+                return
+            target_ns, function, args = command
+            heapq.heappush(self._pending, (target_ns, self._sequence, function, args))
+            self._sequence += 1
+
+    def _run(self):
+        pending = self._pending
+        while self._running or len(self._ring) or pending:
+            self._drain()
+            if pending:
+                remaining_ns = pending[0][0] - time.perf_counter_ns()
+                if remaining_ns <= 0 or not self._running:
+                    target_ns, _, function, args = heapq.heappop(pending)
+                    try:
+                        function(*args)
+                    except Exception as e:
+                        logger.error("派发输入命令失败: {}", e)
+                    self.histogram.record(time.perf_counter_ns() - target_ns)
+                    continue
+                if remaining_ns <= self.spin_ns:
+                    # 自旋时仍然检查新命令，新命令的目标时间可能更早
+                    time.sleep(0)
+                    continue
+                timeout = (remaining_ns - self.spin_ns) / 1e9
+            else:
+                timeout = None
+            # 先标记空闲再检查队列，保证不会错过生产者的唤醒
+            self._wakeup.clear()
+            self._idle = True
+            if not len(self._ring) and self._running:
+                self._wakeup.wait(timeout)
+            self._idle = False
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """等待所有已提交的命令执行完成"""
+        deadline = time.perf_counter() + timeout
+        while len(self._ring) or self._pending:
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def close(self, timeout: float = 1.0):
+        """停止派发线程，剩余命令（如待释放的按键）立即执行，不再等待目标时间"""
+        self._running = False
+        self._wakeup.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        """执行延迟统计（相对于目标时间）"""
+        return dict(self.histogram.summary(), full_waits=self.full_waits)
+
+
+class GUIController:
+    def __init__(self, backend: Optional[InputBackend] = None, async_dispatch: bool = False,
+                 coalesce_moves: bool = False, min_move_delta: int = 1, max_move_rate: Optional[float] = None,
+                 cursor_ttl: float = 0.05, geometry_interval: float = 2.0):
+        """
+        :param backend: 输入后端，默认使用pynput发送真实输入
+        :param async_dispatch: 是否使用异步派发线程，开启后键盘鼠标操作立即返回，
+            由派发线程按目标时间执行，click不再阻塞调用线程
+        :param coalesce_moves: 是否合并鼠标移动，开启后只保留最新的待移动目标，
+            与上次实际移动相差不到min_move_delta像素的目标直接丢弃
+        :param min_move_delta: 合并模式下实际移动的最小像素差（x或y方向）
+        :param max_move_rate: 合并模式下每秒最多实际移动的次数，None表示不限制；
+            同步模式下被限速的最新目标在下一次移动或鼠标按键时发出，也可以调用flush_moves
+        :param cursor_ttl: 鼠标位置缓存的有效期（秒），期间不查询系统；自身的移动会直接更新缓存
+        :param geometry_interval: 检查屏幕尺寸和虚拟桌面范围是否变化的间隔（秒）
+        """
+        logger.debug("初始化GUIController")
+        self.backend = backend or PynputBackend()
+
+        # 屏幕几何信息缓存，定期检查显示器配置是否变化
+        self._geometry_interval_ns = int(geometry_interval * 1e9)
+        self._geometry_checked_ns = 0
+        self._screen_size = None
+        self._virtual_bounds = None
+        self.refresh_geometry()
+        logger.info("屏幕尺寸: {}，虚拟桌面范围: {}", self._screen_size, self._virtual_bounds)
+
+        # 鼠标位置缓存
+        self._cursor_ttl_ns = int(cursor_ttl * 1e9)
+        self._cursor = None
+        self._cursor_ns = 0
+        self.dispatcher = InputDispatcher() if async_dispatch else None
+
+        # 鼠标移动合并状态，异步模式下由调用线程和派发线程共享
+        self.coalesce_moves = coalesce_moves
+        self.min_move_delta = min_move_delta
+        self._move_interval_ns = int(1e9 / max_move_rate) if max_move_rate else 0
+        self._move_lock = threading.Lock()
+        self._pending_move: Optional[Tuple[int, int]] = None
+        self._last_move: Optional[Tuple[int, int]] = None
+        self._last_move_ns = 0
+        self._move_flush_scheduled = False
+        # 请求的移动次数、实际发出的次数和被合并丢弃的次数
+        self.move_stats = {"requested": 0, "issued": 0, "dropped": 0}
+
+    def _send(self, at_ns: Optional[int], function, *args):
+        """同步模式下直接执行，异步模式下提交到派发线程（at_ns为None表示立即执行）"""
+        if self.dispatcher is None:
+            function(*args)
+        else:
+            self.dispatcher.submit(time.perf_counter_ns() if at_ns is None else at_ns, function, *args)
+
+    def close(self):
+        """停止异步派发线程，未执行的命令会立即执行"""
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+
+    def refresh_geometry(self) -> bool:
+        """
+        重新读取屏幕尺寸和虚拟桌面范围
+
+        :return: 显示器配置是否发生了变化，变化时鼠标位置缓存失效
+        """
+        self._geometry_checked_ns = time.perf_counter_ns()
+        screen_size = tuple(self.backend.screen_size())
+        virtual_bounds = tuple(self.backend.virtual_bounds())
+        changed = (screen_size, virtual_bounds) != (self._screen_size, self._virtual_bounds)
+        if changed and self._screen_size is not None:
+            logger.info("显示器配置已变化，屏幕尺寸: {}，虚拟桌面范围: {}", screen_size, virtual_bounds)
+            self._cursor = None
+        self._screen_size = screen_size
+        self._virtual_bounds = virtual_bounds
+        return changed
+
+    def _check_geometry(self):
+        if time.perf_counter_ns() - self._geometry_checked_ns >= self._geometry_interval_ns:
+            self.refresh_geometry()
+
+    @property
+    def screen_size(self) -> Tuple[int, int]:
+        """主屏幕尺寸(宽, 高)，定期检查是否变化"""
+        self._check_geometry()
+        return self._screen_size
+
+    @property
+    def virtual_bounds(self) -> Tuple[int, int, int, int]:
+        """多显示器虚拟桌面的范围(左, 上, 宽, 高)，定期检查是否变化"""
+        self._check_geometry()
+        return self._virtual_bounds
+
+    def _cache_cursor(self, x: int, y: int):
+        """记录自身移动后的鼠标位置，限制在虚拟桌面内"""
+        left, top, width, height = self._virtual_bounds
+        self._cursor = (min(max(x, left), left + width - 1), min(max(y, top), top + height - 1))
+        self._cursor_ns = time.perf_counter_ns()
+
     def get_cursor_position(self) -> Tuple[int, int]:
         """
         获取当前鼠标位置（屏幕坐标）
+
+        缓存有效期内直接返回缓存，不查询系统
         
         :return: (x, y) 坐标元组
         """
-        pos = self.mouse.position
-        logger.debug(f"获取鼠标位置: {pos}")
+        self._check_geometry()
+        now_ns = time.perf_counter_ns()
+        if self._cursor is not None and now_ns - self._cursor_ns < self._cursor_ttl_ns:
+            return self._cursor
+        pos = tuple(self.backend.cursor_position())
+        logger.hot("获取鼠标位置: {}", pos)
+        self._cursor = pos
+        self._cursor_ns = now_ns
         return pos
 
     def click(self, button: str = 'left', delay: float = 0.1) -> bool:
@@ -33,66 +469,136 @@ class GUIController:
         :param delay: 点击间隔时间（秒）
         :return: 是否成功
         """
-        logger.debug(f"执行鼠标点击，按钮: {button}, 延迟: {delay}")
+        logger.hot("执行鼠标点击，按钮: {}, 延迟: {}", button, delay)
+        if self.dispatcher is not None:
+            # 异步模式下按下和释放都交给派发线程，调用方不等待
+            now_ns = time.perf_counter_ns()
+            self.mouse_button(button, True, now_ns)
+            self.mouse_button(button, False, now_ns + int(delay * 1e9))
+            return True
         self.mouse_button(button, True)
         time.sleep(delay)
         self.mouse_button(button, False)
-        logger.debug("鼠标点击完成")
+        logger.hot("鼠标点击完成")
         return True
 
-    def mouse_button(self, button: Literal['left', 'right', 'middle'] = 'left', down: bool = True) -> bool:
+    def mouse_button(self, button: Literal['left', 'right', 'middle'] = 'left', down: bool = True,
+                     at_ns: Optional[int] = None) -> bool:
         """
         使用窗口消息方法发送鼠标点击
         
         :param down: 是否按下鼠标按钮
         :param button: 鼠标按钮 'left', 'right', 'middle'
+        :param at_ns: 异步模式下的目标执行时间（perf_counter_ns），默认立即执行
         :return: 是否成功
         """
-        logger.debug(f"执行鼠标{'按下' if down else '释放'}，按钮: {button}")
-        if down:
-            self.mouse.press(Button[button])
-        else:
-            self.mouse.release(Button[button])
+        logger.hot("执行鼠标{}，按钮: {}", '按下' if down else '释放', button)
+        if self.coalesce_moves and self._pending_move is not None:
+            # 先发出等待中的移动，保证在最新位置按下或释放
+            if self.dispatcher is not None and at_ns is None:
+                at_ns = time.perf_counter_ns()
+            self._send(at_ns, self.flush_moves)
+        self._send(at_ns, self.backend.mouse_button, button, down)
         return True
 
-    def mouse_scroll(self, scroll_amount: int) -> bool:
+    def mouse_scroll(self, scroll_amount: int, at_ns: Optional[int] = None) -> bool:
         """
         鼠标滚动
         
         :param scroll_amount: 滚动量（正值向上滚动，负值向下滚动）
+        :param at_ns: 异步模式下的目标执行时间（perf_counter_ns），默认立即执行
         :return: 是否成功
         """
-        logger.debug(f"执行鼠标滚动，位置: ({x}, {y}), 滚动量: {scroll_amount}")
-        pynput.mouse.scroll(0, scroll_amount)
+        logger.hot("执行鼠标滚动，滚动量: {}", scroll_amount)
+        self._send(at_ns, self.backend.mouse_scroll, scroll_amount)
         return True
 
-    def mouse_move(self, x: int, y: int) -> bool:
+    def mouse_move(self, x: int, y: int, at_ns: Optional[int] = None) -> bool:
         """
         使用窗口消息方法移动鼠标
         
         :param x: 目标位置的x坐标
         :param y: 目标位置的y坐标
+        :param at_ns: 异步模式下的目标执行时间（perf_counter_ns），默认立即执行
         :return: 是否成功
         """
-        logger.debug(f"执行鼠标移动，位置: ({x}, {y})")
-        self.mouse.position = (x, y)
+        logger.hot("执行鼠标移动，位置: ({}, {})", x, y)
+        # 按自身的移动目标更新位置缓存，异步或合并模式下移动尚未执行时也能读到最新位置
+        self._cache_cursor(x, y)
+        if not self.coalesce_moves:
+            self._send(at_ns, self.backend.mouse_move, x, y)
+            return True
+
+        with self._move_lock:
+            self.move_stats["requested"] += 1
+            if self._pending_move is not None:
+                # 尚未发出的旧目标被新目标覆盖
+                self.move_stats["dropped"] += 1
+            self._pending_move = (x, y)
+            if self._move_flush_scheduled:
+                return True
+            due_ns = self._last_move_ns + self._move_interval_ns
+            self._move_flush_scheduled = self.dispatcher is not None
+        if self.dispatcher is None:
+            if due_ns <= time.perf_counter_ns():
+                self.flush_moves()
+        else:
+            # 同一时间只有一条移动命令在队列中，执行时读取最新目标
+            self.dispatcher.submit(max(due_ns, at_ns or time.perf_counter_ns()), self.flush_moves)
+        return True
+
+    def flush_moves(self) -> bool:
+        """
+        立即发出等待中的最新移动目标（不受频率限制）
+
+        :return: 是否实际移动了鼠标
+        """
+        with self._move_lock:
+            target, self._pending_move = self._pending_move, None
+            self._move_flush_scheduled = False
+            if target is None:
+                return False
+            last = self._last_move
+            if (last is not None and abs(target[0] - last[0]) < self.min_move_delta
+                    and abs(target[1] - last[1]) < self.min_move_delta):
+                self.move_stats["dropped"] += 1
+                return False
+            self._last_move = target
+            self._last_move_ns = time.perf_counter_ns()
+            self.move_stats["issued"] += 1
+        self.backend.mouse_move(*target)
         return True
 
-    def key(self, key: int, down: bool = True) -> bool:
+    def key(self, key: int, down: bool = True, at_ns: Optional[int] = None) -> bool:
         """
         使用窗口消息方法发送键盘事件
         
         :param down: 是否按下按键
         :param key: 按键
+        :param at_ns: 异步模式下的目标执行时间（perf_counter_ns），默认立即执行
         :return: 是否成功
         """
-        logger.debug(f"执行键盘{'按下' if down else '释放'}，按键码: {key}")
-        if down:
-            self.keyboard.press(key)
-        else:
-            self.keyboard.release(key)
+        logger.hot("执行键盘{}，按键码: {}", '按下' if down else '释放', key)
+        self._send(at_ns, self.backend.key, key, down)
         return True
 
+    def key_batch(self, actions: List[Tuple[Union[str, int], bool]], at_ns: Optional[int] = None) -> bool:
+        """
+        批量发送键盘事件，用于和弦等需要同时落下的按键
+
+        :param actions: (按键, 是否按下)列表，按顺序依次发送
+        :param at_ns: 异步模式下的目标执行时间（perf_counter_ns），整批作为一条命令执行
+        :return: 是否成功
+        """
+        logger.hot("执行批量键盘事件，数量: {}", len(actions))
+        self._send(at_ns, self._key_batch, actions)
+        return True
+
+    def _key_batch(self, actions: List[Tuple[Union[str, int], bool]]):
+        send = self.backend.key
+        for key, down in actions:
+            send(key, down)
+
     def type_keys(self, text: str, delay: float = 0.1) -> bool:
         """
         模拟输入文本
@@ -101,7 +607,15 @@ class GUIController:
         :param delay: 每个字符之间的延迟时间（秒）
         :return: 是否成功
         """
-        logger.debug(f"执行模拟输入文本，文本: {text}, 延迟: {delay}")
+        logger.hot("执行模拟输入文本，文本: {}, 延迟: {}", text, delay)
+        if self.dispatcher is not None:
+            # 异步模式下一次性按时间排好所有按键，调用方不等待
+            at_ns = time.perf_counter_ns()
+            for char in text:
+                self.key(ord(char), True, at_ns)
+                at_ns += int(delay * 1e9)
+                self.key(ord(char), False, at_ns)
+            return True
         for char in text:
             self.key(ord(char), True)
             time.sleep(delay)
@@ -111,4 +625,12 @@ class GUIController:
 # 使用示例和测试代码
 if __name__ == "__main__":
     # 创建控制器实例
-    controller = BackgroundController()
\ No newline at end of file
+    controller = GUIController(RecordingBackend())
+    controller.type_keys("abc", delay=0)
+    logger.info("记录的输入事件: {}", controller.backend.stats())
+
+
+__all__ = [
+    'InputBackend', 'PynputBackend', 'RecordingBackend', 'InputDispatcher', 'GUIController', 'INPUT_EVENT_DTYPE',
+    'OP_KEY', 'OP_MOUSE_MOVE', 'OP_MOUSE_BUTTON', 'OP_MOUSE_SCROLL',
+]
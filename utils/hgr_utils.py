@@ -3,23 +3,450 @@ import mediapipe as mp
 from mediapipe.python.solutions.hands import HandLandmark
 import time
 import os
+import threading
 import numpy as np
 from collections import deque
 from typing import List, Tuple, Optional, Dict, Any
-from .logger import logger
+from .logger import get_logger
+from .frame_ring import FrameRing, NUM_LANDMARKS
+
+logger = get_logger(__name__)
+
+# 左右手编码，get_result_views返回的handedness数组第0列；录制的关键点没有左右手信息
+HANDEDNESS_UNKNOWN = -1
+HANDEDNESS_LEFT = 0
+HANDEDNESS_RIGHT = 1
+
+_HANDEDNESS_CODES = {"Left": HANDEDNESS_LEFT, "Right": HANDEDNESS_RIGHT}
+
+
+def _fill_landmarks(buffer_view: memoryview, offset: int, landmarks) -> None:
+    """
+    将MediaPipe关键点的x/y/z逐个写入预分配缓冲区
+
+    通过一维float32缓冲区的memoryview按下标写入，不创建临时列表或数组，
+    比逐个关键点构造[x, y, z]再赋值给数组的一行快数倍
+    """
+    index = offset
+    for landmark in landmarks:
+        buffer_view[index] = landmark.x
+        buffer_view[index + 1] = landmark.y
+        buffer_view[index + 2] = landmark.z
+        index += 3
+
+
+def fill_hand_results(results, landmarks: np.ndarray, world_landmarks: np.ndarray, handedness: np.ndarray) -> int:
+    """
+    将MediaPipe Hands的识别结果写入预分配的数组
+
+    :param results: hands.process的返回值
+    :param landmarks: (最大手数, 21, 3) float32，归一化坐标关键点
+    :param world_landmarks: (最大手数, 21, 3) float32，世界坐标关键点，结果中没有时填充NaN
+    :param handedness: (最大手数, 2) float32，每行为[左右手编码, 置信度]
+    :return: 写入的手数
+    """
+    if not results.multi_hand_landmarks:
+        return 0
+    num_hands = min(len(results.multi_hand_landmarks), len(landmarks))
+    world_results = getattr(results, "multi_hand_world_landmarks", None)
+    handedness_results = getattr(results, "multi_handedness", None)
+    landmark_view = memoryview(landmarks.reshape(-1))
+    world_landmark_view = memoryview(world_landmarks.reshape(-1))
+    stride = NUM_LANDMARKS * 3
+    for i in range(num_hands):
+        _fill_landmarks(landmark_view, i * stride, results.multi_hand_landmarks[i].landmark)
+        if world_results:
+            _fill_landmarks(world_landmark_view, i * stride, world_results[i].landmark)
+        else:
+            world_landmarks[i] = np.nan
+        if handedness_results:
+            classification = handedness_results[i].classification[0]
+            handedness[i, 0] = _HANDEDNESS_CODES.get(classification.label, HANDEDNESS_UNKNOWN)
+            handedness[i, 1] = classification.score
+        else:
+            handedness[i] = (HANDEDNESS_UNKNOWN, np.nan)
+    return num_hands
+
+
+class CameraCapture:
+    """
+    后台摄像头采集线程
+
+    采集线程持续读取画面，使用三缓冲：采集线程写入后台槽位，完成后与"最新帧"槽位交换；
+    读取方取帧时再与自己持有的槽位交换。读取方总是拿到最新的一帧，未被取走的旧帧直接被覆盖，
+    不会在驱动缓冲区中堆积。三个槽位来自按第一帧尺寸创建的FrameRing，采集过程中不再分配画面内存。
+    """
+
+    def __init__(self, cap):
+        """
+        :param cap: 已打开的cv2.VideoCapture
+        """
+        self.cap = cap
+        # 尽量让驱动只保留一帧，减少排队延迟（部分后端不支持，设置失败时忽略）
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.ring = None      # 三个画面槽位，第一帧到达时按画面尺寸创建
+        self._back = 0        # 采集线程正在写入的槽位
+        self._latest = 1      # 最新完成的一帧所在槽位
+        self._front = 2       # 读取方持有的槽位
+        self._latest_ns = 0
+        self._latest_id = 0
+        self._taken_id = 0
+        self._condition = threading.Condition()
+        self._running = True
+
+        # 统计：采集帧数、未被取走就被覆盖的帧数，以及取帧时的帧龄
+        self.captured = 0
+        self.dropped = 0
+        self._age_total_ns = 0
+        self._age_max_ns = 0
+        self._age_count = 0
+
+        self._thread = threading.Thread(target=self._run, name="CameraCapture", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            if self.ring is None:
+                success, frame = self.cap.read()
+                if success:
+                    self.ring = FrameRing.for_frame(frame, 3)
+                    self.ring.frames[self._back] = frame
+            else:
+                # 直接解码到槽位中；画面尺寸与槽位不同时OpenCV会另外分配，复制回槽位
+                slot_frame = self.ring.frames[self._back]
+                success, frame = self.cap.read(slot_frame)
+                if success and frame is not slot_frame:
+                    if frame.shape != slot_frame.shape:
+                        logger.error("摄像头画面尺寸从{}变为{}，停止采集", slot_frame.shape, frame.shape)
+                        break
+                    slot_frame[...] = frame
+            timestamp_ns = time.perf_counter_ns()
+            if not success:
+                logger.error("无法读取摄像头画面，停止采集")
+                break
+            with self._condition:
+                # 与最新帧槽位交换，旧的最新帧变为下一次的写入槽位
+                self._back, self._latest = self._latest, self._back
+                self._latest_ns = timestamp_ns
+                self._latest_id += 1
+                self.captured += 1
+                if self._latest_id - self._taken_id > 1:
+                    self.dropped += 1
+                self._condition.notify()
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def read(self, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], int]:
+        """
+        取出最新的一帧，没有新帧时等待
+
+        返回的画面在下一次read之前有效
+
+        :param timeout: 最长等待时间（秒）
+        :return: (画面, 采集时间戳perf_counter_ns)，采集已停止或超时时画面为None
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._latest_id != self._taken_id or not self._running, timeout):
+                return None, 0
+            if self._latest_id == self._taken_id:
+                return None, 0
+            self._front, self._latest = self._latest, self._front
+            self._taken_id = self._latest_id
+            timestamp_ns = self._latest_ns
+        age_ns = time.perf_counter_ns() - timestamp_ns
+        self._age_total_ns += age_ns
+        self._age_max_ns = max(self._age_max_ns, age_ns)
+        self._age_count += 1
+        return self.ring.frames[self._front], timestamp_ns
+
+    def stats(self) -> Dict[str, float]:
+        """采集统计：采集帧数、丢弃的旧帧数、取帧时的平均和最大帧龄（毫秒）"""
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "mean_age_ms": self._age_total_ns / self._age_count / 1e6 if self._age_count else 0.0,
+            "max_age_ms": self._age_max_ns / 1e6,
+        }
+
+    def stop(self, timeout: float = 1.0):
+        """停止采集线程（不释放摄像头）"""
+        self._running = False
+        self._thread.join(timeout)
+
+
+class _RingReader:
+    """
+    把cv2.VideoCapture读到的画面轮流解码到FrameRing的槽位中，返回的画面在之后slot_count-1次读取内有效
+    """
+
+    def __init__(self, cap, slot_count: int = 2):
+        self.cap = cap
+        self.slot_count = slot_count
+        self.ring = None
+        self._next = 0
+
+    def read(self) -> Optional[np.ndarray]:
+        if self.ring is None:
+            success, frame = self.cap.read()
+            if not success:
+                return None
+            self.ring = FrameRing.for_frame(frame, self.slot_count)
+            self.ring.frames[0] = frame
+            self._next = 1 % self.slot_count
+            return self.ring.frames[0]
+        slot_frame = self.ring.frames[self._next]
+        success, frame = self.cap.read(slot_frame)
+        if not success:
+            return None
+        self._next = (self._next + 1) % self.slot_count
+        if frame is not slot_frame:
+            # 画面尺寸与槽位不同，OpenCV另外分配了画面，直接使用
+            return frame
+        return slot_frame
+
+
+class FrameSource:
+    """
+    画面来源接口
+
+    read返回(画面, 时间戳perf_counter_ns)，没有更多画面时画面为None。
+    返回的画面可能是来源内部复用的缓冲区，至少在下一次read之前有效，需要跨帧保留时请复制。
+    provides_landmarks为True的来源直接提供手部关键点（形状为(手数, 21, 3)），跳过MediaPipe识别；
+    paced为True表示来源本身按实时节奏产生画面，主循环无需再控制帧率
+    """
+
+    provides_landmarks = False
+    paced = True
+
+    def read(self) -> Tuple[Optional[np.ndarray], int]:
+        raise NotImplementedError
+
+    def is_opened(self) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+
+class _Pacer:
+    """按指定帧率等待，realtime为False时不等待（尽快回放）"""
+
+    def __init__(self, fps: float, realtime: bool):
+        self.interval_ns = int(1e9 / fps) if realtime and fps > 0 else 0
+        self._next_ns = None
+
+    def wait(self):
+        if not self.interval_ns:
+            return
+        now_ns = time.perf_counter_ns()
+        if self._next_ns is None:
+            self._next_ns = now_ns
+        remaining_ns = self._next_ns - now_ns
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+        self._next_ns += self.interval_ns
+
+
+class CameraSource(FrameSource):
+    """摄像头画面来源，可以使用后台采集线程"""
+
+    def __init__(self, index: int = 0, threaded: bool = False):
+        """
+        :param index: 摄像头编号
+        :param threaded: 是否使用后台采集线程，开启后采集和识别并行，识别时总是使用最新一帧
+        """
+        # 打开摄像头并优化设置
+        self.cap = cv2.VideoCapture(index)
+        # 设置较低的摄像头分辨率以提高性能
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        self.capture = CameraCapture(self.cap) if threaded else None
+        self._reader = _RingReader(self.cap)
+
+    def read(self) -> Tuple[Optional[np.ndarray], int]:
+        if self.capture is not None:
+            return self.capture.read()
+        image = self._reader.read()
+        if image is None:
+            return None, 0
+        return image, time.perf_counter_ns()
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.stop()
+            logger.info("摄像头采集统计: {}", self.capture.stats())
+            self.capture = None
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """视频文件画面来源，可以按视频帧率实时回放或尽快回放"""
+
+    def __init__(self, path: str, realtime: bool = False, loop: bool = False):
+        """
+        :param path: 视频文件路径
+        :param realtime: 是否按视频帧率回放，False时尽快读取
+        :param loop: 读到结尾后是否从头开始
+        """
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"无法打开视频文件: {path}")
+        self.paced = realtime
+        self.loop = loop
+        self._pacer = _Pacer(self.cap.get(cv2.CAP_PROP_FPS) or 30, realtime)
+        self._reader = _RingReader(self.cap)
+
+    def read(self) -> Tuple[Optional[np.ndarray], int]:
+        self._pacer.wait()
+        frame = self._reader.read()
+        if frame is None and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            frame = self._reader.read()
+        if frame is None:
+            return None, 0
+        return frame, time.perf_counter_ns()
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSequenceSource(FrameSource):
+    """图片序列目录画面来源，按文件名排序读取"""
+
+    IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+    def __init__(self, directory: str, fps: float = 30, realtime: bool = False, loop: bool = False):
+        """
+        :param directory: 图片目录
+        :param fps: 实时回放时的帧率
+        :param realtime: 是否按fps回放，False时尽快读取
+        :param loop: 读到最后一张后是否从头开始
+        """
+        self.files = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(self.IMAGE_EXTENSIONS))
+        if not self.files:
+            raise IOError(f"目录中没有图片: {directory}")
+        self.paced = realtime
+        self.loop = loop
+        self._pacer = _Pacer(fps, realtime)
+        self._index = 0
+
+    def read(self) -> Tuple[Optional[np.ndarray], int]:
+        if self._index >= len(self.files):
+            if not self.loop:
+                return None, 0
+            self._index = 0
+        self._pacer.wait()
+        image = cv2.imread(self.files[self._index])
+        self._index += 1
+        if image is None:
+            logger.warning("无法读取图片: {}", self.files[self._index - 1])
+            return None, 0
+        return image, time.perf_counter_ns()
+
+
+class LandmarkSource(FrameSource):
+    """
+    录制的手部关键点来源，跳过摄像头和MediaPipe
+
+    文件为.npy数组，形状为(帧数, 21, 3)或(帧数, 手数, 21, 3)，未检测到手的帧填充NaN；
+    使用内存映射读取，长录制文件不需要全部载入内存
+    """
+
+    provides_landmarks = True
+
+    def __init__(self, path: str, fps: float = 30, realtime: bool = False, loop: bool = False):
+        """
+        :param path: .npy文件路径
+        :param fps: 实时回放时的帧率
+        :param realtime: 是否按fps回放，False时尽快读取
+        :param loop: 读到结尾后是否从头开始
+        """
+        self.landmarks = np.load(path, mmap_mode="r")
+        if self.landmarks.ndim == 3:
+            self.landmarks = self.landmarks[:, np.newaxis]
+        if self.landmarks.ndim != 4 or self.landmarks.shape[2:] != (21, 3):
+            raise ValueError(f"关键点文件形状应为(帧数, 21, 3)或(帧数, 手数, 21, 3)，实际为{self.landmarks.shape}")
+        self.num_hands = self.landmarks.shape[1]
+        self.paced = realtime
+        self.loop = loop
+        self._pacer = _Pacer(fps, realtime)
+        self._index = 0
+
+    def read(self) -> Tuple[Optional[np.ndarray], int]:
+        if self._index >= len(self.landmarks):
+            if not self.loop:
+                return None, 0
+            self._index = 0
+        self._pacer.wait()
+        hands = self.landmarks[self._index]
+        self._index += 1
+        return hands, time.perf_counter_ns()
 
 
 class HGRUtils:
     """
     手势识别工具类
     """
-    def __init__(self, save_dir=""):
-        logger.debug(f"初始化HGRUtils，保存目录: {save_dir}")
-        # 初始化MediaPipe手势识别模型
+
+    MAX_NUM_HANDS = 1  # 最多检测1只手，提高性能
+    # ROI跟踪：裁剪区域在上一帧手部包围盒的基础上向四周扩展包围盒边长的比例
+    ROI_MARGIN = 0.3
+    # ROI最小边长（相对画面短边），太小的区域手掌检测不稳定
+    ROI_MIN_SIZE = 0.3
+    # 可选的识别输入缩放比例，按识别耗时在相邻档位之间切换
+    INFERENCE_SCALES = (1.0, 0.75, 0.5)
+    # 识别耗时预算占每帧时间的比例，超出时降低输入分辨率，低于预算的一半时提高
+    INFERENCE_BUDGET = 0.5
+    # 两次调整输入分辨率之间至少间隔的帧数
+    SCALE_ADJUST_INTERVAL = 15
+    # 自适应跳帧：两次识别之间最多外推的帧数
+    MAX_SKIP_FRAMES = 2
+    # 关键点平均每帧移动距离（归一化坐标）低于该值时认为手是稳定的，可以增加跳帧
+    STABLE_SPEED = 0.004
+    # 外推误差（归一化坐标下关键点的平均距离）超过该值时不再跳帧
+    MAX_EXTRAPOLATION_ERROR = 0.02
+
+    def __init__(self, save_dir="", threaded_capture=False, source: Optional[FrameSource] = None,
+                 roi_tracking=False, target_fps: Optional[float] = None, adaptive_skip=False,
+                 max_num_hands: Optional[int] = None, inference_workers: int = 0, worker_pool=None):
+        """
+        :param save_dir: 手部关键点数据的保存目录
+        :param threaded_capture: 使用默认摄像头时是否使用后台采集线程，开启后采集和识别并行，识别时总是使用最新一帧
+        :param source: 画面来源，默认打开0号摄像头；可以使用视频文件、图片目录或录制的关键点文件离线回放
+        :param roi_tracking: 是否只识别上一帧手部周围的区域，跟踪丢失时回退到整个画面
+        :param target_fps: 目标帧率，指定时根据每帧识别耗时自动调整识别输入分辨率
+        :param adaptive_skip: 是否自适应跳帧，手稳定或识别耗时超出预算时每隔几帧才识别一次，
+                              中间的帧按关键点速度外推，每帧仍然返回关键点
+        :param max_num_hands: 每帧最多识别的手数，默认MAX_NUM_HANDS
+        :param inference_workers: 大于0时在这么多个独立进程中运行MediaPipe（见hgr_worker.InferenceWorkerPool），
+                                  画面通过共享内存传递，识别不占用当前进程的GIL；进程池在第一帧时按画面尺寸创建
+        :param worker_pool: 与其他HGRUtils共享的InferenceWorkerPool，指定时忽略inference_workers，关闭由调用方负责
+        """
+        logger.debug("初始化HGRUtils，保存目录: {}", save_dir)
+        self.source = source or CameraSource(0, threaded_capture)
+        # 录制的关键点文件可能包含更多的手，按文件中的手数分配缓冲区
+        self.max_num_hands = max(max_num_hands or self.MAX_NUM_HANDS, getattr(self.source, "num_hands", 0))
+        # 在识别进程中运行MediaPipe时，当前进程不需要加载模型
+        self.inference_workers = 0 if self.source.provides_landmarks else inference_workers
+        self._worker_pool = None if self.source.provides_landmarks else worker_pool
+        self._owns_worker_pool = False
+        self._worker_index = self._worker_pool.register_stream() if self._worker_pool is not None else 0
+        use_workers = self._worker_pool is not None or self.inference_workers > 0
+        # 初始化MediaPipe手势识别模型，直接提供关键点的来源不需要
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+        self.hands = None if self.source.provides_landmarks or use_workers else self.mp_hands.Hands(
             static_image_mode=False,  # 连续视频模式
-            max_num_hands=1,  # 最多检测1只手，提高性能
+            max_num_hands=self.max_num_hands,
             min_detection_confidence=0.7,  # 降低检测置信度阈值，提高响应性
             min_tracking_confidence=0.5,  # 降低跟踪置信度阈值，提高性能
         )
@@ -28,12 +455,9 @@ class HGRUtils:
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
 
-        # 打开摄像头并优化设置
-        self.cap = cv2.VideoCapture(0)
-        # 设置较低的摄像头分辨率以提高性能
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        # 最近一次识别所用画面的采集时间戳和帧龄（识别开始时距离采集完成的时间）
+        self.frame_timestamp_ns = 0
+        self.frame_age_ms = 0.0
 
         # 用于计算FPS
         self.p_time = 0
@@ -48,68 +472,378 @@ class HGRUtils:
         self.hand_landmarks_list = self.read_all_hand_landmarks()
         
         # 性能优化：预分配内存和缓存
+        # 识别结果缓冲区：关键点和世界坐标关键点为(手数, 21, 3)，左右手为(手数, 2)即[左右手编码, 置信度]，
+        # 每帧复用，由fill_hand_results通过一维memoryview批量写入
+        self._landmark_buffer = np.full((self.max_num_hands, NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        self._world_landmark_buffer = np.full((self.max_num_hands, NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        self._handedness_buffer = np.full((self.max_num_hands, 2), np.nan, dtype=np.float32)
+        # BGR转RGB的目标缓冲区（只在当前进程中识别时使用，识别进程模式下直接转换到共享内存的槽位）和缩放缓冲区，输入尺寸变化时重新分配
+        self._rgb_buffer = None
+        self._resize_buffer = None
+
+        # ROI跟踪和自适应输入分辨率
+        self.roi_tracking = roi_tracking
+        self.target_fps = target_fps
+        self._roi = None  # 当前裁剪区域(x0, y0, x1, y1)，像素坐标，None表示整个画面
+        self._scale_index = 0
+        self._frames_since_scale_change = 0
+        self._inference_cost_ns = 0.0  # 识别耗时的指数移动平均
+        self._inference_stats = {"frames": 0, "inferred": 0, "extrapolated": 0, "roi_frames": 0, "roi_fallbacks": 0,
+                                 "scale_changes": 0, "pixels": 0, "full_pixels": 0}
+
+        # 自适应跳帧：最近一次识别的关键点、关键点速度（每个时钟单位）和识别时的时钟
+        self.adaptive_skip = adaptive_skip
+        self._track_landmarks = np.zeros_like(self._landmark_buffer)
+        self._track_velocity = np.zeros_like(self._landmark_buffer)
+        self._track_hands = 0
+        self._track_clock = 0
+        self._track_frame = 0
+        self._skip_interval = 0  # 当前每次识别后外推的帧数
+        # 外推误差统计：次数、总和、最大值
+        self._extrapolation_error = {"count": 0, "total": 0.0, "max": 0.0}
         self._frame_cache = None
         self._last_results = None
         self._frame_counter = 0
-        self._skip_frames = 0  # 跳帧计数器，用于降低处理频率
+        self._skip_frames = 0  # 跳帧计数器：距离下一次识别还要外推的帧数
         
         logger.debug("HGRUtils初始化完成")
 
     def get_camera_frame(self):
         """获取摄像头画面"""
-        logger.debug("开始获取摄像头画面")
-        success, image = self.cap.read()
-        if not success:
-            logger.error("无法读取摄像头画面，退出程序...")
+        logger.hot("开始获取摄像头画面")
+        image, self.frame_timestamp_ns = self.source.read()
+        if image is None:
+            if isinstance(self.source, CameraSource):
+                logger.error("无法读取摄像头画面，退出程序...")
+            else:
+                logger.info("画面来源已读取完毕")
             return None
-        logger.debug("摄像头画面获取成功")
+        logger.hot("摄像头画面获取成功")
         return image
 
-    def get_result(self, image, array=True):
-        """获取手势识别结果（优化版本）"""
-        logger.debug(f"开始获取手势识别结果，array模式: {array}")
-        if image is None:
-            logger.warning("输入图像为空，返回空列表")
-            return []
-            
-        # 为了提高性能，可以选择将图像标记为不可写
-        image.flags.writeable = False
-        # 将图像从BGR格式转换为RGB格式
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def _scale_for_inference(self, image) -> np.ndarray:
+        """按当前输入缩放比例缩放画面，写入复用的缓冲区；不缩放时原样返回"""
+        scale = self.INFERENCE_SCALES[self._scale_index]
+        if scale < 1.0:
+            height, width = image.shape[:2]
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            if self._resize_buffer is None or self._resize_buffer.shape[1::-1] != size:
+                self._resize_buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            cv2.resize(image, size, dst=self._resize_buffer, interpolation=cv2.INTER_AREA)
+            image = self._resize_buffer
+        return image
+
+    def _to_rgb(self, image, dst: np.ndarray) -> np.ndarray:
+        """将图像从BGR格式转换为RGB格式，写入dst"""
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=dst)
+        self._inference_stats["pixels"] += dst.shape[0] * dst.shape[1]
+        return dst
+
+    def _prepare_rgb(self, image) -> np.ndarray:
+        """按当前输入缩放比例缩放并转换为RGB，写入复用的缓冲区"""
+        image = self._scale_for_inference(image)
+        if self._rgb_buffer is None or self._rgb_buffer.shape != image.shape:
+            self._rgb_buffer = np.empty(image.shape, dtype=np.uint8)
+        return self._to_rgb(image, self._rgb_buffer)
+
+    def _process(self, image):
+        """在当前进程中识别，返回MediaPipe的原始结果"""
+        rgb = self._prepare_rgb(image)
+        # 为了提高性能，将图像标记为不可写，MediaPipe可以直接引用而不复制
+        rgb.setflags(write=False)
         # 处理图像，获取手势检测结果
-        results = self.hands.process(image_rgb)
+        results = self.hands.process(rgb)
         # 恢复图像的可写状态
-        image.flags.writeable = True
+        rgb.setflags(write=True)
+        return results
 
-        hand_landmarks_list = []
+    def _infer(self, image) -> int:
+        """识别画面（或裁剪区域），结果写入关键点缓冲区，返回手数"""
+        if self.hands is not None:
+            return fill_hand_results(self._process(image), self._landmark_buffer, self._world_landmark_buffer,
+                                     self._handedness_buffer)
+        if self._worker_pool is None:
+            # 延迟导入，避免与hgr_worker循环导入；进程池按第一帧的尺寸分配共享内存
+            from .hgr_worker import InferenceWorkerPool
+            self._worker_pool = InferenceWorkerPool(self.inference_workers, max_frame_shape=image.shape[:2],
+                                                    max_num_hands=self.max_num_hands)
+            self._owns_worker_pool = True
+            self._worker_index = self._worker_pool.register_stream()
+        # 直接转换到共享内存的槽位中，画面不经过_rgb_buffer，除共享内存外没有额外的整帧复制
+        image = self._scale_for_inference(image)
+        slot, rgb = self._worker_pool.acquire_frame(*image.shape[:2])
+        try:
+            self._to_rgb(image, rgb)
+        except Exception:
+            self._worker_pool.release_frame(slot)
+            raise
+        return self._worker_pool.infer(None, self._landmark_buffer, self._world_landmark_buffer,
+                                       self._handedness_buffer, self._worker_index, slot=slot)
+
+    def _process_tracked(self, image):
+        """
+        ROI跟踪模式下识别：先识别上一帧手部周围的区域，没有检测到手时回退到整个画面
+
+        :return: (手数, 识别所用区域(x0, y0, x1, y1))
+        """
+        height, width = image.shape[:2]
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            num_hands = self._infer(image[y0:y1, x0:x1])
+            if num_hands:
+                self._inference_stats["roi_frames"] += 1
+                return num_hands, self._roi
+            # 跟踪丢失，同一帧改为识别整个画面
+            self._inference_stats["roi_fallbacks"] += 1
+            self._roi = None
+            logger.hot("ROI内未检测到手部，回退到整个画面")
+        return self._infer(image), (0, 0, width, height)
+
+    def _update_roi(self, landmarks: np.ndarray, width: int, height: int):
+        """
+        根据本帧关键点的包围盒更新下一帧的裁剪区域
 
-        if results.multi_hand_landmarks:
-            logger.debug(f"检测到 {len(results.multi_hand_landmarks)} 只手")
-            for hand_landmarks in results.multi_hand_landmarks:
-                if array:
-                    # 预分配数组，避免重复内存分配
-                    landmarks_array = np.empty((21, 3), dtype=np.float32)
-                    for i, landmark in enumerate(hand_landmarks.landmark):
-                        landmarks_array[i] = [landmark.x, landmark.y, landmark.z]
-                    hand_landmarks_list.append(landmarks_array)
+        区域为正方形，边长为包围盒长边加上两侧边距；手仍在当前区域内且大小变化不大时保持区域不变，
+        使MediaPipe的跟踪在连续几帧中看到的是同一坐标系的画面
+        """
+        x_min = float(landmarks[..., 0].min()) * width
+        x_max = float(landmarks[..., 0].max()) * width
+        y_min = float(landmarks[..., 1].min()) * height
+        y_max = float(landmarks[..., 1].max()) * height
+        box_size = max(x_max - x_min, y_max - y_min)
+        short_side = min(width, height)
+        side = max(box_size * (1 + 2 * self.ROI_MARGIN), self.ROI_MIN_SIZE * short_side)
+        if side >= short_side:
+            # 手占据了大部分画面，裁剪没有收益
+            self._roi = None
+            return
+        if self._roi is not None:
+            rx0, ry0, rx1, ry1 = self._roi
+            current_side = rx1 - rx0
+            guard = (side - box_size) / 4  # 保留一半的边距
+            if (x_min - rx0 >= guard and rx1 - x_max >= guard and y_min - ry0 >= guard and ry1 - y_max >= guard
+                    and 0.8 * current_side <= side <= 1.25 * current_side):
+                return
+        side = int(side)
+        x0 = int(min(max((x_min + x_max - side) / 2, 0), width - side))
+        y0 = int(min(max((y_min + y_max - side) / 2, 0), height - side))
+        self._roi = (x0, y0, x0 + side, y0 + side)
+
+    def _adapt_scale(self, cost_ns: int):
+        """根据识别耗时的移动平均与目标帧率下的预算比较，调整识别输入分辨率"""
+        self._inference_cost_ns += 0.2 * (cost_ns - self._inference_cost_ns)
+        self._frames_since_scale_change += 1
+        if not self.target_fps or self._frames_since_scale_change < self.SCALE_ADJUST_INTERVAL:
+            return
+        budget_ns = self.INFERENCE_BUDGET * 1e9 / self.target_fps
+        if self._inference_cost_ns > budget_ns and self._scale_index < len(self.INFERENCE_SCALES) - 1:
+            self._scale_index += 1
+        elif self._inference_cost_ns < budget_ns / 2 and self._scale_index > 0:
+            self._scale_index -= 1
+        else:
+            return
+        self._frames_since_scale_change = 0
+        self._inference_stats["scale_changes"] += 1
+        logger.info("识别耗时 {:.1f}ms，输入缩放调整为 {}",
+                    self._inference_cost_ns / 1e6, self.INFERENCE_SCALES[self._scale_index])
+
+    def _schedule_clock(self) -> int:
+        """
+        外推使用的时钟：按实时节奏产生画面的来源使用采集时间戳，可以正确处理采集线程丢弃的帧；
+        离线尽快回放时时间戳没有意义，使用帧序号
+        """
+        if self.source.paced and self.frame_timestamp_ns:
+            return self.frame_timestamp_ns
+        return self._frame_counter
+
+    def _extrapolate(self, out: np.ndarray) -> int:
+        """按最近一次识别的速度把关键点外推到当前帧，写入out，返回手数"""
+        num_hands = self._track_hands
+        elapsed = self._schedule_clock() - self._track_clock
+        np.multiply(self._track_velocity[:num_hands], elapsed, out=out[:num_hands])
+        out[:num_hands] += self._track_landmarks[:num_hands]
+        return num_hands
+
+    def _schedule(self, num_hands: int):
+        """
+        识别完成后更新跟踪状态，并决定之后外推几帧
+
+        手稳定或识别耗时超出目标帧率的预算时逐步增加外推帧数（最多MAX_SKIP_FRAMES），
+        手快速移动、外推误差过大或没有检测到手时恢复每帧识别
+        """
+        landmarks = self._landmark_buffer[:num_hands]
+        clock = self._schedule_clock()
+        frames = self._frame_counter - self._track_frame
+        if num_hands and num_hands == self._track_hands and frames > 0:
+            # 上一次识别之后有外推的帧时，用外推到本帧的预测与识别结果比较，得到外推误差
+            error = None
+            if frames > 1:
+                predicted = self._extrapolate(self._track_velocity)  # 复用速度缓冲区，下面会重新计算
+                error = float(np.linalg.norm(self._track_velocity[:predicted] - landmarks, axis=-1).mean())
+                self._extrapolation_error["count"] += 1
+                self._extrapolation_error["total"] += error
+                self._extrapolation_error["max"] = max(self._extrapolation_error["max"], error)
+            np.subtract(landmarks, self._track_landmarks[:num_hands], out=self._track_velocity[:num_hands])
+            speed = float(np.linalg.norm(self._track_velocity[:num_hands], axis=-1).mean()) / frames
+            self._track_velocity[:num_hands] /= max(clock - self._track_clock, 1)
+            over_budget = bool(self.target_fps) and \
+                self._inference_cost_ns > self.INFERENCE_BUDGET * 1e9 / self.target_fps
+            if error is not None and error > self.MAX_EXTRAPOLATION_ERROR:
+                self._skip_interval = 0
+            elif speed < self.STABLE_SPEED or over_budget:
+                self._skip_interval = min(self._skip_interval + 1, self.MAX_SKIP_FRAMES)
+            else:
+                self._skip_interval = 0
+        else:
+            # 没有检测到手或手数变化，速度未知，下一帧必须识别
+            self._track_velocity[:num_hands] = 0
+            self._skip_interval = 0
+        self._track_landmarks[:num_hands] = landmarks
+        self._track_hands = num_hands
+        self._track_clock = clock
+        self._track_frame = self._frame_counter
+        self._skip_frames = self._skip_interval
+
+    def inference_stats(self) -> Dict[str, float]:
+        """
+        识别统计
+
+        :return: 处理的帧数、实际识别的帧数、外推的帧数、识别帧数占比、当前每次识别后外推的帧数、
+                 外推误差（外推到下一次识别的帧时，与识别结果之间关键点的平均距离，归一化坐标）的平均值和最大值、
+                 使用ROI识别的帧数、ROI跟踪丢失回退的次数、分辨率调整次数、当前输入缩放比例、
+                 识别耗时的移动平均（毫秒）和实际送入MediaPipe的像素占完整画面像素的比例
+        """
+        stats = self._inference_stats
+        errors = self._extrapolation_error
+        return {
+            "frames": stats["frames"],
+            "inferred": stats["inferred"],
+            "extrapolated": stats["extrapolated"],
+            "inference_rate": round(stats["inferred"] / stats["frames"], 3) if stats["frames"] else 0.0,
+            "skip_interval": self._skip_interval,
+            "extrapolation_error": round(errors["total"] / errors["count"], 5) if errors["count"] else 0.0,
+            "extrapolation_error_max": round(errors["max"], 5),
+            "roi_frames": stats["roi_frames"],
+            "roi_fallbacks": stats["roi_fallbacks"],
+            "scale_changes": stats["scale_changes"],
+            "scale": self.INFERENCE_SCALES[self._scale_index],
+            "mean_cost_ms": round(self._inference_cost_ns / 1e6, 2),
+            "pixel_ratio": round(stats["pixels"] / stats["full_pixels"], 3) if stats["full_pixels"] else 0.0,
+        }
+
+    def get_result_views(self, image) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        获取手势识别结果，不分配新的数组
+
+        :param image: BGR画面；录制关键点来源时为该帧的关键点
+        :return: (关键点, 世界坐标关键点, 左右手)，形状分别为(手数, 21, 3)、(手数, 21, 3)和(手数, 2)，
+                 左右手每行为[左右手编码, 置信度]；返回的是内部缓冲区的视图，下一次识别时会被覆盖，需要保留时请复制
+        """
+        logger.hot("开始获取手势识别结果")
+        num_hands = 0
+        if image is None:
+            logger.warning("输入图像为空，返回空结果")
+            return (self._landmark_buffer[:0], self._world_landmark_buffer[:0], self._handedness_buffer[:0])
+        self._frame_counter += 1
+        self._inference_stats["frames"] += 1
+        if self._skip_frames > 0:
+            # 跳过识别，按速度外推关键点；世界坐标关键点和左右手保持上一次识别的结果
+            self._skip_frames -= 1
+            num_hands = self._extrapolate(self._landmark_buffer)
+            self._inference_stats["extrapolated"] += 1
+            logger.hot("跳过识别，外推 {} 只手的关键点", num_hands)
+            return (self._landmark_buffer[:num_hands], self._world_landmark_buffer[:num_hands],
+                    self._handedness_buffer[:num_hands])
+        self._inference_stats["inferred"] += 1
+        if self.source.provides_landmarks:
+            # 录制的关键点直接使用，跳过含NaN（未检测到手）的条目；没有世界坐标和左右手信息
+            for hand in image:
+                if num_hands >= len(self._landmark_buffer):
+                    break
+                if np.isnan(hand).any():
+                    continue
+                self._landmark_buffer[num_hands] = hand
+                num_hands += 1
+            self._world_landmark_buffer[:num_hands] = np.nan
+            self._handedness_buffer[:num_hands] = (HANDEDNESS_UNKNOWN, np.nan)
+        else:
+            height, width = image.shape[:2]
+            start_ns = time.perf_counter_ns()
+            if self.roi_tracking:
+                num_hands, (x0, y0, x1, y1) = self._process_tracked(image)
+            else:
+                num_hands = self._infer(image)
+            self._inference_stats["full_pixels"] += width * height
+            if self.roi_tracking:
+                landmarks = self._landmark_buffer[:num_hands]
+                if (x1 - x0, y1 - y0) != (width, height):
+                    # 裁剪区域内的归一化坐标换算回整个画面，z与x使用相同的比例
+                    landmarks[..., 0] *= (x1 - x0) / width
+                    landmarks[..., 0] += x0 / width
+                    landmarks[..., 1] *= (y1 - y0) / height
+                    landmarks[..., 1] += y0 / height
+                    landmarks[..., 2] *= (x1 - x0) / width
+                if num_hands:
+                    self._update_roi(landmarks, width, height)
                 else:
-                    hand_landmarks_list.append(hand_landmarks)
+                    self._roi = None
+            self._adapt_scale(time.perf_counter_ns() - start_ns)
+        if self.adaptive_skip:
+            self._schedule(num_hands)
+
+        if num_hands:
+            logger.hot("检测到 {} 只手", num_hands)
         else:
-            logger.debug("未检测到手部")
+            logger.hot("未检测到手部")
+        return (self._landmark_buffer[:num_hands], self._world_landmark_buffer[:num_hands],
+                self._handedness_buffer[:num_hands])
+
+    def get_result_into(self, image, ring: FrameRing, slot: int) -> int:
+        """
+        识别并把结果写入环形缓冲区的关键点槽位，同时记录帧序号和采集时间戳
+
+        :return: 检测到的手数
+        """
+        landmarks, world_landmarks, handedness = self.get_result_views(image)
+        ring.set_meta(slot, self._frame_counter, self.frame_timestamp_ns)
+        return ring.write_hands(slot, landmarks, world_landmarks, handedness)
+
+    def get_result(self, image, array=True):
+        """
+        获取手势识别结果
+
+        :param image: BGR画面；录制关键点来源时为该帧的关键点
+        :param array: 为True时返回每只手(21, 3)的numpy数组（复制，可以跨帧保留）；
+                      为False时返回MediaPipe的原始关键点对象，用于绘制，需要在当前进程中加载了MediaPipe模型
+        """
+        logger.hot("开始获取手势识别结果，array模式: {}", array)
+        if image is None:
+            logger.warning("输入图像为空，返回空列表")
+            return []
+        if not array:
+            if self.hands is None:
+                raise ValueError("当前进程中没有MediaPipe模型（使用识别进程池或录制的关键点来源），"
+                                 "无法返回MediaPipe关键点对象，请使用array=True")
+            results = self._process(image)
+            return list(results.multi_hand_landmarks or [])
 
-        logger.debug(f"手势识别完成，返回 {len(hand_landmarks_list)} 个手部关键点")
+        landmarks, _, _ = self.get_result_views(image)
+        # 一次复制所有手，列表中的每个元素是这份副本的视图，不受下一帧覆盖缓冲区的影响
+        hand_landmarks_list = list(landmarks.copy())
+        logger.hot("手势识别完成，返回 {} 个手部关键点", len(hand_landmarks_list))
         return hand_landmarks_list
 
     def get_all_hand_landmarks(self):
         """获取所有手部关键点（优化版本）"""
-        logger.debug("开始获取所有手部关键点")
+        logger.hot("开始获取所有手部关键点")
         
         image = self.get_camera_frame()
         if image is None:
             return [], None
+        self.frame_age_ms = (time.perf_counter_ns() - self.frame_timestamp_ns) / 1e6
             
         results = self.get_result(image)
-        logger.debug(f"获取到 {len(results)} 个手部关键点")
+        logger.hot("获取到 {} 个手部关键点", len(results))
         return results, image
 
     def add_save_hand_landmarks(self, hand_landmarks):
@@ -126,7 +860,7 @@ class HGRUtils:
 
     def replace_save_hand_landmarks(self, index, hand_landmarks):
         """替换手部关键点"""
-        logger.debug(f"开始替换手部关键点，索引: {index}")
+        logger.debug("开始替换手部关键点，索引: {}", index)
         if index < 0 or index >= len(self.read_all_hand_landmarks()):
             logger.error("索引超出范围，无法替换手部关键点")
             return
@@ -137,9 +871,9 @@ class HGRUtils:
 
     def save_all_hand_landmarks(self, hand_landmarks_list):
         """保存手部关键点"""
-        logger.debug(f"开始保存手部关键点，数量: {len(hand_landmarks_list)}")
+        logger.debug("开始保存手部关键点，数量: {}", len(hand_landmarks_list))
         np.save(self.save_file, hand_landmarks_list)
-        logger.info(f"手部关键点已保存到 {self.save_file}")
+        logger.info("手部关键点已保存到 {}", self.save_file)
         logger.debug("手部关键点保存完成")
 
     def read_all_hand_landmarks(self):
@@ -147,16 +881,16 @@ class HGRUtils:
         logger.debug("开始读取手部关键点")
         try:
             hand_landmarks_list = np.load(self.save_file, allow_pickle=True)
-            logger.info(f"手部关键点已从 {self.save_file} 加载")
-            logger.debug(f"读取到 {len(hand_landmarks_list)} 个手部关键点")
+            logger.info("手部关键点已从 {} 加载", self.save_file)
+            logger.debug("读取到 {} 个手部关键点", len(hand_landmarks_list))
         except FileNotFoundError:
-            logger.warning(f"手部关键点文件 {self.save_file} 不存在，返回空数组")
+            logger.warning("手部关键点文件 {} 不存在，返回空数组", self.save_file)
             hand_landmarks_list = np.array([])
         logger.debug("手部关键点读取完成")
         return hand_landmarks_list
 
     def get_hand_landmark_distance(self, hand_landmark1, hand_landmark2):
-        logger.debug("开始计算手部关键点距离")
+        logger.hot("开始计算手部关键点距离")
         hand_landmark1 = self.to_relative(hand_landmark1)
         hand_landmark2 = self.to_relative(hand_landmark2)
 
@@ -166,13 +900,13 @@ class HGRUtils:
             
         # 计算欧几里得距离
         distance = np.linalg.norm(hand_landmark1 - hand_landmark2)
-        logger.debug(f"手部关键点距离计算完成: {distance}")
+        logger.hot("手部关键点距离计算完成: {}", distance)
         
         return distance
 
     def to_relative(self, hand_landmarks):
         """将手部关键点转换为相对坐标"""
-        logger.debug("开始转换手部关键点为相对坐标")
+        logger.hot("开始转换手部关键点为相对坐标")
         # 添加错误处理和类型检查
         if hand_landmarks is None or len(hand_landmarks) == 0:
             logger.error("错误：输入的手部关键点为空")
@@ -180,7 +914,7 @@ class HGRUtils:
         
         # 确保输入是numpy数组
         if not isinstance(hand_landmarks, np.ndarray):
-            logger.debug("输入不是numpy数组，转换为numpy数组")
+            logger.hot("输入不是numpy数组，转换为numpy数组")
             hand_landmarks = np.array(hand_landmarks)
         
         relative_landmarks = [[0, 0, 0]]
@@ -189,28 +923,47 @@ class HGRUtils:
         for i in range(1, len(hand_landmarks)):
             relative_landmarks.append(hand_landmarks[i] - hand_landmarks[0])
         
-        logger.debug("手部关键点相对坐标转换完成")
+        logger.hot("手部关键点相对坐标转换完成")
         return np.array(relative_landmarks)
 
-    def show_hand_landmarks(self, image, hand_landmarks: np.ndarray):
-        """显示手部关键点"""
-        logger.debug("开始绘制手部关键点")
-        # 绘制手部关键点和连接线
-        self.mp_drawing.draw_landmarks(
-            image,
-            hand_landmarks,
-            self.mp_hands.HAND_CONNECTIONS,
-            self.mp_drawing_styles.get_default_hand_landmarks_style(),
-            self.mp_drawing_styles.get_default_hand_connections_style(),
-        )
-        logger.debug("手部关键点绘制完成")
+    def show_hand_landmarks(self, image, hand_landmarks):
+        """
+        显示手部关键点
+
+        :param hand_landmarks: MediaPipe的关键点对象，或(21, 3)归一化坐标数组（get_result返回的数组形式）
+        """
+        logger.hot("开始绘制手部关键点")
+        if isinstance(hand_landmarks, np.ndarray):
+            self._draw_landmark_array(image, hand_landmarks)
+        else:
+            # 绘制手部关键点和连接线
+            self.mp_drawing.draw_landmarks(
+                image,
+                hand_landmarks,
+                self.mp_hands.HAND_CONNECTIONS,
+                self.mp_drawing_styles.get_default_hand_landmarks_style(),
+                self.mp_drawing_styles.get_default_hand_connections_style(),
+            )
+        logger.hot("手部关键点绘制完成")
+
+    def _draw_landmark_array(self, image, hand_landmarks: np.ndarray):
+        """用OpenCV绘制(21, 3)归一化坐标数组形式的关键点和连接线，跳过NaN"""
+        height, width = image.shape[:2]
+        points = [None if np.isnan(x) or np.isnan(y) else (int(x * width), int(y * height))
+                  for x, y in hand_landmarks[:, :2]]
+        for start, end in self.mp_hands.HAND_CONNECTIONS:
+            if points[start] is not None and points[end] is not None:
+                cv2.line(image, points[start], points[end], (224, 224, 224), 2)
+        for point in points:
+            if point is not None:
+                cv2.circle(image, point, 4, (0, 0, 255), -1)
 
     def recognize_gestures(self):
         """实时手势识别主循环"""
         logger.info("手势识别已启动！按ESC键退出...")
 
-        while self.cap.isOpened():
-            logger.debug("开始处理摄像头帧")
+        while self.source.is_opened():
+            logger.hot("开始处理摄像头帧")
             image = self.get_camera_frame()
             if image is None:
                 logger.warning("无法获取摄像头画面，退出循环")
@@ -226,14 +979,17 @@ class HGRUtils:
             if cv2.waitKey(5) & 0xFF == 27:
                 logger.info("检测到ESC键，退出手势识别")
                 break
-            logger.debug("摄像头帧处理完成")
+            logger.hot("摄像头帧处理完成")
     
     def display_results(self, image):
         """显示图像"""
-        logger.debug("开始显示手势识别结果")
-        results = self.get_result(image, array=False)
+        logger.hot("开始显示手势识别结果")
+        if self.source is not None and self.source.provides_landmarks:
+            raise ValueError("录制的关键点来源没有画面，无法显示识别结果")
+        # 在识别进程池中识别时当前进程没有MediaPipe结果对象，改为绘制关键点数组
+        results = self.get_result(image, array=self.hands is None)
         if results is not None and len(results) > 0 and image is not None:
-            logger.debug(f"检测到 {len(results)} 只手，开始绘制关键点")
+            logger.hot("检测到 {} 只手，开始绘制关键点", len(results))
             for hand_landmarks in results:
                 # 绘制手部关键点和连接线
                 self.show_hand_landmarks(image, hand_landmarks)
@@ -241,11 +997,11 @@ class HGRUtils:
         cv2.imshow("MediaPipe手势识别", image)
         # 使用非阻塞的waitKey，避免程序阻塞
         cv2.waitKey(1)
-        logger.debug("手势识别结果显示完成")
+        logger.hot("手势识别结果显示完成")
 
     def _calculate_fps(self, image):
         """计算并显示FPS"""
-        logger.debug("开始计算FPS")
+        logger.hot("开始计算FPS")
         self.c_time = time.time()
         fps = 1 / (self.c_time - self.p_time)
         self.p_time = self.c_time
@@ -259,19 +1015,92 @@ class HGRUtils:
             (255, 0, 0),
             2,
         )
-        logger.debug(f"FPS计算完成: {int(fps)}")
+        logger.hot("FPS计算完成: {}", int(fps))
+
+    def cleanup(self):
+        """停止采集线程并释放画面来源，关闭自己创建的识别进程池"""
+        if getattr(self, "source", None) is not None:
+            self.source.release()
+            self.source = None
+        if getattr(self, "_owns_worker_pool", False) and self._worker_pool is not None:
+            self._worker_pool.close()
+            self._worker_pool = None
 
     def __del__(self):
         """清理资源"""
         logger.debug("开始清理HGRUtils资源")
-        if hasattr(self, "cap"):
-            logger.debug("释放摄像头资源")
-            self.cap.release()
+        if getattr(self, "source", None) is not None:
+            self.source.release()
+        if getattr(self, "_owns_worker_pool", False) and self._worker_pool is not None:
+            self._worker_pool.close()
         cv2.destroyAllWindows()
         logger.info("程序已退出，资源已释放")
         logger.debug("HGRUtils资源清理完成")
 
 
+class _SyntheticLandmark:
+    """与MediaPipe关键点接口相同（x/y/z属性）的测试对象"""
+
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x: float, y: float, z: float):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def benchmark_landmark_extraction(iterations: int = 20000, num_hands: int = 1) -> Dict[str, float]:
+    """
+    关键点提取微基准：逐个关键点构造数组行（旧实现）与写入预分配缓冲区（_fill_landmarks）对比
+
+    使用合成的关键点对象，不需要摄像头和MediaPipe模型
+
+    :param iterations: 重复次数
+    :param num_hands: 每帧的手数
+    :return: 两种实现每帧的平均耗时（微秒）和加速比
+    """
+    hands = [[_SyntheticLandmark(i * 0.01 + h, i * 0.02, -i * 0.001) for i in range(NUM_LANDMARKS)]
+             for h in range(num_hands)]
+
+    def per_landmark_loop():
+        hand_landmarks_list = []
+        for hand in hands:
+            landmarks_array = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+            for i, landmark in enumerate(hand):
+                landmarks_array[i] = [landmark.x, landmark.y, landmark.z]
+            hand_landmarks_list.append(landmarks_array)
+        return hand_landmarks_list
+
+    buffer = np.empty((num_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+    buffer_view = memoryview(buffer.reshape(-1))
+
+    def buffered_fill():
+        for h, hand in enumerate(hands):
+            _fill_landmarks(buffer_view, h * NUM_LANDMARKS * 3, hand)
+        return buffer
+
+    if not np.allclose(np.stack(per_landmark_loop()), buffered_fill()):
+        raise AssertionError("两种关键点提取实现的结果不一致")
+
+    timings = {}
+    for name, fn in (("loop_us", per_landmark_loop), ("buffered_us", buffered_fill)):
+        start_ns = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        timings[name] = (time.perf_counter_ns() - start_ns) / iterations / 1e3
+    timings["speedup"] = timings["loop_us"] / timings["buffered_us"]
+    return timings
+
+
 if __name__ == "__main__":
-    hand_gesture = HGRUtils("../data")
-    hand_gesture.recognize_gestures()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="手势识别工具")
+    parser.add_argument("--bench", action="store_true", help="运行关键点提取微基准，不打开摄像头")
+    parser.add_argument("--hands", type=int, default=1, help="微基准中每帧的手数")
+    args = parser.parse_args()
+    if args.bench:
+        logger.info("关键点提取微基准: {}", benchmark_landmark_extraction(num_hands=args.hands))
+    else:
+        hand_gesture = HGRUtils("../data")
+        hand_gesture.recognize_gestures()
@@ -0,0 +1,293 @@
+"""
+手势识别进程池
+在独立的进程中运行MediaPipe Hands，画面和识别结果放在共享内存中的FrameRing里，
+进程之间只传递槽位编号等几个整数，不序列化画面和关键点
+"""
+
+import time
+import queue
+import threading
+import multiprocessing
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+from .logger import get_logger
+from .frame_ring import FrameRing, FrameRingSpec
+from .hgr_utils import fill_hand_results
+
+logger = get_logger(__name__)
+
+
+def create_hands(max_num_hands: int):
+    """在工作进程中创建MediaPipe Hands，参数与HGRUtils相同"""
+    import mediapipe as mp
+    return mp.solutions.hands.Hands(
+        static_image_mode=False,  # 连续视频模式，每个工作进程只处理同一路画面，跟踪状态连续
+        max_num_hands=max_num_hands,
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.5,
+    )
+
+
+def _worker_main(worker_index: int, ring_spec: FrameRingSpec, hands_factory: Callable[[int], Any], tasks, results):
+    """
+    工作进程入口
+
+    从任务队列取槽位编号，识别共享内存环形缓冲区中该槽位的RGB画面（尺寸见槽位元数据），结果写入同一槽位的关键点区，
+    再通过结果队列返回(槽位, 识别耗时, 是否成功)；收到None时退出。
+    模型加载完成或失败时先返回(-1, 进程编号, 是否成功)，失败后直接退出
+    """
+    ring = FrameRing.attach(ring_spec)
+    try:
+        try:
+            hands = hands_factory(ring.max_num_hands)
+        except Exception as e:
+            logger.exception("识别进程{}加载模型失败: {}", worker_index, e)
+            results.put((-1, worker_index, False))
+            return
+        results.put((-1, worker_index, True))  # 模型加载完成
+        while True:
+            slot = tasks.get()
+            if slot is None:
+                break
+            record = ring.landmarks[slot]
+            start_ns = time.perf_counter_ns()
+            try:
+                # 槽位开头是一幅连续的画面，MediaPipe可以直接使用
+                image = ring.read_frame(slot)
+                image.setflags(write=False)
+                record["num_hands"] = fill_hand_results(hands.process(image), record["landmarks"],
+                                                        record["world_landmarks"], record["handedness"])
+                results.put((slot, time.perf_counter_ns() - start_ns, True))
+            except Exception as e:
+                logger.error("识别进程{}处理画面时发生错误: {}", worker_index, e)
+                record["num_hands"] = 0
+                results.put((slot, time.perf_counter_ns() - start_ns, False))
+            del record
+    finally:
+        ring.close()
+
+
+class InferenceWorkerPool:
+    """
+    MediaPipe识别进程池
+
+    每个工作进程有自己的Hands模型和任务队列。每一路画面（一个HGRUtils）通过register_stream固定分配到一个工作进程，
+    保证MediaPipe在连续帧之间的跟踪状态有效；多路画面或多个线程可以同时调用infer，分别占用不同的槽位和进程。
+    识别在其他进程中进行，不占用主进程的GIL，控制循环和采集线程可以与识别并行运行。
+    """
+
+    READY_TIMEOUT = 60.0  # 等待工作进程加载模型的最长时间（秒）
+    RESULT_TIMEOUT = 5.0  # 等待单帧识别结果的最长时间（秒）
+
+    def __init__(self, num_workers: int = 1, max_frame_shape: Tuple[int, int] = (480, 640), max_num_hands: int = 2,
+                 slots: Optional[int] = None, hands_factory: Callable[[int], Any] = create_hands):
+        """
+        :param num_workers: 工作进程数
+        :param max_frame_shape: 最大画面尺寸(高, 宽)，决定每个槽位的大小
+        :param max_num_hands: 每帧最多识别的手数
+        :param slots: 共享内存中的画面槽位数，即同时在识别中的最大帧数，默认每个进程2个
+        :param hands_factory: 在工作进程中创建识别模型的函数，参数为最大手数，必须可以被pickle（模块级函数）
+        """
+        self.num_workers = num_workers
+        self.max_num_hands = max_num_hands
+        self.slot_count = slots or num_workers * 2
+        # 画面和识别结果都放在共享内存中的环形缓冲区里
+        self.ring = FrameRing(self.slot_count, (max_frame_shape[0], max_frame_shape[1], 3), max_num_hands,
+                              shared=True)
+
+        # 空闲槽位和每个槽位的完成通知
+        self._free_slots = list(range(self.slot_count))
+        self._slot_condition = threading.Condition()
+        self._slot_done = [threading.Event() for _ in range(self.slot_count)]
+        self._slot_status = [(0, False)] * self.slot_count
+        # 等待超时后被放弃的槽位，工作进程的结果到达后由收集线程放回空闲列表
+        self._slot_abandoned = [False] * self.slot_count
+        self._next_stream = 0
+
+        # 多个线程可以同时调用infer，统计数据和槽位状态一样在_slot_condition下更新
+        self._stats = {"frames": 0, "errors": 0, "timeouts": 0, "worker_ns": 0, "roundtrip_ns": 0}
+
+        # 使用spawn启动，避免fork时复制主进程中MediaPipe、采集线程和日志线程的状态
+        context = multiprocessing.get_context("spawn")
+        self._results = context.Queue()
+        self._tasks = [context.Queue() for _ in range(num_workers)]
+        self._workers = [
+            context.Process(target=_worker_main, name=f"HandsWorker-{i}", daemon=True,
+                            args=(i, self.ring.spec, hands_factory, self._tasks[i], self._results))
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        self._wait_ready()
+        self._collector = threading.Thread(target=self._collect, name="HandsResultCollector", daemon=True)
+        self._collector.start()
+        logger.info("识别进程池已启动: {}个进程, {}个槽位, 每帧最多{}只手", num_workers, self.slot_count, max_num_hands)
+
+    def _wait_ready(self):
+        """等待所有工作进程加载完模型，任何一个进程加载失败时立即关闭进程池并抛出RuntimeError"""
+        deadline = time.monotonic() + self.READY_TIMEOUT
+        ready = 0
+        while ready < self.num_workers:
+            try:
+                slot, worker_index, ok = self._results.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                self.close()
+                raise RuntimeError(f"识别进程在{self.READY_TIMEOUT}秒内未启动完成")
+            if slot != -1:
+                continue
+            if not ok:
+                self.close()
+                raise RuntimeError(f"识别进程{worker_index}加载识别模型失败，错误信息见该进程的日志")
+            ready += 1
+
+    def _collect(self):
+        """结果收集线程：把工作进程返回的完成消息分发到对应槽位"""
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            slot, cost_ns, ok = message
+            if slot < 0:
+                continue
+            with self._slot_condition:
+                self._slot_status[slot] = (cost_ns, ok)
+                self._slot_done[slot].set()
+                if self._slot_abandoned[slot]:
+                    # 调用方已经放弃等待，工作进程不再写入这个槽位，可以复用
+                    self._slot_abandoned[slot] = False
+                    self._free_slots.append(slot)
+                    self._slot_condition.notify()
+
+    def register_stream(self) -> int:
+        """为一路画面分配工作进程（轮流分配），返回进程编号，之后调用infer时传入"""
+        worker = self._next_stream % self.num_workers
+        self._next_stream += 1
+        return worker
+
+    def _acquire_slot(self) -> int:
+        with self._slot_condition:
+            while not self._free_slots:
+                self._slot_condition.wait()
+            return self._free_slots.pop()
+
+    def _release_slot(self, slot: int):
+        with self._slot_condition:
+            self._free_slots.append(slot)
+            self._slot_condition.notify()
+
+    def acquire_frame(self, height: int, width: int) -> Tuple[int, np.ndarray]:
+        """
+        占用一个空闲槽位，返回(槽位, 槽位中(height, width, 3)的画面视图)
+
+        调用方直接把RGB画面写入视图（如作为cv2.cvtColor的dst），再把槽位传给infer，画面不再经过中间缓冲区；
+        没有调用infer时需要用release_frame放回槽位
+
+        :raises ValueError: 画面尺寸超过max_frame_shape
+        """
+        slot = self._acquire_slot()
+        try:
+            view = self.ring.frame_view(slot, height, width)
+        except ValueError:
+            self._release_slot(slot)
+            raise
+        self.ring.set_meta(slot, 0, 0, height, width)
+        return slot, view
+
+    def release_frame(self, slot: int):
+        """放回acquire_frame占用、但没有交给infer的槽位"""
+        self._release_slot(slot)
+
+    def infer(self, rgb_image: Optional[np.ndarray], landmarks: np.ndarray, world_landmarks: np.ndarray,
+              handedness: np.ndarray, worker: int = 0, slot: Optional[int] = None) -> int:
+        """
+        在工作进程中识别一幅RGB画面，等待结果并复制到调用方的数组
+
+        :param rgb_image: (高, 宽, 3) uint8 RGB画面，不能超过max_frame_shape；指定slot时忽略
+        :param landmarks: (手数, 21, 3) 输出，归一化坐标关键点
+        :param world_landmarks: (手数, 21, 3) 输出，世界坐标关键点
+        :param handedness: (手数, 2) 输出，[左右手编码, 置信度]
+        :param worker: register_stream返回的进程编号
+        :param slot: acquire_frame返回、画面已经写入的槽位，识别结束后由infer放回；为None时把rgb_image复制到新槽位
+        :return: 检测到的手数，超时或识别出错时为0
+        """
+        start_ns = time.perf_counter_ns()
+        if slot is None:
+            slot = self._acquire_slot()
+            try:
+                # 画面只复制一次：写入共享内存的槽位，尺寸超过槽位时抛出ValueError
+                self.ring.write_frame(slot, rgb_image)
+            except Exception:
+                self._release_slot(slot)
+                raise
+        timed_out = False
+        try:
+            self._slot_done[slot].clear()
+            self._tasks[worker].put(slot)
+            if not self._slot_done[slot].wait(self.RESULT_TIMEOUT):
+                with self._slot_condition:
+                    # 结果可能在超时之后、加锁之前到达，此时按正常结果处理
+                    if not self._slot_done[slot].is_set():
+                        # 工作进程可能仍在写入这个槽位，交给收集线程在结果到达后放回
+                        self._slot_abandoned[slot] = True
+                        timed_out = True
+                        self._stats["timeouts"] += 1
+                if timed_out:
+                    logger.error("识别进程{}在{}秒内没有返回结果", worker, self.RESULT_TIMEOUT)
+                    return 0
+            cost_ns, ok = self._slot_status[slot]
+            num_hands = 0
+            if ok:
+                slot_landmarks, slot_world_landmarks, slot_handedness = self.ring.hands(slot)
+                num_hands = min(len(slot_landmarks), len(landmarks))
+                landmarks[:num_hands] = slot_landmarks[:num_hands]
+                world_landmarks[:num_hands] = slot_world_landmarks[:num_hands]
+                handedness[:num_hands] = slot_handedness[:num_hands]
+            with self._slot_condition:
+                self._stats["frames"] += 1
+                self._stats["errors"] += not ok
+                self._stats["worker_ns"] += cost_ns
+                self._stats["roundtrip_ns"] += time.perf_counter_ns() - start_ns
+            return num_hands
+        finally:
+            if not timed_out:
+                self._release_slot(slot)
+
+    def stats(self) -> Dict[str, float]:
+        """识别帧数、出错和超时次数、工作进程内平均识别耗时和包括传递画面在内的平均往返耗时（毫秒）"""
+        with self._slot_condition:
+            stats = dict(self._stats)
+        frames = stats["frames"]
+        return {
+            "frames": frames,
+            "errors": stats["errors"],
+            "timeouts": stats["timeouts"],
+            "worker_ms": round(stats["worker_ns"] / frames / 1e6, 2) if frames else 0.0,
+            "roundtrip_ms": round(stats["roundtrip_ns"] / frames / 1e6, 2) if frames else 0.0,
+        }
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        if self.ring is None:
+            return
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(2.0)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put(None)
+        collector = getattr(self, "_collector", None)
+        if collector is not None:
+            collector.join(1.0)
+        self.ring.close()
+        self.ring = None
+        logger.info("识别进程池已关闭: {}", self.stats())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+__all__ = ['InferenceWorkerPool', 'create_hands']
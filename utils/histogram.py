@@ -0,0 +1,73 @@
+"""
+耗时直方图
+按固定宽度的桶统计耗时或延迟，内存占用固定，用于播放计时、输入派发和手势流水线各阶段的统计
+"""
+
+from typing import Dict
+
+
+class DurationHistogram:
+    """
+    耗时直方图
+
+    按固定宽度的桶统计每个样本的耗时，内存占用固定，
+    超出范围的耗时计入最后一个桶，最大值单独精确记录。
+    """
+
+    def __init__(self, bucket_ns: int = 10_000, bucket_count: int = 10_000):
+        """
+        :param bucket_ns: 每个桶的宽度（纳秒），默认10微秒
+        :param bucket_count: 桶数量，默认覆盖0-100毫秒
+        """
+        self.bucket_ns = bucket_ns
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int):
+        """记录一个样本的耗时（纳秒），负值按0计"""
+        duration_ns = max(duration_ns, 0)
+        index = min(duration_ns // self.bucket_ns, len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, p: float) -> int:
+        """
+        获取耗时分位数（纳秒，取所在桶的上界）
+
+        :param p: 分位数，范围0-100
+        """
+        if self.count == 0:
+            return 0
+        target = max(1, round(self.count * p / 100))
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return min((index + 1) * self.bucket_ns, self.max_ns)
+        return self.max_ns
+
+    def summary(self) -> Dict[str, float]:
+        """返回耗时统计摘要（毫秒）"""
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class LatenessHistogram(DurationHistogram):
+    """
+    事件延迟直方图
+
+    记录每个事件相对于截止时间的延迟，提前到达按0计；统计方式见DurationHistogram
+    """
+
+
+__all__ = ['DurationHistogram', 'LatenessHistogram']
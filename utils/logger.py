@@ -3,7 +3,13 @@
 使用loguru进行统一的日志管理
 """
 
+import os
 import sys
+import time
+import atexit
+import threading
+from collections import Counter, deque
+from typing import Dict, Optional
 from loguru import logger
 
 # 配置loguru日志
@@ -15,28 +21,267 @@ if sys.stderr is not None:
         sys.stderr,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level="INFO",
-        colorize=True
+        colorize=True,
+        # 不重复输出异步批量模式转发的日志
+        filter=lambda record: "queued_sink" not in record["extra"],
     )
 
-# 添加文件输出（DEBUG级别及以上，每天轮转，保留7天）
-logger.add(
-    "logs/app.log",
-    rotation="1 day",
-    retention="7 days",
-    compression="zip",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    level="DEBUG"
-)
-
-# 添加错误日志文件（只记录ERROR级别）
-logger.add(
-    "logs/error.log",
-    rotation="1 day",
-    retention="7 days",
-    compression="zip",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    level="ERROR"
-)
+_FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+# 队列模式下后台线程转发批量日志时使用的extra键，只有对应的文件输出接收这些记录
+_QUEUED_KEY = "queued_sink"
+
+
+def _add_file_sinks(queued: bool = False):
+    """
+    添加日志文件输出
+
+    :param queued: 为True时文件输出只接收后台线程转发的批量日志（已格式化），否则直接接收日志记录
+    :return: 添加的输出id列表
+    """
+    options = dict(rotation="1 day", retention="7 days", compression="zip")
+    if queued:
+        return [
+            logger.add("logs/app.log", format="{message}", level="DEBUG",
+                       filter=lambda record: record["extra"].get(_QUEUED_KEY) == "app", **options),
+            logger.add("logs/error.log", format="{message}", level="DEBUG",
+                       filter=lambda record: record["extra"].get(_QUEUED_KEY) == "error", **options),
+        ]
+    return [
+        # 添加文件输出（DEBUG级别及以上，每天轮转，保留7天）
+        logger.add("logs/app.log", format=_FILE_FORMAT, level="DEBUG", **options),
+        # 添加错误日志文件（只记录ERROR级别）
+        logger.add("logs/error.log", format=_FILE_FORMAT, level="ERROR", **options),
+    ]
+
+
+_file_sink_ids = _add_file_sinks()
+
+
+class _QueuedSink:
+    """
+    异步批量日志输出
+
+    调用线程只把格式化后的日志放入有界队列，后台线程按批次合并后写入文件，
+    文件写入、轮转和压缩都不会阻塞调用线程；队列满时丢弃最旧的日志并计数
+    """
+
+    def __init__(self, max_records: int, batch_size: int, flush_interval: float):
+        self.queue = deque(maxlen=max_records)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self._wakeup = threading.Event()
+        self._running = True
+        self._app = logger.bind(**{_QUEUED_KEY: "app"}).opt(raw=True)
+        self._error = logger.bind(**{_QUEUED_KEY: "error"}).opt(raw=True)
+        self._thread = threading.Thread(target=self._run, name="QueuedLogWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        queue = self.queue
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append((message.record["level"].no, str(message)))
+        if len(queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while self._running or self.queue:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """把队列中的日志按批次写入文件"""
+        queue = self.queue
+        while queue:
+            batch = []
+            try:
+                for _ in range(self.batch_size):
+                    batch.append(queue.popleft())
+            except IndexError:
+                pass
+            self._app.debug("".join(text for _, text in batch))
+            errors = [text for level_no, text in batch if level_no >= 40]
+            if errors:
+                self._error.debug("".join(errors))
+            self.written += len(batch)
+            self.batches += 1
+
+    def stop(self, timeout: float = 2.0):
+        self._running = False
+        self._wakeup.set()
+        self._thread.join(timeout)
+
+
+_queued_sink: Optional[_QueuedSink] = None
+_queued_sink_id: Optional[int] = None
+
+
+def enable_queued_sinks(max_records: int = 10000, batch_size: int = 256, flush_interval: float = 0.1):
+    """
+    将日志文件输出切换为异步批量模式
+
+    :param max_records: 队列最多保存的日志条数，超出时丢弃最旧的日志
+    :param batch_size: 每批写入的最大条数，队列达到该数量时立即唤醒后台线程
+    :param flush_interval: 后台线程的最长写入间隔（秒）
+    """
+    global _file_sink_ids, _queued_sink, _queued_sink_id
+    if _queued_sink is not None:
+        return
+    for sink_id in _file_sink_ids:
+        logger.remove(sink_id)
+    _queued_sink = _QueuedSink(max_records, batch_size, flush_interval)
+    _queued_sink_id = logger.add(_queued_sink.write, format=_FILE_FORMAT, level="DEBUG",
+                                 filter=lambda record: _QUEUED_KEY not in record["extra"])
+    _file_sink_ids = _add_file_sinks(queued=True)
+    atexit.register(disable_queued_sinks)
+
+
+def disable_queued_sinks():
+    """写出队列中剩余的日志，并恢复同步文件输出"""
+    global _file_sink_ids, _queued_sink, _queued_sink_id
+    if _queued_sink is None:
+        return
+    logger.remove(_queued_sink_id)
+    _queued_sink.stop()
+    for sink_id in _file_sink_ids:
+        logger.remove(sink_id)
+    _file_sink_ids = _add_file_sinks()
+    _queued_sink = None
+
+
+def queued_sink_stats() -> Dict[str, int]:
+    """异步批量模式的统计：队列中的条数、已写入条数、批次数和丢弃条数"""
+    if _queued_sink is None:
+        return {"queued": 0, "written": 0, "batches": 0, "dropped": 0}
+    return {"queued": len(_queued_sink.queue), "written": _queued_sink.written,
+            "batches": _queued_sink.batches, "dropped": _queued_sink.dropped}
+
+
+# 设置环境变量GUICONTROL_QUEUED_LOGS=1时默认启用异步批量模式
+if os.environ.get("GUICONTROL_QUEUED_LOGS") == "1":
+    enable_queued_sinks()
+
+# 级别名称到数值的映射，与loguru内置级别一致
+_LEVEL_NUMBERS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+# 所有输出中最低的级别，低于该级别的日志不会写到任何地方
+_MIN_SINK_LEVEL = "DEBUG"
+
+_module_levels: Dict[str, str] = {}
+_module_loggers: Dict[str, "ModuleLogger"] = {}
+_lock = threading.Lock()
+# 每个模块实际输出的日志条数，用于统计输出频率
+_record_counts: Counter = Counter()
+_rate_window = {"start": time.perf_counter(), "counts": Counter()}
+
+
+class ModuleLogger:
+    """
+    按模块控制级别的日志门面
+
+    在格式化之前先检查模块级别，级别不够时不构造消息也不创建loguru记录；
+    消息使用{}占位符和参数延迟格式化，只有真正输出时才格式化。
+    hot用于每帧、每个音符的调试输出，默认关闭，需要时通过set_hot_path_logging打开
+    """
+
+    # 是否输出热路径调试日志
+    hot_path = False
+
+    def __init__(self, name: str):
+        self.name = name
+        self._apply_level()
+
+    def _apply_level(self):
+        level = _module_levels.get(self.name, _module_levels.get("", _MIN_SINK_LEVEL))
+        self.level_no = max(_LEVEL_NUMBERS[level], _LEVEL_NUMBERS[_MIN_SINK_LEVEL])
+
+    def is_enabled(self, level: str) -> bool:
+        return _LEVEL_NUMBERS[level] >= self.level_no
+
+    def _log(self, level: str, message: str, args, kwargs, exception=False):
+        _record_counts[self.name] += 1
+        # depth=2使日志中的函数名和行号指向调用方
+        logger.opt(depth=2, exception=exception).log(level, message, *args, **kwargs)
+
+    def hot(self, message: str, *args, **kwargs):
+        """热路径调试日志，只有打开热路径开关且模块级别为DEBUG时才输出"""
+        if ModuleLogger.hot_path and self.level_no <= 10:
+            self._log("DEBUG", message, args, kwargs)
+
+    def debug(self, message: str, *args, **kwargs):
+        if self.level_no <= 10:
+            self._log("DEBUG", message, args, kwargs)
+
+    def info(self, message: str, *args, **kwargs):
+        if self.level_no <= 20:
+            self._log("INFO", message, args, kwargs)
+
+    def warning(self, message: str, *args, **kwargs):
+        if self.level_no <= 30:
+            self._log("WARNING", message, args, kwargs)
+
+    def error(self, message: str, *args, **kwargs):
+        if self.level_no <= 40:
+            self._log("ERROR", message, args, kwargs)
+
+    def exception(self, message: str, *args, **kwargs):
+        """记录ERROR级别日志并附带当前异常的堆栈"""
+        if self.level_no <= 40:
+            self._log("ERROR", message, args, kwargs, exception=True)
+
+
+def get_logger(name: str) -> ModuleLogger:
+    """获取模块的日志门面，通常传入__name__"""
+    with _lock:
+        module_logger = _module_loggers.get(name)
+        if module_logger is None:
+            module_logger = _module_loggers[name] = ModuleLogger(name)
+        return module_logger
+
+
+def set_level(name: Optional[str], level: str):
+    """
+    设置模块的最低日志级别
+
+    :param name: 模块名，None表示所有未单独设置的模块
+    :param level: 级别名称，如"DEBUG"、"INFO"
+    """
+    level = level.upper()
+    if level not in _LEVEL_NUMBERS:
+        raise ValueError(f"未知的日志级别: {level}")
+    with _lock:
+        _module_levels[name or ""] = level
+        for module_logger in _module_loggers.values():
+            module_logger._apply_level()
+
+
+def set_hot_path_logging(enabled: bool):
+    """打开或关闭每帧、每个音符的热路径调试日志"""
+    ModuleLogger.hot_path = enabled
+
+
+def log_rates(reset: bool = True) -> Dict[str, float]:
+    """
+    统计每个模块每秒输出的日志条数
+
+    :param reset: 是否从现在开始新的统计窗口
+    :return: 模块名到每秒日志条数的字典
+    """
+    now = time.perf_counter()
+    elapsed = max(now - _rate_window["start"], 1e-9)
+    counts = _record_counts.copy()
+    rates = {name: (count - _rate_window["counts"][name]) / elapsed for name, count in counts.items()}
+    if reset:
+        _rate_window["start"] = now
+        _rate_window["counts"] = counts
+    return {name: rate for name, rate in rates.items() if rate > 0}
+
 
 # 导出logger实例
-__all__ = ['logger']
\ No newline at end of file
+__all__ = [
+    'logger', 'ModuleLogger', 'get_logger', 'set_level', 'set_hot_path_logging', 'log_rates',
+    'enable_queued_sinks', 'disable_queued_sinks', 'queued_sink_stats',
+]
\ No newline at end of file